@@ -0,0 +1,269 @@
+'''
+    训练接口（与 PCControl 对应）：把 GameManager 包装成 gym 风格的环境
+    reset(seed, map_name, roster) 创建对局并返回观测；step(actions) 把每个受控单位的动作
+    通过 GameManager.set_unit_action 施加，连续模拟 action_repeat 步后返回 (观测, 奖励, 终止, 截断, 信息)。
+
+    动作（每个受控单位一个）：
+        离散：5 个整数 [移动, 转向, 瞄准, 开火, 切换弹药]
+              移动 0 不动 / 1 前进 / 2 后退；转向 0 不转 / 1 左 / 2 右；
+              瞄准 0 保持当前炮塔方向，k (1..AIM_DIRECTIONS) 指向世界坐标中第 k-1 个等分方向（0 为 +x，顺时针）
+        连续：5 个浮点数 [油门, 转向, 瞄准x, 瞄准y, 开火]，油门/转向的绝对值超过 1/3 时生效（正为前进/右转），
+              (瞄准x, 瞄准y) 为炮塔指向的方向（全 0 时保持当前方向），开火 > 0 时开火
+        也可以直接传入 utils.Action
+    观测为 (受控单位数, OBSERVATION_SIZE) 的 float32 数组，每行由自身特征和其他单位（按阵容顺序）的特征组成，
+    不可见或已死亡的单位特征为 0。奖励为单位记录增量按 REWARD_WEIGHTS 的加权和，并累加到单位的 reward 上。
+    observation_type 为 'raster' 时观测改为 (受控单位数, 通道, RASTER_CELLS, RASTER_CELLS) 的栅格（见 RasterObservation）。
+    观测、奖励等数组在 reset 时按阵容大小分配，之后每步原地写入（返回的是同一个数组）。
+'''
+
+import math
+import random
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from GameManager import GameManager
+from Parameter import *
+from RasterObservation import RasterObservation
+from utils import Action
+
+# (单位编号, 添加方法, 位置)，与 test.py 的 init_game 相同
+DEFAULT_ROSTER = [
+    (0,   'add_player_tank',   (100, 500)),
+    (101, 'add_player_tank',   (256, 448)),
+    (102, 'add_player_tank',   (480, 448)),
+    (103, 'add_player_tank',   (768, 448)),
+    (104, 'add_player_archie', (256, 512)),
+    (105, 'add_player_plane',  (480, 512)),
+    (106, 'add_player_archie', (768, 512)),
+    (201, 'add_enemy_archie',  (256, 192)),
+    (202, 'add_enemy_archie',  (480, 192)),
+    (203, 'add_enemy_archie',  (768, 192)),
+    (204, 'add_enemy_tank',    (256, 128)),
+    (205, 'add_enemy_plane',   (480, 128)),
+    (206, 'add_enemy_tank',    (768, 128)),
+]
+
+MAP_NAMES = ['test', 'valley', 'river', 'spindle', 'corridor', 'dual_corridor', 'square_ring', 'four_blocks',
+             'empty', 'border', 'random']
+
+UNIT_TYPES = ['tank', 'archie', 'plane']
+
+
+def build_match(map_name='test', roster=DEFAULT_ROSTER, agent_ids=(), seed=None) -> GameManager:
+    """
+    创建对局：地图由 GameManager.set_<map_name>_map 生成，agent_ids 中的单位由外部控制，其余由 AI 控制
+    seed 为对局随机数生成器（GameManager.rng）的种子，相同 seed 的对局逐帧一致
+    """
+    game_manager = GameManager(seed=seed)
+    getattr(game_manager, f"set_{map_name}_map")()
+    for unit_id, add_method, position in roster:
+        getattr(game_manager, add_method)(unit_id=unit_id, position=position, usingAI=unit_id not in agent_ids)
+    return game_manager
+
+
+def alive_teams(game_manager) -> set:
+    return {unit.team for unit in game_manager.unit_manager.get_all_units() if unit is not None and unit.is_alive}
+
+
+class AIControl:
+    SELF_FEATURES = 9       # 存活, x, y, 朝向 cos/sin, 炮塔 cos/sin, 生命比例, 开火就绪
+    UNIT_FEATURES = 10      # 可见, 友方, dx, dy, 朝向 cos/sin, 生命比例, 类型 one-hot（坦克/高射炮/飞机）
+    DISCRETE_ACTION_SIZES = (3, 3, AIM_DIRECTIONS + 1, 2, 2)
+
+    def __init__(self, agent_ids: Sequence[int] = (0,), action_type: str = 'discrete', action_repeat: int = 1,
+                 max_ticks: int = FPS * 120, map_name: str = 'test', roster=DEFAULT_ROSTER,
+                 observation_type: str = 'vector', rotate_raster: bool = False):
+        if action_type not in ('discrete', 'continuous'):
+            raise ValueError(f"Unknown action type: {action_type}")
+        if observation_type not in ('vector', 'raster'):
+            raise ValueError(f"Unknown observation type: {observation_type}")
+        self.agent_ids: List[int] = list(agent_ids)
+        self.action_type = action_type
+        self.action_repeat = max(1, int(action_repeat))     # 每个动作重复模拟的步数（跳帧）
+        self.max_ticks = max_ticks
+        self.map_name = map_name
+        self.roster = list(roster)
+        self.raster = RasterObservation(rotate=rotate_raster) if observation_type == 'raster' else None
+        self.reward_keys = list(REWARD_WEIGHTS)
+        self.reward_weights = np.array([REWARD_WEIGHTS[key] for key in self.reward_keys], dtype=np.float64)
+
+        self.game_manager: Optional[GameManager] = None
+        self.agents: list = []                  # 受控单位（与 agent_ids 对应）
+        self.roster_units: list = []            # 阵容中的全部单位（按阵容顺序）
+        self.ticks = 0
+        self.rng = random.Random()              # 为每局生成对局种子；reset(seed) 时重新设置
+        self._allocate()
+
+    # ----------------- 缓冲区 -----------------
+    @property
+    def observation_size(self) -> int:
+        return self.SELF_FEATURES + self.UNIT_FEATURES * (len(self.roster) - 1)
+
+    @property
+    def observation_shape(self) -> tuple:
+        """单个受控单位的观测形状"""
+        return self.raster.shape if self.raster is not None else (self.observation_size,)
+
+    def _allocate(self) -> None:
+        """按阵容大小分配观测、奖励等缓冲区（阵容大小不变时重复使用）"""
+        agent_count, unit_count = len(self.agent_ids), len(self.roster)
+        shape = (agent_count,) + self.observation_shape
+        if getattr(self, 'observations', None) is not None and self.observations.shape == shape:
+            return
+        self.observations = np.zeros(shape, dtype=np.float32)
+        self.rewards = np.zeros(agent_count, dtype=np.float32)
+        self._reward_values = np.zeros(agent_count, dtype=np.float64)
+        self._records = np.zeros((agent_count, len(self.reward_keys)), dtype=np.float64)
+        self._previous_records = np.zeros_like(self._records)
+        self._units = np.zeros((unit_count, 10), dtype=np.float64)     # 全部单位的原始状态
+        self._visible = np.zeros((agent_count, unit_count), dtype=bool)
+        # 每个受控单位观测中其他单位的阵容下标（不含自身）
+        self._others = np.zeros((agent_count, max(unit_count - 1, 0)), dtype=np.int64)
+
+    # ----------------- 环境接口 -----------------
+    def reset(self, seed: Optional[int] = None, map_name: Optional[str] = None, roster=None) -> Tuple[np.ndarray, dict]:
+        if seed is not None:
+            self.rng = random.Random(seed)
+        if map_name is not None:
+            self.map_name = map_name
+        if roster is not None:
+            self.roster = list(roster)
+        self._allocate()
+
+        self.game_manager = build_match(self.map_name, self.roster, set(self.agent_ids), seed=self.rng.getrandbits(64))
+        unit_manager = self.game_manager.unit_manager
+        self.roster_units = [unit_manager.get_unit_by_id(unit_id) for unit_id, _, _ in self.roster]
+        self.agents = [unit_manager.get_unit_by_id(unit_id) for unit_id in self.agent_ids]
+        index_of = {unit_id: i for i, (unit_id, _, _) in enumerate(self.roster)}
+        for a, unit_id in enumerate(self.agent_ids):
+            self._others[a] = [i for i in range(len(self.roster)) if i != index_of[unit_id]]
+        self.ticks = 0
+        self._read_records(self._previous_records)
+        self.rewards.fill(0.0)
+        self._build_observations()
+        return self.observations, self._info()
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, bool, bool, dict]:
+        """actions: 与 agent_ids 对应的动作序列，或 {单位编号: 动作}"""
+        if isinstance(actions, dict):
+            actions = [actions.get(unit_id) for unit_id in self.agent_ids]
+        commands = [self._to_action(agent, action) for agent, action in zip(self.agents, actions)]
+        game_manager = self.game_manager
+        step = game_manager.fixed_delta_time
+        terminated = False
+        for _ in range(self.action_repeat):
+            for unit_id, agent, command in zip(self.agent_ids, self.agents, commands):
+                if command is not None and agent.is_alive:
+                    game_manager.set_unit_action(unit_id, command)
+            game_manager.update(step)
+            self.ticks += 1
+            terminated = self._terminated()
+            if terminated or self.ticks >= self.max_ticks:
+                break
+        truncated = not terminated and self.ticks >= self.max_ticks
+
+        # 奖励：单位记录增量的加权和
+        self._read_records(self._records)
+        np.subtract(self._records, self._previous_records, out=self._previous_records)
+        np.dot(self._previous_records, self.reward_weights, out=self._reward_values)
+        self.rewards[:] = self._reward_values
+        self._previous_records[:] = self._records
+        for agent, reward in zip(self.agents, self.rewards.tolist()):
+            agent.reward += reward
+        self._build_observations()
+        return self.observations, self.rewards, terminated, truncated, self._info()
+
+    def _terminated(self) -> bool:
+        if not any(agent.is_alive for agent in self.agents):
+            return True
+        return len(alive_teams(self.game_manager)) <= 1
+
+    def _info(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "game_time": self.game_manager.time,
+            "records": {agent.id: agent.get_record() for agent in self.agents},
+        }
+
+    # ----------------- 动作 -----------------
+    def _to_action(self, agent, action) -> Optional[Action]:
+        """把离散/连续动作转换为 Action（瞄准点按 GameManager 的相机偏移换算为屏幕坐标）"""
+        if action is None or isinstance(action, Action):
+            return action
+        values = np.asarray(action).reshape(-1)
+        if self.action_type == 'discrete':
+            move, turn, aim, fire, switch = (int(v) for v in values[:5])
+            if aim > 0:
+                angle = 2 * math.pi * (aim - 1) / AIM_DIRECTIONS
+                aim_x, aim_y = math.cos(angle), math.sin(angle)
+            else:
+                aim_x = aim_y = 0.0
+            command = Action(forward=move == 1, backward=move == 2, left=turn == 1, right=turn == 2,
+                             fire=bool(fire), switch_ammo=bool(switch))
+        else:
+            throttle, steer, aim_x, aim_y, fire = (float(v) for v in values[:5])
+            command = Action(forward=throttle > 1 / 3, backward=throttle < -1 / 3,
+                             left=steer < -1 / 3, right=steer > 1 / 3, fire=fire > 0)
+        if aim_x == 0 and aim_y == 0:
+            turret = math.radians(agent.turret_direction_angle - 90)
+            aim_x, aim_y = math.cos(turret), math.sin(turret)
+        norm = math.hypot(aim_x, aim_y)
+        camera = self.game_manager.camera_offset
+        command.mouse_pos = (agent.position[0] + aim_x / norm * AIM_DISTANCE - camera[0],
+                             agent.position[1] + aim_y / norm * AIM_DISTANCE - camera[1])
+        return command
+
+    # ----------------- 观测与记录 -----------------
+    def _read_records(self, out: np.ndarray) -> None:
+        for a, agent in enumerate(self.agents):
+            for k, key in enumerate(self.reward_keys):
+                out[a, k] = getattr(agent, key)
+
+    def _build_observations(self) -> None:
+        if self.raster is not None:
+            self.raster.build(self.game_manager, self.agents, out=self.observations)
+            return
+        game_map = self.game_manager.game_map
+        map_width = game_map.width * game_map.tile_size
+        map_height = game_map.height * game_map.tile_size
+
+        # 全部单位的原始状态：存活, 队伍, x, y, 朝向 cos/sin, 生命比例, 类型（3 列）
+        units = self._units
+        units.fill(0.0)
+        for i, unit in enumerate(self.roster_units):
+            if unit is None or not unit.is_alive:
+                continue
+            angle = math.radians(unit.direction_angle - 90)
+            units[i, 0:7] = (1.0, unit.team.value, unit.position[0], unit.position[1],
+                             math.cos(angle), math.sin(angle), unit.health / unit.max_health)
+            if unit.unit_type in UNIT_TYPES:
+                units[i, 7 + UNIT_TYPES.index(unit.unit_type)] = 1.0
+
+        unit_index = {unit.id: i for i, unit in enumerate(self.roster_units) if unit is not None}
+        self._visible.fill(False)
+        obs = self.observations
+        obs.fill(0.0)
+        for a, agent in enumerate(self.agents):
+            if agent is None or not agent.is_alive:
+                continue
+            turret = math.radians(agent.turret_direction_angle - 90)
+            angle = math.radians(agent.direction_angle - 90)
+            obs[a, :self.SELF_FEATURES] = (1.0, agent.position[0] / map_width, agent.position[1] / map_height,
+                                           math.cos(angle), math.sin(angle), math.cos(turret), math.sin(turret),
+                                           agent.health / agent.max_health, agent.fire_cooldown <= 0)
+            for unit_id in agent.visible_unit_ids:
+                if unit_id in unit_index:
+                    self._visible[a, unit_index[unit_id]] = True
+
+        # 其他单位的相对特征（向量化写入预分配的观测）
+        others = self._others
+        visible = np.take_along_axis(self._visible, others, axis=1) & (units[others, 0] > 0)
+        features = obs[:, self.SELF_FEATURES:].reshape(len(self.agents), -1, self.UNIT_FEATURES)
+        agent_rows = np.array([unit_index.get(agent.id, 0) for agent in self.agents], dtype=np.int64)
+        agent_alive = units[agent_rows, 0] > 0
+        visible &= agent_alive[:, None]
+        features[..., 0] = visible
+        features[..., 1] = visible & (units[others, 1] == units[agent_rows, 1][:, None])
+        features[..., 2] = (units[others, 2] - units[agent_rows, 2][:, None]) / map_width
+        features[..., 3] = (units[others, 3] - units[agent_rows, 3][:, None]) / map_height
+        features[..., 4:] = units[others, 4:]
+        features[~visible] = 0.0
@@ -0,0 +1,180 @@
+'''
+    资源管理器：按路径缓存图片，整个进程共享同一份 Surface
+    地块、单位、子弹在构造时通过 get_image 获取图片，只有第一次访问某个路径时才会读取磁盘
+    无界面模式（headless，默认取 GameMode.HEADLESS）下不加载图片（get_image 返回 None，也不导入 pygame），
+    碰撞箱等需要的图片尺寸通过 get_image_size 直接读取 PNG 文件头。
+    地图表面和 GameManager 的图片预加载同样读取 ASSETS.headless，因此可以在运行时（创建对局之前）切换，与模块导入顺序无关
+'''
+
+import os
+import glob
+import struct
+from typing import Dict, List, Optional, Tuple
+from utils import load_image
+from GameMode import *
+
+
+class AssetManager:
+    def __init__(self, headless: bool = HEADLESS):
+        self.headless = headless                                                        # 无界面模式：不加载图片、不创建地图表面
+        self.images: Dict[str, Optional['pygame.Surface']] = {}                         # 路径 -> 图片（加载失败时为 None，避免重复读盘）
+        self.scaled_images: Dict[Tuple[str, Tuple[int, int]], 'pygame.Surface'] = {}    # (路径, 尺寸) -> 缩放后的图片
+        self.converted: Dict[str, bool] = {}                                            # 路径 -> 是否已转换为显示格式
+        self.atlas: Optional['pygame.Surface'] = None                                   # 纹理图集
+        self.atlas_rects: Dict[str, 'pygame.Rect'] = {}                                 # 路径 -> 图集中的区域
+        self.image_sizes: Dict[str, Tuple[int, int]] = {}                               # 路径 -> 图片尺寸（不加载图片）
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normpath(path)
+
+    @staticmethod
+    def _display_ready() -> bool:
+        import pygame
+        return pygame.display.get_init() and pygame.display.get_surface() is not None
+
+    def _convert(self, image: 'pygame.Surface') -> 'pygame.Surface':
+        """转换为显示格式（需要已经创建窗口）"""
+        return image.convert_alpha()
+
+    def get_image(self, path: Optional[str]) -> Optional['pygame.Surface']:
+        """获取共享图片，第一次访问时从磁盘加载"""
+        if not path or self.headless:
+            return None
+        key = self._key(path)
+        if key in self.images:
+            return self.images[key]
+        image = load_image(path)
+        converted = False
+        if image is not None and self._display_ready():
+            image = self._convert(image)
+            converted = True
+        self.images[key] = image
+        self.converted[key] = converted
+        return image
+
+    def get_scaled_image(self, path: Optional[str], size: Tuple[int, int]) -> Optional['pygame.Surface']:
+        """获取缩放后的共享图片（例如随爆炸范围调整大小的爆炸图片）"""
+        image = self.get_image(path)
+        if image is None:
+            return None
+        size = (int(size[0]), int(size[1]))
+        if image.get_size() == size:
+            return image
+        key = (self._key(path), size)
+        scaled = self.scaled_images.get(key)
+        if scaled is None:
+            import pygame
+            scaled = pygame.transform.scale(image, size)
+            self.scaled_images[key] = scaled
+        return scaled
+
+    def get_image_size(self, path: Optional[str]) -> Tuple[int, int]:
+        """获取图片尺寸：已加载的图片直接取尺寸，否则只读取 PNG 文件头（不需要 pygame），读取失败返回 (0, 0)"""
+        if not path:
+            return (0, 0)
+        key = self._key(path)
+        size = self.image_sizes.get(key)
+        if size is not None:
+            return size
+        image = self.images.get(key)
+        if image is not None:
+            size = image.get_size()
+        else:
+            try:
+                with open(path, 'rb') as f:
+                    header = f.read(24)
+                # PNG 签名（8 字节）之后第一个块为 IHDR，数据开头依次是大端序的宽、高
+                if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR':
+                    size = struct.unpack('>II', header[16:24])
+                else:
+                    image = self.get_image(path)
+                    size = image.get_size() if image is not None else (0, 0)
+            except OSError:
+                size = (0, 0)
+        size = (int(size[0]), int(size[1]))
+        self.image_sizes[key] = size
+        return size
+
+    def preload(self, paths: List[str]) -> None:
+        """预加载一组图片"""
+        for path in paths:
+            self.get_image(path)
+
+    def preload_directories(self, directories: List[str], extension: str = '.png') -> None:
+        """预加载目录（递归）下的所有图片"""
+        for directory in directories:
+            pattern = os.path.join(directory, '**', '*' + extension)
+            self.preload(sorted(glob.glob(pattern, recursive=True)))
+
+    def convert_all(self) -> None:
+        """窗口创建后调用：把此前加载的图片全部转换为显示格式"""
+        if not self._display_ready():
+            return
+        for key, image in self.images.items():
+            if image is not None and not self.converted.get(key, False):
+                self.images[key] = self._convert(image)
+                self.converted[key] = True
+        self.scaled_images.clear()
+
+    def build_atlas(self, max_width: int = 1024, padding: int = 1) -> Optional['pygame.Surface']:
+        """
+        将已加载的图片按行（shelf）打包到一张图集中，缓存中的图片替换为图集的子表面。
+        已经分发出去的旧 Surface 仍然有效，之后通过 get_image 获取的都是图集子表面。
+        """
+        entries = [(key, image) for key, image in self.images.items()
+                   if image is not None and key not in self.atlas_rects]
+        if not entries:
+            return self.atlas
+        entries.sort(key=lambda item: item[1].get_height(), reverse=True)
+
+        import pygame
+
+        rects: Dict[str, 'pygame.Rect'] = {}
+        x = y = shelf_height = 0
+        atlas_width = 0
+        for key, image in entries:
+            w, h = image.get_size()
+            if x > 0 and x + w > max_width:
+                x = 0
+                y += shelf_height + padding
+                shelf_height = 0
+            rects[key] = pygame.Rect(x, y, w, h)
+            x += w + padding
+            shelf_height = max(shelf_height, h)
+            atlas_width = max(atlas_width, x)
+        atlas_height = y + shelf_height
+
+        atlas = pygame.Surface((max(atlas_width, 1), max(atlas_height, 1)), pygame.SRCALPHA)
+        if self._display_ready():
+            atlas = atlas.convert_alpha()
+        atlas.fill((0, 0, 0, 0))
+        for key, image in entries:
+            atlas.blit(image, rects[key])
+        for key, _ in entries:
+            self.images[key] = atlas.subsurface(rects[key])
+            self.converted[key] = self._display_ready()
+        self.atlas = atlas
+        self.atlas_rects.update(rects)
+        self.scaled_images.clear()
+        return atlas
+
+    def clear(self) -> None:
+        self.images.clear()
+        self.scaled_images.clear()
+        self.converted.clear()
+        self.image_sizes.clear()
+        self.atlas = None
+        self.atlas_rects.clear()
+
+
+ASSETS = AssetManager()     # 进程内共享的资源管理器
+
+def get_image(path: Optional[str]) -> Optional['pygame.Surface']:
+    return ASSETS.get_image(path)
+
+def get_image_size(path: Optional[str]) -> Tuple[int, int]:
+    return ASSETS.get_image_size(path)
+
+def get_scaled_image(path: Optional[str], size: Tuple[int, int]) -> Optional['pygame.Surface']:
+    return ASSETS.get_scaled_image(path, size)
@@ -0,0 +1,79 @@
+'''
+    无界面批量对局
+    按 test.py 中 init_game 的阵容（AIControl.DEFAULT_ROSTER，玩家坦克也交给 AI 控制）搭建对局，不创建窗口、不导入 pygame，
+    以固定步长运行到一方全灭或达到步数上限，输出每局的步数、墙钟时间、每秒模拟步数和单位记录（get_record）。
+
+    用法：
+        python BatchRunner.py                       # 测试地图，运行 1 局
+        python BatchRunner.py -n 10 --map valley    # 溪谷地图，连续运行 10 局
+        python BatchRunner.py --max-ticks 3600 --no-records
+'''
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from AIControl import MAP_NAMES, build_match, alive_teams
+from AssetManager import ASSETS
+from Parameter import *
+
+
+def run_match(game_manager, max_ticks) -> dict:
+    """以固定步长运行到只剩一方（或没有）存活单位，或达到 max_ticks 步"""
+    step = game_manager.fixed_delta_time
+    ticks = 0
+    start = time.perf_counter()
+    while ticks < max_ticks and len(alive_teams(game_manager)) > 1:
+        game_manager.update(step)
+        ticks += 1
+    wall_time = time.perf_counter() - start
+    teams = alive_teams(game_manager)
+    return {
+        "ticks": ticks,
+        "game_time": game_manager.time,
+        "wall_time": wall_time,
+        "ticks_per_second": ticks / wall_time if wall_time > 0 else float('inf'),
+        "winner": next(iter(teams)).name if len(teams) == 1 else None,
+        "state_hash": game_manager.state_hash(),
+        "records": [unit.get_record() for unit in game_manager.unit_manager.get_all_units() if unit is not None],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="无界面批量运行对局并统计模拟速度")
+    parser.add_argument('-n', '--matches', type=int, default=1, help="连续运行的对局数")
+    parser.add_argument('--map', default='test', choices=MAP_NAMES, help="地图")
+    parser.add_argument('--max-ticks', type=int, default=FPS * 120, help="每局最多模拟的步数（默认 120 秒游戏时间）")
+    parser.add_argument('--seed', type=int, default=None, help="随机种子（每局依次加 1）")
+    parser.add_argument('--no-records', action='store_true', help="不输出单位记录")
+    parser.add_argument('--verbose', action='store_true', help="保留对局中的文本输出（击毁提示等）")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ASSETS.headless = True          # 不加载图片、不创建地图表面（在创建对局之前设置）
+    total_ticks = 0
+    total_wall_time = 0.0
+    for match in range(args.matches):
+        seed = None if args.seed is None else args.seed + match
+        output = sys.stdout if args.verbose else io.StringIO()
+        with contextlib.redirect_stdout(output):
+            game_manager = build_match(args.map, seed=seed)
+            result = run_match(game_manager, args.max_ticks)
+        total_ticks += result["ticks"]
+        total_wall_time += result["wall_time"]
+        print(f"match {match}: ticks {result['ticks']}, game time {result['game_time']:.2f}s, "
+              f"wall time {result['wall_time']:.3f}s, {result['ticks_per_second']:.1f} ticks/s, "
+              f"winner {result['winner']}, state {result['state_hash']}")
+        if not args.no_records:
+            for record in result["records"]:
+                print(record)
+    if args.matches > 1:
+        rate = total_ticks / total_wall_time if total_wall_time > 0 else float('inf')
+        print(f"total: {args.matches} matches, ticks {total_ticks}, wall time {total_wall_time:.3f}s, {rate:.1f} ticks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,717 @@
+'''
+    批量模拟（mega-batch）：把许多局相互独立的对局沿第一维叠放在一个结构数组世界中，一次 step 推进所有对局
+    单位、子弹、地块都保存为 NumPy 数组（单位 (B, U)，子弹按发射者分槽 (B, U, S)），
+    运动、子弹飞行、地块查询、伤害结算都按整批数组运算完成，没有逐对象的 Python 循环。
+
+    规则按 BaseUnit / BaseBullet / 地块类实现（常量与单位、弹种、地块的属性都从真实对象中读取）：
+    1. 动作按 GameManager.set_unit_action 的顺序施加：移动、转向、炮塔目标、开火、切换弹药
+    2. 单位：存活判断、存活时间、地块伤害与减速、计时器与运动，撞到阻挡地块时退回；
+       视野按单位列表顺序依次更新的结果计算（排在前面的单位已经完成本帧的移动）
+    3. 通信：开启 AUTO_COMMUNICATE 时沿有向通信图传递可见信息（与 UnitManager.auto_communicate 的传递闭包相同）
+    4. 子弹：寿命、移动、潜在伤害、障碍物（先于单位判断）、按单位顺序第一个相交的存活单位（友军不受影响）
+    5. 伤害：直接伤害按发射顺序、爆炸伤害在所有直接伤害之后按爆炸顺序结算，与 ExplosionResolver 相同
+       用分组累加和确定每次伤害时目标是否仍然存活、哪一次造成击杀；助攻按本帧视野统计
+    与逐对象模拟的差异：子弹按本帧开始时存活的单位判断命中与潜在伤害，命中目标已在本帧先被击毁的子弹继续飞行
+    （逐对象模拟中它可能命中后面的其他单位）；只支持圆形视野与逐帧碰撞检测（不支持 SWEPT_BULLET_COLLISION）；
+    没有内置 AI，所有单位都由传入的动作控制；随机地图在创建时生成一次，之后各局共用。
+    炮塔目标角度按 AIControl 的瞄准点换算计算，但 NumPy 的 arctan2 / hypot 与 math 可能相差末位，
+    目标与炮塔当前朝向恰好相差 180° 时两边的转向可能相反（离散瞄准方向下已按相同的换算消除了系统性的差别）。
+    动作与观测的格式与 AIControl 相同，策略可以直接用于 GameManager 中的对局。
+'''
+
+import math
+import numpy as np
+from typing import List, Optional, Sequence
+from AIControl import AIControl, DEFAULT_ROSTER, UNIT_TYPES, build_match
+from Bullet.BulletContacts import rects_overlap
+from Parameter import *
+from GameMode import *
+from utils import get_class_from_str
+
+AMMO_TYPES = ['normal_shell', 'rocket_shell', 'heavy_shell']
+NO_KILLER = -2          # killed_by 的空值（-1 表示被地形摧毁）
+
+
+class BatchWorld:
+    SPEED_SIGMA = 0.05          # 与 BaseUnit._update_speed 中的容差相同
+
+    def __init__(self, batch_size: int = 256, map_names='test', roster=DEFAULT_ROSTER,
+                 agent_ids: Optional[Sequence[int]] = None, action_type: str = 'discrete',
+                 max_ticks: int = FPS * 120, auto_reset: bool = True, seed: Optional[int] = None):
+        """
+        :param map_names: 地图名（所有对局相同）或长度为 batch_size 的地图名列表
+        :param agent_ids: 需要观测和奖励的单位编号，默认为阵容中的全部单位；动作总是对全部单位给出
+        :param auto_reset: 对局结束后在同一次 step 中自动重新开始（返回的是新对局的观测，结束时的记录在 info["final_records"] 中）
+        :param seed: 地图模板对局（GameManager）的随机种子
+        """
+        if action_type not in ('discrete', 'continuous'):
+            raise ValueError(f"Unknown action type: {action_type}")
+        if isinstance(map_names, str):
+            map_names = [map_names] * batch_size
+        if len(map_names) != batch_size:
+            raise ValueError("map_names must be a map name or a list with one name per match")
+        self.batch_size = batch_size
+        self.roster = list(roster)
+        self.unit_ids = [unit_id for unit_id, _, _ in self.roster]
+        self.agent_ids = list(agent_ids) if agent_ids is not None else list(self.unit_ids)
+        self.agent_index = np.array([self.unit_ids.index(unit_id) for unit_id in self.agent_ids], dtype=np.int64)
+        self.action_type = action_type
+        self.max_ticks = max_ticks
+        self.auto_reset = auto_reset
+        self.dt = 1.0 / FPS
+
+        templates = {}
+        for name in map_names:
+            if name not in templates:        # 随机地图在这里生成
+                templates[name] = build_match(name, self.roster, set(self.unit_ids), seed=seed)
+        self.map_names = list(templates)
+        self.map_index = np.array([self.map_names.index(name) for name in map_names], dtype=np.int64)
+        self._load_maps([templates[name].game_map for name in self.map_names])
+        self._load_units(templates[self.map_names[0]].unit_manager)
+        self._load_ammo()
+        self._allocate()
+        self.reset()
+
+    # ----------------- 静态数据 -----------------
+    def _load_maps(self, game_maps) -> None:
+        """地块属性表 (地图, 行, 列)，尺寸不同的地图用不阻挡、无效果的空格子补齐（与地图外的规则相同）"""
+        tile_size = game_maps[0].tile_size
+        if any(game_map.tile_size != tile_size for game_map in game_maps):
+            raise ValueError("All maps in a batch must share the same tile size")
+        rows = max(game_map.height for game_map in game_maps)
+        cols = max(game_map.width for game_map in game_maps)
+        count = len(game_maps)
+        self.tile_size = tile_size
+        self.map_rows, self.map_cols = rows, cols
+        self.tile_unit_block = np.zeros((count, rows, cols), dtype=bool)
+        self.tile_bullet_block = np.zeros((count, rows, cols), dtype=bool)
+        self.tile_damage = np.zeros((count, rows, cols), dtype=np.float64)
+        self.tile_slow = np.ones((count, rows, cols), dtype=np.float64)
+        self.tile_conceal = np.zeros((count, rows, cols), dtype=bool)
+        self.map_pixel_size = np.zeros((count, 2), dtype=np.float64)
+        for m, game_map in enumerate(game_maps):
+            for r, row in enumerate(game_map.tiles):
+                for c, tile in enumerate(row):
+                    self.tile_unit_block[m, r, c] = tile.blocks_unit
+                    self.tile_bullet_block[m, r, c] = tile.blocks_bullet
+                    self.tile_damage[m, r, c] = tile.damage_per_step
+                    self.tile_slow[m, r, c] = tile.slow_multiplier
+                    self.tile_conceal[m, r, c] = tile.provides_invisibility
+            self.map_pixel_size[m] = (game_map.width * tile_size, game_map.height * tile_size)
+        self.unit_block_count = self._prefix_count(self.tile_unit_block)
+        self.bullet_block_count = self._prefix_count(self.tile_bullet_block)
+
+    @staticmethod
+    def _prefix_count(grid: np.ndarray) -> np.ndarray:
+        count = np.zeros((grid.shape[0], grid.shape[1] + 1, grid.shape[2] + 1), dtype=np.int32)
+        count[:, 1:, 1:] = grid.cumsum(axis=1).cumsum(axis=2)
+        return count
+
+    def _load_units(self, unit_manager) -> None:
+        """单位属性表 (U,)，从按阵容创建的真实单位中读取"""
+        units = [unit_manager.get_unit_by_id(unit_id) for unit_id in self.unit_ids]
+        self.unit_count = len(units)
+
+        def column(getter, dtype=np.float64):
+            return np.array([getter(unit) for unit in units], dtype=dtype)
+
+        self.team = column(lambda u: u.team.value, np.int64)
+        self.type_index = column(lambda u: UNIT_TYPES.index(u.unit_type) if u.unit_type in UNIT_TYPES else -1, np.int64)
+        self.width = column(lambda u: u.size[0], np.int64)
+        self.height = column(lambda u: u.size[1], np.int64)
+        self.max_speed = column(lambda u: u.max_speed)
+        self.max_acceleration = column(lambda u: u.max_acceleration)
+        self.min_acceleration = column(lambda u: u.min_acceleration)
+        self.max_angular_speed = column(lambda u: u.max_angular_speed)
+        self.turret_angular_speed = column(lambda u: u.turret_angular_speed)
+        self.max_health = column(lambda u: u.max_health)
+        self.sight_range = column(lambda u: u.sight_range)
+        self.communication_range = column(lambda u: u.communication_range)
+        self.armor = column(lambda u: u.armor_type.value, np.int64)
+        self.ammo_switch_time = column(lambda u: u.ammo_switch_time)
+        self.unit_visible = column(lambda u: u.visible, bool)
+        self.spawn = np.array([unit.position for unit in units], dtype=np.float64)
+        self.max_sight_range = float(self.sight_range.max()) if units else 0.0
+        self.same_team = self.team[:, None] == self.team[None, :]
+        self._updated_before = np.tril(np.ones((self.unit_count, self.unit_count), dtype=bool), -1)  # [观察者, 目标]
+
+        # 每个单位的弹种列表（AMMO_TYPES 中的下标，不足的位置为 -1）
+        self.ammo_count = column(lambda u: len(u.ammunition_types), np.int64)
+        self.unit_ammo = np.full((self.unit_count, max(int(self.ammo_count.max()), 1)), -1, dtype=np.int64)
+        for i, unit in enumerate(units):
+            for k, name in enumerate(unit.ammunition_types):
+                self.unit_ammo[i, k] = AMMO_TYPES.index(name)
+
+    def _load_ammo(self) -> None:
+        """弹种属性表 (A,)，从各子弹类共享的 BulletSpec 中读取"""
+        specs = [get_class_from_str(name).SPEC for name in AMMO_TYPES]
+        sizes = np.array([spec.initial_size() for spec in specs], dtype=np.float64)
+        self.bullet_width = np.trunc(sizes[:, 0]).astype(np.int64)
+        self.bullet_height = np.trunc(sizes[:, 1]).astype(np.int64)
+        self.bullet_lifetime = np.array([spec.lifetime for spec in specs])
+        self.bullet_speed = np.array([spec.speed for spec in specs])
+        self.bullet_damage = np.array([spec.base_damage for spec in specs])
+        self.bullet_cooldown = np.array([spec.cooldown for spec in specs])
+        self.bullet_explosive = np.array([spec.is_explosive for spec in specs], dtype=bool)
+        self.explosion_radius = np.array([spec.explosion_radius for spec in specs])
+        self.explosion_damage = BULLET_DAMAGE * np.array([spec.explosion_damage_rate for spec in specs])
+        self.explosion_display_time = np.array([spec.explosion_display_time for spec in specs])
+        # 穿透系数按护甲类型（NONE, LIGHT, MEDIUM, HEAVY）展开，与 _calculate_damage 相同
+        self.penetration = np.ones((len(specs), 4), dtype=np.float64)
+        for a, spec in enumerate(specs):
+            for k in range(3):
+                if len(spec.penetration) > k:
+                    self.penetration[a, k + 1] = spec.penetration[k]
+        self.potential_value = self.bullet_damage + np.where(self.bullet_explosive, self.explosion_damage, 0.0)
+        # 每个单位的子弹槽数：该单位弹种中 (寿命 + 爆炸显示时间) / 冷却 的最大值，保证槽位不会用尽
+        lasting = np.ceil((self.bullet_lifetime + self.explosion_display_time) / self.bullet_cooldown).astype(np.int64) + 1
+        used = self.unit_ammo[self.unit_ammo >= 0]
+        self.slot_count = int(lasting[used].max()) if used.size else 1
+
+    # ----------------- 动态数据 -----------------
+    UNIT_FLOAT_FIELDS = ('x', 'y', 'vx', 'vy', 'speed', 'direction', 'turret', 'turret_target', 'acceleration',
+                         'angular_speed', 'health', 'fire_cooldown', 'reload_timer', 'slow', 'living_time',
+                         'damage_dealt', 'damage_received', 'destroy_enemy_count', 'assist_damage_dealt',
+                         'assist_destroy_count', 'potential_damage', 'reward')
+    BULLET_FLOAT_FIELDS = ('x', 'y', 'vx', 'vy', 'lifetime', 'timer')
+
+    def _allocate(self) -> None:
+        B, U, S = self.batch_size, self.unit_count, self.slot_count
+        self.units = {name: np.zeros((B, U), dtype=np.float64) for name in self.UNIT_FLOAT_FIELDS}
+        self.alive = np.zeros((B, U), dtype=bool)
+        self.conceal = np.zeros((B, U), dtype=bool)
+        self.switching = np.zeros((B, U), dtype=bool)
+        self.ammo = np.zeros((B, U), dtype=np.int64)            # 当前弹种在单位弹种列表中的位置
+        self.target_ammo = np.zeros((B, U), dtype=np.int64)
+        self.killed_by = np.full((B, U), NO_KILLER, dtype=np.int64)
+        self.sighted = np.zeros((B, U, U), dtype=bool)          # [b, 观察者, 目标]：处于自身视野内
+        self.visible = np.zeros((B, U, U), dtype=bool)          # 可见（包括通过通信同步的单位）
+
+        self.bullets = {name: np.zeros((B, U, S), dtype=np.float64) for name in self.BULLET_FLOAT_FIELDS}
+        self.bullet_active = np.zeros((B, U, S), dtype=bool)
+        self.bullet_exploded = np.zeros((B, U, S), dtype=bool)
+        self.bullet_ammo = np.zeros((B, U, S), dtype=np.int64)  # AMMO_TYPES 中的下标
+        self.bullet_serial = np.zeros((B, U, S), dtype=np.int64)  # 发射顺序（伤害结算顺序）
+        self.bullet_recorded = np.zeros((B, U, S, U), dtype=bool)  # 已经贡献过潜在伤害的单位
+        self.serial = np.zeros(B, dtype=np.int64)
+        self.ticks = np.zeros(B, dtype=np.int64)
+
+        A = len(self.agent_ids)
+        self.observation_size = AIControl.SELF_FEATURES + AIControl.UNIT_FEATURES * (U - 1)
+        self.observations = np.zeros((B, A, self.observation_size), dtype=np.float32)
+        self.rewards = np.zeros((B, A), dtype=np.float32)
+        self.reward_keys = list(REWARD_WEIGHTS)
+        self.reward_weights = np.array([REWARD_WEIGHTS[key] for key in self.reward_keys], dtype=np.float64)
+        self._previous_records = np.zeros((B, A, len(self.reward_keys)), dtype=np.float64)
+        self._records = np.zeros_like(self._previous_records)
+        # 每个单位观测中其他单位的下标（不含自身，按阵容顺序）
+        self._others = np.array([[j for j in range(U) if j != i] for i in self.agent_index],
+                                dtype=np.int64).reshape(A, U - 1)
+        # 按单位计算的特征表；同队标记与类型独热编码不随时间变化，只写一次
+        self._self_table = np.zeros((B, U, AIControl.SELF_FEATURES), dtype=np.float32)
+        self._unit_table = np.zeros((B, U, AIControl.UNIT_FEATURES), dtype=np.float32)
+        for t in range(len(UNIT_TYPES)):
+            self._unit_table[:, :, 7 + t] = self.type_index == t
+        self._unit_view = self.observations[:, :, AIControl.SELF_FEATURES:].reshape(B, A, U - 1, AIControl.UNIT_FEATURES)
+        self._ally = self.same_team[self.agent_index[:, None], self._others]
+
+    def reset(self, matches=None) -> np.ndarray:
+        """重新开始 matches（下标或布尔掩码，默认全部）中的对局，返回观测"""
+        index = np.arange(self.batch_size) if matches is None else np.asarray(matches)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        if index.size:
+            for name, array in self.units.items():
+                array[index] = 0.0
+            self.units['x'][index] = self.spawn[:, 0]
+            self.units['y'][index] = self.spawn[:, 1]
+            self.units['health'][index] = self.max_health
+            self.units['slow'][index] = 1.0
+            self.alive[index] = True
+            self.conceal[index] = False
+            self.switching[index] = False
+            self.ammo[index] = 0
+            self.target_ammo[index] = 0
+            self.killed_by[index] = NO_KILLER
+            self.sighted[index] = False
+            self.visible[index] = False
+            self.bullet_active[index] = False
+            self.bullet_exploded[index] = False
+            self.bullet_recorded[index] = False
+            self.serial[index] = 0
+            self.ticks[index] = 0
+            self._read_records(self._previous_records, index)
+            self.rewards[index] = 0.0
+        self._build_observations()
+        return self.observations
+
+    # ----------------- 推进 -----------------
+    def step(self, actions):
+        """
+        actions: (B, U, 5) 的动作数组（格式同 AIControl，离散为整数、连续为浮点数），U 为阵容中的全部单位
+        返回 (观测 (B, A, D), 奖励 (B, A), 终止 (B,), 截断 (B,), 信息)
+        """
+        actions = np.asarray(actions)
+        self._apply_actions(actions)
+        self._update_units()
+        self._update_vision_sharing()
+        self._update_bullets()
+        self.ticks += 1
+
+        # 奖励与结束判断
+        self._read_records(self._records)
+        delta = self._records - self._previous_records
+        self.rewards[:] = delta @ self.reward_weights
+        self.units['reward'][:, self.agent_index] += self.rewards
+        self._previous_records[:] = self._records
+        teams = self._alive_team_count()
+        terminated = (teams <= 1) | ~self.alive[:, self.agent_index].any(axis=1)     # 与 AIControl 相同：受控单位全灭也结束
+        truncated = ~terminated & (self.ticks >= self.max_ticks)
+        info = {"ticks": self.ticks.copy(), "alive_teams": teams}
+        done = terminated | truncated
+        if self.auto_reset and done.any():
+            info["final_records"] = self.get_records(np.flatnonzero(done))
+            self.reset(done)
+        else:
+            self._build_observations()
+        return self.observations, self.rewards, terminated, truncated, info
+
+    def _apply_actions(self, actions: np.ndarray) -> None:
+        """按 set_unit_action 的顺序施加动作：移动、转向、炮塔目标、开火、切换弹药（已死亡的单位不行动）"""
+        u = self.units
+        alive = self.alive
+        if self.action_type == 'discrete':
+            values = actions.astype(np.int64)
+            move, turn, aim, fire, switch = (values[..., k] for k in range(5))
+            forward, backward = move == 1, move == 2
+            left, right = turn == 1, turn == 2
+            angle = 2 * np.pi * (aim - 1) / AIM_DIRECTIONS
+            aim_x = np.where(aim > 0, np.cos(angle), 0.0)
+            aim_y = np.where(aim > 0, np.sin(angle), 0.0)
+            fire, switch = fire != 0, switch != 0
+        else:
+            values = actions.astype(np.float64)
+            forward, backward = values[..., 0] > 1 / 3, values[..., 0] < -1 / 3
+            left, right = values[..., 1] < -1 / 3, values[..., 1] > 1 / 3
+            aim_x, aim_y = values[..., 2], values[..., 3]
+            fire = values[..., 4] > 0
+            switch = np.zeros_like(fire)
+
+        acceleration = np.where(forward & ~backward, self.max_acceleration,
+                                np.where(backward & ~forward, self.min_acceleration, 0.0))
+        angular = np.where(left & ~right, -self.max_angular_speed,
+                           np.where(right & ~left, self.max_angular_speed, 0.0))
+        u['acceleration'][:] = np.where(alive, acceleration, u['acceleration'])
+        u['angular_speed'][:] = np.where(alive, angular, u['angular_speed'])
+        # 不瞄准时瞄向炮塔当前朝向（与 AIControl 相同）
+        idle = (aim_x == 0) & (aim_y == 0)
+        turret = np.radians(u['turret'] - 90)
+        aim_x = np.where(idle, np.cos(turret), aim_x)
+        aim_y = np.where(idle, np.sin(turret), aim_y)
+        # 与 AIControl + BaseUnit.set_turret_target_to_mouse 相同：先换算为距单位 AIM_DISTANCE 的瞄准点，再由瞄准点求角度
+        # （瞄准反方向时角度差正好在 ±180 附近，末位的差别就会决定炮塔的转向）
+        norm = np.hypot(aim_x, aim_y)
+        dx = (u['x'] + aim_x / norm * AIM_DISTANCE) - u['x']
+        dy = (u['y'] + aim_y / norm * AIM_DISTANCE) - u['y']
+        target = (np.degrees(np.arctan2(dy, dx)) + 90) % 360
+        u['turret_target'][:] = np.where(alive, target, u['turret_target'])
+
+        self._fire(alive & fire)
+
+        # 切换到下一个弹种（与当前弹种相同时不切换）
+        next_ammo = (self.ammo + 1) % np.maximum(self.ammo_count, 1)
+        start = alive & switch & (next_ammo != self.ammo)
+        self.switching |= start
+        u['reload_timer'][:] = np.where(start, self.ammo_switch_time, u['reload_timer'])
+        self.target_ammo[:] = np.where(start, next_ammo, self.target_ammo)
+
+    def _fire(self, firing: np.ndarray) -> None:
+        """开火：与 BaseUnit.fire 相同的条件、出膛位置与冷却，子弹放入发射者的第一个空槽"""
+        u = self.units
+        ammo_type = np.take_along_axis(np.broadcast_to(self.unit_ammo, self.ammo.shape + self.unit_ammo.shape[1:]),
+                                       self.ammo[..., None], axis=2)[..., 0]
+        firing = firing & (self.ammo_count > 0) & ~self.switching & (u['fire_cooldown'] <= 0)
+        free = ~self.bullet_active
+        firing &= free.any(axis=2)
+        b, i = np.nonzero(firing)
+        if b.size == 0:
+            return
+        s = np.argmax(free[b, i], axis=1)
+        a = ammo_type[b, i]
+        angle = np.radians(u['turret'][b, i] - 90)
+        cos, sin = np.cos(angle), np.sin(angle)
+        bullets = self.bullets
+        bullets['x'][b, i, s] = u['x'][b, i] + cos * (self.width[i] / 2 + 5)
+        bullets['y'][b, i, s] = u['y'][b, i] + sin * (self.height[i] / 2 + 5)
+        bullets['vx'][b, i, s] = cos * self.bullet_speed[a]
+        bullets['vy'][b, i, s] = sin * self.bullet_speed[a]
+        bullets['lifetime'][b, i, s] = self.bullet_lifetime[a]
+        bullets['timer'][b, i, s] = 0.0
+        self.bullet_active[b, i, s] = True
+        self.bullet_exploded[b, i, s] = False
+        self.bullet_ammo[b, i, s] = a
+        self.bullet_recorded[b, i, s] = False
+        # 同一帧内按单位顺序编号
+        order = np.argsort(b, kind='stable')
+        first = np.searchsorted(b[order], b[order], side='left')
+        rank = np.empty_like(b)
+        rank[order] = np.arange(b.size) - first
+        self.bullet_serial[b, i, s] = self.serial[b] + rank
+        self.serial += np.bincount(b, minlength=self.batch_size)
+        u['fire_cooldown'][b, i] = self.bullet_cooldown[a]
+
+    def _tile_lookup(self, table: np.ndarray, x: np.ndarray, y: np.ndarray, default):
+        """按位置查询地块属性（get_tile_at_position 的规则，地图外返回 default）"""
+        col = np.floor_divide(x, self.tile_size).astype(np.int64)
+        row = np.floor_divide(y, self.tile_size).astype(np.int64)
+        inside = (row >= 0) & (row < self.map_rows) & (col >= 0) & (col < self.map_cols)
+        maps = np.broadcast_to(self.map_index.reshape((-1,) + (1,) * (x.ndim - 1)), x.shape)
+        values = table[maps, np.where(inside, row, 0), np.where(inside, col, 0)]
+        return np.where(inside, values, default)
+
+    def _blocked(self, count: np.ndarray, lefts, tops, widths, heights, maps) -> np.ndarray:
+        """整数矩形是否与阻挡地块相交（GameMap.check_collision_batch 的批量版本，maps 为每个矩形所在的地图）"""
+        rights = lefts + widths
+        bottoms = tops + heights
+        size = self.tile_size
+        c0 = np.maximum(lefts // size, 0)
+        c1 = np.minimum((rights - 1) // size, self.map_cols - 1)
+        r0 = np.maximum(tops // size, 0)
+        r1 = np.minimum((bottoms - 1) // size, self.map_rows - 1)
+        valid = (rights > lefts) & (bottoms > tops) & (c0 <= c1) & (r0 <= r1)
+        c0, c1, r0, r1 = (np.where(valid, v, 0) for v in (c0, c1, r0, r1))
+        total = (count[maps, r1 + 1, c1 + 1] - count[maps, r0, c1 + 1]
+                 - count[maps, r1 + 1, c0] + count[maps, r0, c0])
+        return valid & (total > 0)
+
+    def _update_units(self) -> None:
+        """单位状态（存活、地块效果）、运动与视野，规则同 BaseUnit.update"""
+        u = self.units
+        dt = self.dt
+        start_x, start_y = u['x'].copy(), u['y'].copy()
+        # 存活判断与存活时间（listed 为本帧仍在单位列表中的单位，即上一帧结束时存活的单位）
+        listed = self.alive.copy()
+        self.alive &= u['health'] > 0
+        moving = self.alive.copy()
+        u['living_time'] += np.where(moving, dt, 0.0)
+
+        # 地块效果：减速、隐身、伤害（被地形摧毁的单位本帧仍然完成运动）；不更新的单位保留上一帧的状态
+        x, y = u['x'], u['y']
+        slow = self._tile_lookup(self.tile_slow, x, y, 1.0)
+        u['slow'][:] = np.where(moving, np.where(slow < 1.0, slow, 1.0), u['slow'])
+        previous_conceal = self.conceal.copy()
+        self.conceal[:] = np.where(moving, self._tile_lookup(self.tile_conceal, x, y, False), self.conceal)
+        damage = np.where(moving, self._tile_lookup(self.tile_damage, x, y, 0.0), 0.0)
+        u['health'] -= damage
+        destroyed = moving & (damage > 0) & (u['health'] <= 0)
+        u['health'][destroyed] = 0.0
+        self.alive &= ~destroyed
+        self.killed_by[destroyed] = -1
+
+        # 弹种切换计时
+        timer = u['reload_timer']
+        ticking = moving & self.switching & (timer > 0)
+        timer -= np.where(ticking, dt, 0.0)
+        finished = ticking & (timer <= 0)
+        timer[finished] = 0.0
+        self.ammo[finished] = self.target_ammo[finished]
+        self.switching &= ~finished
+
+        # 开火冷却
+        cooldown = u['fire_cooldown']
+        cooling = moving & (cooldown > 0)
+        cooldown -= np.where(cooling, dt, 0.0)
+        cooldown[cooling & (cooldown < 0)] = 0.0
+
+        # 速度
+        speed = u['speed']
+        limit = self.max_speed * u['slow']
+        upper = limit * (1 + self.SPEED_SIGMA)
+        lower = -limit * (1 + self.SPEED_SIGMA)
+        real_acc = np.where(speed > upper, -self.max_acceleration,
+                            np.where(speed < lower, self.max_acceleration, u['acceleration']))
+        new_speed = speed + real_acc * dt
+        new_speed = np.where((new_speed > limit * 1) & (new_speed < upper), limit, new_speed)
+        new_speed = np.where((new_speed < -limit * 1) & (new_speed > lower), -limit, new_speed)
+        speed[:] = np.where(moving, new_speed, speed)
+
+        # 朝向
+        angular = u['angular_speed']
+        turning = moving & (angular != 0)
+        u['direction'][:] = np.where(turning, (u['direction'] + angular * dt) % 360, u['direction'])
+        too_fast = turning & (np.abs(angular) > self.max_angular_speed)
+        angular[:] = np.where(too_fast, np.where(angular > 0, self.max_angular_speed, -self.max_angular_speed), angular)
+
+        # 炮塔朝向
+        turret = u['turret']
+        diff = (u['turret_target'] - turret + 180) % 360 - 180
+        rotation = self.turret_angular_speed * dt
+        rotating = moving & (np.abs(diff) > 0.1)
+        rotated = np.where(diff > 0, turret + np.minimum(rotation, diff), turret - np.minimum(rotation, -diff))
+        turret[:] = np.where(rotating, rotated % 360, turret)
+
+        # 位置（使用上一帧的速度向量），之后重新计算速度向量
+        old_x, old_y = x.copy(), y.copy()
+        x += np.where(moving, u['vx'] * dt, 0.0)
+        y += np.where(moving, u['vy'] * dt, 0.0)
+        angle = np.radians(u['direction'] - 90)
+        u['vx'][:] = np.where(moving, speed * np.cos(angle), u['vx'])
+        u['vy'][:] = np.where(moving, speed * np.sin(angle), u['vy'])
+
+        # 完成弹种切换（计时为 0 时直接开始切换的情况）
+        completing = moving & self.switching & (timer <= 0)
+        self.ammo[completing] = self.target_ammo[completing]
+        self.switching &= ~completing
+
+        # 与阻挡地块碰撞：恢复到之前的位置并停止（速度向量不重新计算，与 BaseUnit 相同）
+        lefts = np.trunc(x - self.width / 2).astype(np.int64)
+        tops = np.trunc(y - self.height / 2).astype(np.int64)
+        maps = np.broadcast_to(self.map_index[:, None], x.shape)
+        hit = moving & (self.width > 0) & (self.height > 0) & self._blocked(
+            self.unit_block_count, lefts, tops, np.broadcast_to(self.width, x.shape),
+            np.broadcast_to(self.height, x.shape), maps)
+        x[hit] = old_x[hit]
+        y[hit] = old_y[hit]
+        speed[hit] = 0.0
+
+        # 视野（圆形）：观察者按自己移动前的位置计算。单位按列表顺序依次更新，
+        # 排在观察者之前的单位已经完成本帧的移动与地块效果，之后的单位仍是上一帧的位置与隐身状态；
+        # 启用 USE_UNIT_STORE 时所有单位先更新视野再统一移动，只有隐身状态按列表顺序
+        before = self._updated_before
+        target_x = np.where(before, x[:, None, :], start_x[:, None, :]) if not USE_UNIT_STORE else start_x[:, None, :]
+        target_y = np.where(before, y[:, None, :], start_y[:, None, :]) if not USE_UNIT_STORE else start_y[:, None, :]
+        distance = np.hypot(target_x - start_x[:, :, None], target_y - start_y[:, :, None])
+        sighted = (distance <= self.sight_range[None, :, None]) & listed[:, None, :]
+        conceal = np.where(before | np.eye(self.unit_count, dtype=bool), self.conceal[:, None, :],
+                           previous_conceal[:, None, :])
+        seen = sighted & self.unit_visible[None, None, :] & ~conceal
+        self.sighted[:] = np.where(moving[:, :, None], sighted, self.sighted)
+        self.visible[:] = np.where(moving[:, :, None], seen, self.visible)
+
+    def _update_vision_sharing(self) -> None:
+        """
+        自动通信：单位 u 能向 v 发送信息当且仅当二者存活、同队、v 可见且距离不超过 u 的通信范围；
+        v 获得所有能经由通信关系到达它的单位的可见信息（有向图的传递闭包）
+        """
+        if not AUTO_COMMUNICATE or self.unit_count < 2:
+            return
+        x, y = self.units['x'], self.units['y']
+        distance = np.hypot(x[:, None, :] - x[:, :, None], y[:, None, :] - y[:, :, None])
+        alive = self.alive
+        edges = (alive[:, :, None] & alive[:, None, :] & self.same_team[None] & self.unit_visible[None, None, :]
+                 & (distance <= self.communication_range[None, :, None]))
+        edges |= np.eye(self.unit_count, dtype=bool)[None]
+        # 用浮点矩阵乘法求可达关系（整数矩阵乘法没有 BLAS 加速）
+        reach = edges.astype(np.float32)
+        for _ in range(max(1, math.ceil(math.log2(self.unit_count)))):
+            reach = np.minimum(reach @ reach, 1.0)
+        # shared[b, v, t] = 任一能到达 v 的单位 u 看到了 t
+        shared = reach.transpose(0, 2, 1) @ self.visible.astype(np.float32) > 0
+        self.visible[:] = np.where(alive[:, :, None], shared, self.visible)
+
+    def _update_bullets(self) -> None:
+        """子弹寿命、移动、潜在伤害与碰撞，规则同 BaseBullet.update（命中伤害由 _resolve_hits 统一结算）"""
+        bullets = self.bullets
+        dt = self.dt
+        active = self.bullet_active
+        exploded = active & self.bullet_exploded
+        flying = active & ~self.bullet_exploded
+        ammo = self.bullet_ammo
+
+        # 爆炸效果计时
+        bullets['timer'] += np.where(exploded, dt, 0.0)
+        active &= ~(exploded & (bullets['timer'] >= self.explosion_display_time[ammo]))
+
+        # 寿命与移动
+        bullets['lifetime'] -= np.where(flying, dt, 0.0)
+        expired = flying & (bullets['lifetime'] <= 0)
+        active &= ~expired
+        moved = flying & ~expired
+        bullets['x'] += np.where(moved, bullets['vx'] * dt, 0.0)
+        bullets['y'] += np.where(moved, bullets['vy'] * dt, 0.0)
+        if not moved.any():
+            return
+        b, i, s = np.nonzero(moved)
+        bx, by = bullets['x'][b, i, s], bullets['y'][b, i, s]
+        a = ammo[b, i, s]
+        unit_x, unit_y = self.units['x'][b], self.units['y'][b]       # (N, U)
+        alive = self.alive[b]
+
+        # 潜在伤害：进入存活单位 POTENTIAL_DAMAGE_THRESHOLD 范围、尚未记录过的单位
+        near = alive & ~self.bullet_recorded[b, i, s] & (
+            np.hypot(unit_x - bx[:, None], unit_y - by[:, None]) <= POTENTIAL_DAMAGE_THRESHOLD)
+        self.bullet_recorded[b, i, s] |= near
+        rows, targets = np.nonzero(near)
+        np.add.at(self.units['potential_damage'], (b[rows], targets), self.potential_value[a[rows]])
+
+        # 障碍物（先于单位判断）：爆炸弹在原地爆炸（不造成伤害），其余失效
+        lefts = np.trunc(bx - self.bullet_width[a] / 2).astype(np.int64)
+        tops = np.trunc(by - self.bullet_height[a] / 2).astype(np.int64)
+        blocked = self._blocked(self.bullet_block_count, lefts, tops, self.bullet_width[a], self.bullet_height[a],
+                                self.map_index[b])
+        explode = blocked & self.bullet_explosive[a]
+        self.bullet_exploded[b[explode], i[explode], s[explode]] = True
+        bullets['timer'][b[explode], i[explode], s[explode]] = 0.0
+        stop = blocked & ~self.bullet_explosive[a]
+        active[b[stop], i[stop], s[stop]] = False
+
+        # 单位：按单位顺序第一个碰撞箱相交的存活单位，友军不受影响（子弹继续飞行）
+        unit_lefts = np.trunc(unit_x - self.width / 2).astype(np.int64)
+        unit_tops = np.trunc(unit_y - self.height / 2).astype(np.int64)
+        overlap = alive & rects_overlap(lefts[:, None], tops[:, None], self.bullet_width[a][:, None],
+                                        self.bullet_height[a][:, None], unit_lefts, unit_tops, self.width, self.height)
+        overlap &= ~blocked[:, None]
+        first = np.argmax(overlap, axis=1)
+        hit = overlap.any(axis=1) & ~self.same_team[i, first]
+        if hit.any():
+            rows = np.flatnonzero(hit)
+            self._resolve_hits(b[rows], i[rows], s[rows], first[rows], bx[rows], by[rows], a[rows])
+
+    def _resolve_hits(self, b, shooter, s, target, bx, by, ammo) -> None:
+        """
+        结算本帧命中敌方单位的子弹：按发射顺序，直接伤害在前、爆炸伤害在后依次作用，
+        目标在此之前已被击毁的伤害无效；目标已被击毁的子弹不算命中，继续飞行
+        """
+        u = self.units
+        health = u['health']
+        serial = self.bullet_serial[b, shooter, s]
+        direct = self.bullet_damage[ammo] * self.penetration[ammo, self.armor[target]]
+
+        # 第一遍：只看直接伤害，确定哪些子弹命中时目标仍然存活
+        valid = self._apply_order(b, target, serial, direct, health[b, target])[0]
+        rows = np.flatnonzero(valid)
+        b, shooter, s, target, bx, by, ammo, serial, direct = (
+            v[rows] for v in (b, shooter, s, target, bx, by, ammo, serial, direct))
+
+        # 爆炸：以子弹位置为中心，半径内发射者的敌方存活单位
+        explosive = np.flatnonzero(self.bullet_explosive[ammo])
+        eb = b[explosive]
+        distance = np.hypot(u['x'][eb] - bx[explosive, None], u['y'][eb] - by[explosive, None])
+        radius = self.explosion_radius[ammo[explosive]]
+        in_range = (self.alive[eb] & ~self.same_team[shooter[explosive]] & (distance <= radius[:, None]))
+        rows, victims = np.nonzero(in_range)
+        factor = (1.0 - distance[rows, victims] / radius[rows]) if BULLET_EXPLOSION_DAMAGE_APPLY_DISTANT_FACTOR else 1.0
+        blast = self.explosion_damage[ammo[explosive[rows]]] * factor
+
+        # 第二遍：直接伤害与爆炸伤害一起按顺序结算
+        event_b = np.concatenate([b, eb[rows]])
+        event_shooter = np.concatenate([shooter, shooter[explosive[rows]]])
+        event_target = np.concatenate([target, victims])
+        # 爆炸伤害在所有直接伤害之后按爆炸先后结算（与 BulletManager 中 resolve_explosions 的时机相同）
+        event_order = np.concatenate([serial, serial[explosive[rows]] + self.serial.max() + 1])
+        event_damage = np.concatenate([direct, np.broadcast_to(blast, rows.shape).astype(np.float64)])
+        applied, killed = self._apply_order(event_b, event_target, event_order, event_damage,
+                                            health[event_b, event_target])
+        eb_, es, et, ed = event_b[applied], event_shooter[applied], event_target[applied], event_damage[applied]
+        np.add.at(health, (eb_, et), -ed)
+        np.add.at(u['damage_received'], (eb_, et), ed)
+        np.add.at(u['damage_dealt'], (eb_, es), ed)
+        kb, ks, kt = event_b[killed], event_shooter[killed], event_target[killed]
+        health[kb, kt] = 0.0
+        self.alive[kb, kt] = False
+        self.killed_by[kb, kt] = np.array(self.unit_ids, dtype=np.int64)[ks]
+        np.add.at(u['destroy_enemy_count'], (kb, ks), 1)
+
+        # 助攻：发射者的其他存活队友中，本帧视野内看到了受伤单位、且在最大视野距离内的
+        helpers = (self.alive[eb_] & self.same_team[es] & (np.arange(self.unit_count) != es[:, None])
+                   & self.sighted[eb_, :, et])
+        distance = np.hypot(u['x'][eb_] - u['x'][eb_, et][:, None], u['y'][eb_] - u['y'][eb_, et][:, None])
+        helpers &= distance <= self.max_sight_range
+        rows, helper = np.nonzero(helpers)
+        np.add.at(u['assist_damage_dealt'], (eb_[rows], helper), ed[rows])
+        rows, helper = np.nonzero(helpers & killed[applied][:, None])
+        np.add.at(u['assist_destroy_count'], (eb_[rows], helper), 1)
+
+        # 命中的子弹：爆炸弹开始爆炸，其余失效
+        boom = self.bullet_explosive[ammo]
+        self.bullet_exploded[b[boom], shooter[boom], s[boom]] = True
+        self.bullets['timer'][b[boom], shooter[boom], s[boom]] = 0.0
+        self.bullet_active[b[~boom], shooter[~boom], s[~boom]] = False
+
+    @staticmethod
+    def _apply_order(event_b, event_target, order, damage, health):
+        """
+        按 (对局, 目标) 分组、组内按 order 依次累加伤害：返回 (本次伤害时目标仍存活, 本次伤害造成击杀)
+        """
+        count = event_b.size
+        applied = np.zeros(count, dtype=bool)
+        killed = np.zeros(count, dtype=bool)
+        if count == 0:
+            return applied, killed
+        index = np.lexsort((order, event_target, event_b))
+        grouped = damage[index]
+        key_b, key_t = event_b[index], event_target[index]
+        start = np.r_[True, (key_b[1:] != key_b[:-1]) | (key_t[1:] != key_t[:-1])]
+        cumulative = np.cumsum(grouped)
+        group_start = np.flatnonzero(start)
+        lengths = np.diff(np.r_[group_start, count])
+        after = cumulative - np.repeat(cumulative[group_start] - grouped[group_start], lengths)
+        before = after - grouped
+        base = health[index]
+        applied[index] = before < base
+        killed[index] = (before < base) & (after >= base)
+        return applied, killed
+
+    # ----------------- 观测、记录与奖励 -----------------
+    def _alive_team_count(self) -> np.ndarray:
+        teams = np.unique(self.team)
+        return sum((self.alive & (self.team == team)).any(axis=1).astype(np.int64) for team in teams)
+
+    def _read_records(self, out: np.ndarray, matches=None) -> None:
+        index = slice(None) if matches is None else matches
+        for k, key in enumerate(self.reward_keys):
+            out[index, :, k] = self.units[key][index][:, self.agent_index]
+
+    def get_records(self, matches=None) -> List[List[dict]]:
+        """与 BaseUnit.get_record 格式相同的单位记录，每局一个列表"""
+        index = range(self.batch_size) if matches is None else matches
+        u = self.units
+        records = []
+        for m in index:
+            records.append([{
+                "id": unit_id,
+                "destroy_enemy_count": int(u['destroy_enemy_count'][m, k]),
+                "damage_dealt": float(u['damage_dealt'][m, k]),
+                "assist_destroy_count": int(u['assist_destroy_count'][m, k]),
+                "assist_damage_dealt": float(u['assist_damage_dealt'][m, k]),
+                "damage_received": float(u['damage_received'][m, k]),
+                "potential_damage": float(u['potential_damage'][m, k]),
+                "killed_by": None if self.killed_by[m, k] == NO_KILLER else int(self.killed_by[m, k]),
+                "living_time": float(u['living_time'][m, k]),
+                "reward": float(u['reward'][m, k]),
+            } for k, unit_id in enumerate(self.unit_ids)])
+        return records
+
+    def _build_observations(self) -> None:
+        """与 AIControl._build_observations 相同的特征布局：先按单位计算特征表，再按观测者收集，写入预分配的观测数组"""
+        u = self.units
+        size = self.map_pixel_size[self.map_index]                     # (B, 2)
+        x = u['x'] / size[:, 0:1]
+        y = u['y'] / size[:, 1:2]
+        direction = np.radians(u['direction'] - 90)
+        turret = np.radians(u['turret'] - 90)
+        health = u['health'] / self.max_health
+
+        table = self._self_table
+        for k, feature in enumerate((self.alive, x, y, np.cos(direction), np.sin(direction),
+                                     np.cos(turret), np.sin(turret), health, u['fire_cooldown'] <= 0)):
+            table[..., k] = feature
+        table *= self.alive[..., None]
+        self.observations[:, :, :AIControl.SELF_FEATURES] = table[:, self.agent_index]
+
+        table = self._unit_table
+        table[..., 0] = 1.0
+        table[..., 2] = x
+        table[..., 3] = y
+        table[..., 4] = np.cos(direction)
+        table[..., 5] = np.sin(direction)
+        table[..., 6] = health
+        others = self._others                                           # (A, U-1)
+        agents = self.agent_index
+        view = self._unit_view
+        view[:] = table[:, others]
+        view[..., 2] -= x[:, agents, None]
+        view[..., 3] -= y[:, agents, None]
+        view[..., 1] = self._ally
+        visible = self.visible[:, agents[:, None], others] & self.alive[:, others] & self.alive[:, agents, None]
+        view *= visible[..., None]
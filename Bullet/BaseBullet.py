@@ -2,16 +2,34 @@
     描述弹药的基类
 '''
 
-import pygame
 import math
 from typing import List, Tuple, Optional, Dict, Any
 from Parameter import *
 from utils import *
+from AssetManager import get_scaled_image
+from Bullet.BulletSpec import BulletSpec
 from GameMode import *
 import json
 import os
 
+_NO_UNIT_IDS = frozenset()     # 尚未记录任何潜在伤害时共享的空集合
+
+
+def _spec_property(name: str, doc: str) -> property:
+    """只读属性：转发到子弹类型的 BulletSpec"""
+    return property(lambda self: getattr(self.spec, name), doc=doc)
+
+
 class BaseBullet:
+    # 只保存动态数据，静态属性全部在共享的 spec 中
+    __slots__ = ('id', 'shooter', 'shooter_team', 'spec', 'image', 'size', 'lifetime', 'position',
+                 'velocity_direction', 'velocity', 'bounding_box', 'rotation_angle',
+                 'is_active', 'has_collided', 'has_exploded', 'explosion_timer', 'collided_with',
+                 'collided_objects', 'distance_traveled', 'potential_recorded_units',
+                 'previous_position', 'bullet_store', 'slot')
+
+    SPEC: Optional[BulletSpec] = None      # 子类的默认类型属性
+
     def __init__(self, 
                  projectile_id: str, 
                  shooter, 
@@ -20,7 +38,7 @@ class BaseBullet:
                  velocity_direction: Tuple[float, float] = (1.0, 0.0),
                  bullet_image_path: Optional[str] = None,
                  size: Tuple[float, float] = (0.0, 0.0),
-                 bounding_box: Optional[pygame.Rect] = None,
+                 bounding_box: Optional[Rect] = None,
                  lifetime: float = 3.0,
                  speed_rate: float = 1.0,
                  damage_rate: float = 1.0,
@@ -29,47 +47,36 @@ class BaseBullet:
                  is_explosive: bool = False,
                  explosion_radius: float = 0.0,
                  explosion_damage_rate: float = 1.0,
-                 explosion_image_path: Optional[str] = None):
+                 explosion_image_path: Optional[str] = None,
+                 spec: Optional[BulletSpec] = None):
+        
+        # 类型属性：子类传入共享的 spec，直接构造 BaseBullet 时按参数生成
+        if spec is None:
+            spec = BulletSpec(image_path=bullet_image_path, size=size, lifetime=lifetime,
+                              speed_rate=speed_rate, damage_rate=damage_rate, cooldown=cooldown,
+                              penetration=tuple(penetration) if penetration else (1.0, 1.0, 1.0),
+                              is_explosive=is_explosive, explosion_radius=explosion_radius,
+                              explosion_damage_rate=explosion_damage_rate,
+                              explosion_image_path=explosion_image_path)
+        self.spec: BulletSpec = spec
         
         # 基本信息
         self.id: str = projectile_id
         self.shooter = shooter
         self.shooter_team: Team = shooter_team
+        self.bullet_store = None                # 所在的 BulletStore（加入 BulletManager 后设置）
+        self.slot: int = -1                     # 在 BulletStore 中的下标
         
-        # 图像和渲染
-        self.image_path: Optional[str] = bullet_image_path
-        self.image: Optional[pygame.Surface] = load_image(bullet_image_path) if bullet_image_path else None
-        
-        if size == (0.0, 0.0) and self.image:
-            self.size: Tuple[float, float] = self.image.get_size()
-        else:
-            self.size = size
-            
-        # 基本属性
-        self.max_lifetime: float = lifetime                                                 # 射程
-        self.speed_rate: float = speed_rate
-        self.damage_rate: float = damage_rate
-        self.penetration: List[float] = penetration if penetration else [1.0, 1.0, 1.0]     # 对不同护甲的伤害
-        
-        self.speed: float = BULLET_SPEED * self.speed_rate                                  # 速度
-        self.base_damage: float = BULLET_DAMAGE * self.damage_rate                          # 基础伤害
-        self.cooldown: float = cooldown                                                     # 开火冷却时间
-        
-        # 爆炸
-        self.is_explosive: bool = is_explosive                                              # 是否为爆炸弹
-        self.explosion_radius: float = explosion_radius                                     # 爆炸半径
-        self.explosion_damage_rate: float = explosion_damage_rate                           # 爆炸伤害
-        self.explosion_image_path: Optional[str] = explosion_image_path                     # 爆炸效果图像路径
-        self.explosion_image: Optional[pygame.Surface] = None
-        if explosion_image_path:
-            self.explosion_image = load_image(explosion_image_path)
+        # 图像和渲染（爆炸时替换为爆炸图片）
+        self.image: Optional['pygame.Surface'] = spec.image
+        self.size: Tuple[float, float] = spec.initial_size()
         
         # 实时属性
-        self.lifetime: float = lifetime
+        self.lifetime: float = spec.lifetime
         self.position: Tuple[float, float] = position
+        self.previous_position: Tuple[float, float] = position    # 本帧移动前的位置（绘制插值与连续碰撞检测用）
         self.velocity_direction: Tuple[float, float] = velocity_direction
         self.velocity: Tuple[float, float] = self._calculate_velocity()
-        self.bounding_box: pygame.Rect = bounding_box if bounding_box else self._update_bounding_box()
         self.rotation_angle: float = math.degrees(math.atan2(velocity_direction[1], velocity_direction[0])) + 90
         
         # 状态标志
@@ -77,14 +84,29 @@ class BaseBullet:
         self.has_collided: bool = False
         self.has_exploded: bool = False
         self.explosion_timer: float = 0.0
-        self.max_explosion_display_time: float = 0.2  # 爆炸效果显示时间
         self.collided_with: Optional[str] = None  # 'unit', 'obstacle', 'friendly'
-        self.collided_objects: List[Any] = []  # 碰撞到的对象列表
+        self.collided_objects: Tuple[Any, ...] = ()  # 碰撞到的对象（第一次碰撞时才创建列表）
         self.distance_traveled: float = 0.0  # 已飞行距离
-        self.potential_recorded_units: set = set()   # 存储已经贡献过潜在伤害的单位id
+        self.potential_recorded_units = _NO_UNIT_IDS   # 已经贡献过潜在伤害的单位id（第一次记录时才创建集合）
         
         # 初始化碰撞箱
         self._update_bounding_box()
+
+    # 类型属性（只读，来自 spec）
+    image_path = _spec_property('image_path', "子弹图片路径")
+    max_lifetime = _spec_property('lifetime', "射程（最大飞行时间）")
+    speed_rate = _spec_property('speed_rate', "速度倍率")
+    damage_rate = _spec_property('damage_rate', "伤害倍率")
+    penetration = _spec_property('penetration', "对不同护甲的伤害")
+    speed = _spec_property('speed', "速度")
+    base_damage = _spec_property('base_damage', "基础伤害")
+    cooldown = _spec_property('cooldown', "开火冷却时间")
+    is_explosive = _spec_property('is_explosive', "是否为爆炸弹")
+    explosion_radius = _spec_property('explosion_radius', "爆炸半径")
+    explosion_damage_rate = _spec_property('explosion_damage_rate', "爆炸伤害")
+    explosion_image_path = _spec_property('explosion_image_path', "爆炸效果图像路径")
+    explosion_image = _spec_property('explosion_image', "爆炸效果图像")
+    max_explosion_display_time = _spec_property('explosion_display_time', "爆炸效果显示时间")
         
     def _calculate_velocity(self) -> Tuple[float, float]:
         """计算速度向量"""
@@ -102,11 +124,11 @@ class BaseBullet:
             normalized_dir[1] * self.speed
         )
     
-    def _update_bounding_box(self) -> pygame.Rect:
+    def _update_bounding_box(self) -> Rect:
         """更新碰撞箱"""
         x, y = self.position
         width, height = self.size
-        self.bounding_box = pygame.Rect(
+        self.bounding_box = Rect(
             x - width / 2,
             y - height / 2,
             width,
@@ -131,35 +153,86 @@ class BaseBullet:
             self.is_active = False
             return False
         
-        old_position = self.position
-        
+        self._update_position(delta_time)
+        return self._update_collisions(unit_manager, game_map)
+    
+    def _update_position(self, delta_time: float) -> None:
+        """移动子弹并累加已飞行距离（BulletManager 中由 BulletStore.advance 批量完成）"""
         dx = self.velocity[0] * delta_time
         dy = self.velocity[1] * delta_time
+        self.previous_position = self.position
         self.position = (self.position[0] + dx, self.position[1] + dy)
         
         self._update_bounding_box()
         
         # 更新已飞行距离
         self.distance_traveled += math.sqrt(dx**2 + dy**2)
+    
+    def _update_collisions(self, unit_manager, game_map, contacts = None, explosions = None) -> bool:
+        """
+        移动后的潜在伤害统计与碰撞处理，返回子弹是否仍然活跃。
+        contacts 为 BulletManager 批量粗筛的结果 (潜在伤害候选单位, 碰撞候选单位, 是否撞到障碍物)，
+        为 None 时通过单位空间索引与障碍物网格逐个查询；
+        explosions 不为 None 时，爆炸伤害不立即结算，而是把子弹加入该列表，由 BulletManager 在本帧统一结算
+        """
+        near_units, hit_units, blocked = contacts if contacts is not None else (None, None, None)
         
         # 检查与单位的潜在伤害
-        self._check_potential_damage(unit_manager)
+        self._check_potential_damage(unit_manager, near_units)
         
         # 检查与障碍物的碰撞
-        obstacle_collision = self._check_obstacle_collision(game_map)
+        obstacle_collision = self._check_obstacle_collision(game_map) if blocked is None else blocked
         if obstacle_collision:
             self._handle_obstacle_collision()
             return self.is_active
         
         # 检查与单位的碰撞
-        unit_collision = self._check_unit_collision(unit_manager)
+        unit_collision = self._check_unit_collision(unit_manager, hit_units)
         if unit_collision:
             unit = unit_collision
-            self._handle_unit_collision(unit, unit_manager)
+            self._handle_unit_collision(unit, unit_manager, explosions)
+            return self.is_active
+        
+        return True
+    
+    def _update_swept_collisions(self, unit_manager, start, near_units, hits, obstacle_time, explosions = None) -> bool:
+        """
+        连续碰撞检测版本的 _update_collisions：子弹本帧从 start 沿直线移动到当前位置。
+        near_units 为移动线段经过潜在伤害范围的单位，hits 为按接触时刻排序的 (时刻, 单位)，
+        obstacle_time 为首次接触障碍物的时刻（None 表示没有）。
+        按接触先后处理：途经的友军只记录碰撞、子弹继续飞行；
+        遇到第一个敌方单位或障碍物时子弹位置退回到接触点，再按原有规则处理命中。
+        """
+        self._check_potential_damage(unit_manager, near_units, checked = True)
+        
+        for time, unit in hits:
+            if obstacle_time is not None and obstacle_time <= time:
+                break
+            if not unit.is_alive:
+                continue
+            if unit.team == self.shooter_team:
+                self._handle_unit_collision(unit, unit_manager, explosions)
+                continue
+            self._move_to_contact(start, time)
+            self._handle_unit_collision(unit, unit_manager, explosions)
+            return self.is_active
+        
+        if obstacle_time is not None:
+            self._move_to_contact(start, obstacle_time)
+            self._handle_obstacle_collision()
             return self.is_active
         
         return True
     
+    def _move_to_contact(self, start, time: float) -> None:
+        """把子弹从本帧终点退回到线段 start → 终点上比例为 time 的接触点"""
+        end = self.position
+        dx = (end[0] - start[0]) * (1 - time)
+        dy = (end[1] - start[1]) * (1 - time)
+        self.position = (end[0] - dx, end[1] - dy)
+        self._update_bounding_box()
+        self.distance_traveled -= math.sqrt(dx**2 + dy**2)
+    
     def _update_explosion(self, delta_time: float) -> bool:
         """更新爆炸效果"""
         self.explosion_timer += delta_time
@@ -168,22 +241,22 @@ class BaseBullet:
         return True  # 在爆炸期间仍然返回True，以便绘制爆炸效果
     
     def _check_obstacle_collision(self, game_map):
-        """检查与障碍物的碰撞（使用 bullet_obstacles）"""
-        for obstacle in game_map.bullet_obstacles: 
-            if self.bounding_box.colliderect(obstacle):
-                return obstacle
-        return None
+        """检查与障碍物的碰撞（使用 bullet_obstacles 的网格索引）"""
+        return game_map.get_bullet_obstacle(self.bounding_box)
     
-    def _check_unit_collision(self, unit_manager):
-        """检查与单位的碰撞"""
-        for unit in unit_manager.units:
+    def _check_unit_collision(self, unit_manager, candidates = None):
+        """检查与单位的碰撞（candidates 为按单位列表顺序排列的候选单位，None 时查询空间索引）"""
+        bounding_box = self.bounding_box
+        if candidates is None:
+            candidates = unit_manager.query_rect(bounding_box)
+        for unit in candidates:
             # 跳过无效单位
             if not hasattr(unit, 'is_alive') or not unit.is_alive:
                 continue
                 
             # 检查碰撞
             if (hasattr(unit, 'bounding_box') and unit.bounding_box and 
-                self.bounding_box.colliderect(unit.bounding_box)):
+                bounding_box.colliderect(unit.bounding_box)):
                 return unit
         return None
     
@@ -198,9 +271,11 @@ class BaseBullet:
         else:
             self.is_active = False
     
-    def _handle_unit_collision(self, unit, unit_manager):
+    def _handle_unit_collision(self, unit, unit_manager, explosions = None):
         """处理与单位的碰撞"""
         self.has_collided = True
+        if not self.collided_objects:
+            self.collided_objects = []
         self.collided_objects.append(unit)
         
         # 检查是否是友军
@@ -222,7 +297,10 @@ class BaseBullet:
         # 如果子弹会爆炸，触发爆炸
         if self.is_explosive:
             self._trigger_explosion()
-            self.apply_explosion_damage(unit_manager)
+            if explosions is None:
+                self.apply_explosion_damage(unit_manager)
+            else:
+                explosions.append(self)
         else:
             self.is_active = False
     
@@ -248,23 +326,28 @@ class BaseBullet:
         
         return base_damage
     
-    def _check_potential_damage(self, unit_manager):
+    def _check_potential_damage(self, unit_manager, candidates = None, checked = False):
         """
         检查子弹是否进入任何存活单位的潜在伤害范围（100像素）
         如果进入且尚未对该单位记录过，则累加潜在伤害到该单位
+        candidates 为按单位列表顺序排列的候选单位，None 时查询空间索引；
+        checked 为 True 时候选单位已确定在范围内（连续碰撞检测按移动线段判断），不再按当前位置判断距离
         """
         threshold = POTENTIAL_DAMAGE_THRESHOLD
-        for unit in unit_manager.units:
+        position = self.position
+        if candidates is None:
+            candidates = unit_manager.query_radius(position, threshold)
+        for unit in candidates:
             if not unit.is_alive:
                 continue
             # 跳过已经记录过的单位
             if unit.id in self.potential_recorded_units:
                 continue
             # 计算距离
-            dx = unit.position[0] - self.position[0]
-            dy = unit.position[1] - self.position[1]
+            dx = unit.position[0] - position[0]
+            dy = unit.position[1] - position[1]
             dist = math.hypot(dx, dy)
-            if dist <= threshold:
+            if checked or dist <= threshold:
                 # 计算此子弹的潜在伤害：基础伤害 + 爆炸伤害（如果有）
                 potential = self.base_damage
                 if self.is_explosive:
@@ -272,6 +355,8 @@ class BaseBullet:
                 # 累加到单位
                 unit.potential_damage += potential
                 # 记录已处理
+                if self.potential_recorded_units is _NO_UNIT_IDS:
+                    self.potential_recorded_units = set()
                 self.potential_recorded_units.add(unit.id)
                 
     def _trigger_explosion(self):
@@ -288,7 +373,7 @@ class BaseBullet:
             # 调整大小以匹配爆炸半径
             if self.explosion_radius > 0 and EXPLOSION_IMAGE_ADAPT_TO_RANGE:
                 scaled_size = (int(self.explosion_radius * 2), int(self.explosion_radius * 2))
-                self.image = pygame.transform.scale(self.image, scaled_size)
+                self.image = get_scaled_image(self.explosion_image_path, scaled_size)
                 self.size = scaled_size
                 self._update_bounding_box()
     
@@ -302,7 +387,7 @@ class BaseBullet:
         damage_map = {}
         explosion_center = self.position
         
-        for unit in unit_manager.units:
+        for unit in unit_manager.query_radius(explosion_center, self.explosion_radius, exclude_team=self.shooter_team):
             if not unit.is_alive:
                 continue
                 
@@ -326,13 +411,23 @@ class BaseBullet:
         
         return damage_map
     
-    def draw(self, surface: pygame.Surface, camera_offset: Tuple[float, float] = (0, 0)) -> None:
-        """绘制子弹"""
+    def get_draw_position(self, alpha: float = 1.0) -> Tuple[float, float]:
+        """绘制位置：在本帧移动前的位置与当前位置之间按 alpha 插值"""
+        if alpha >= 1.0:
+            return self.position
+        x0, y0 = self.previous_position
+        x1, y1 = self.position
+        return (x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha)
+
+    def draw(self, surface: 'pygame.Surface', camera_offset: Tuple[float, float] = (0, 0), alpha: float = 1.0) -> None:
+        """绘制子弹（alpha 为两次模拟步之间的插值比例）"""
         if not self.is_active:
             return
+        import pygame
         
-        screen_x = self.position[0] - camera_offset[0]
-        screen_y = self.position[1] - camera_offset[1]
+        x, y = self.get_draw_position(alpha)
+        screen_x = x - camera_offset[0]
+        screen_y = y - camera_offset[1]
         
         if self.image:
             # 如果需要旋转，根据速度方向旋转图像
@@ -0,0 +1,134 @@
+'''
+    子弹与单位的批量粗筛（NumPy 向量化）
+    每帧对所有移动过的子弹和存活单位一次性计算：
+    1. 中心距离在潜在伤害范围内的 (子弹, 单位) 对
+    2. 碰撞箱相交的 (子弹, 单位) 对
+    结果按 (子弹, 单位列表顺序) 排列，子弹逐个处理碰撞时只需检查自己的候选单位。
+    距离判断略微放宽（精确判断仍由子弹完成），碰撞箱为整数矩形，判断与 pygame.Rect.colliderect 相同。
+    开启 SWEPT_BULLET_COLLISION 时改用 sweep_bullet_contacts：按子弹本帧的移动线段做连续检测，
+    得到首次接触的时刻，大时间步长下子弹也不会穿过单位。
+'''
+
+import numpy as np
+from typing import Tuple
+from Map.Raycast import sweep_aabb
+
+# 每次参与运算的 (子弹, 单位) 对数上限，避免子弹很多时一次分配过大的数组
+_CHUNK_PAIRS = 1 << 20
+
+
+def rects_overlap(left_a, top_a, width_a, height_a, left_b, top_b, width_b, height_b) -> np.ndarray:
+    """整数矩形两两相交（可广播），与 pygame.Rect.colliderect 相同：边界接触不算相交，空矩形不与任何矩形相交"""
+    return ((width_a > 0) & (height_a > 0) & (width_b > 0) & (height_b > 0) &
+            (left_a < left_b + width_b) & (left_b < left_a + width_a) &
+            (top_a < top_b + height_b) & (top_b < top_a + height_a))
+
+
+def find_bullet_contacts(bullet_xy: np.ndarray, bullet_boxes: np.ndarray,
+                         unit_xy: np.ndarray, unit_boxes: np.ndarray,
+                         threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    :param bullet_xy: (B, 2) 子弹中心位置
+    :param bullet_boxes: (B, 4) 子弹碰撞箱 (left, top, width, height)，整数
+    :param unit_xy: (U, 2) 单位中心位置
+    :param unit_boxes: (U, 4) 单位碰撞箱，没有碰撞箱的单位宽高为 0
+    :param threshold: 潜在伤害距离
+    :return: (near_bullets, near_units, hit_bullets, hit_units)
+             near_*: 中心距离不超过 threshold（略放宽）的子弹下标与单位下标
+             hit_*:  碰撞箱相交的子弹下标与单位下标
+             均按子弹下标、再按单位下标排序
+    """
+    bullet_xy = np.asarray(bullet_xy, dtype=np.float64).reshape(-1, 2)
+    bullet_boxes = np.asarray(bullet_boxes, dtype=np.int64).reshape(-1, 4)
+    unit_xy = np.asarray(unit_xy, dtype=np.float64).reshape(-1, 2)
+    unit_boxes = np.asarray(unit_boxes, dtype=np.int64).reshape(-1, 4)
+    bullet_count = bullet_xy.shape[0]
+    unit_count = unit_xy.shape[0]
+    empty = np.zeros(0, dtype=np.int64)
+    if bullet_count == 0 or unit_count == 0:
+        return empty, empty, empty, empty
+
+    # 放宽 1 像素，保证浮点误差不会漏掉精确判断会通过的单位
+    reach = (threshold + 1.0) ** 2
+    ux = unit_xy[:, 0]
+    uy = unit_xy[:, 1]
+    ub = [unit_boxes[:, k] for k in range(4)]
+
+    near_parts, hit_parts = [], []
+    step = max(1, _CHUNK_PAIRS // unit_count)
+    for start in range(0, bullet_count, step):
+        stop = min(start + step, bullet_count)
+        dx = ux - bullet_xy[start:stop, 0:1]
+        dy = uy - bullet_xy[start:stop, 1:2]
+        near_parts.append(np.nonzero(dx * dx + dy * dy <= reach))
+        bb = [bullet_boxes[start:stop, k:k + 1] for k in range(4)]
+        hit_parts.append(np.nonzero(rects_overlap(*bb, *ub)))
+        # np.nonzero 按行优先返回，即先按子弹、再按单位排序
+        near_parts[-1] = (near_parts[-1][0] + start, near_parts[-1][1])
+        hit_parts[-1] = (hit_parts[-1][0] + start, hit_parts[-1][1])
+
+    near_bullets = np.concatenate([p[0] for p in near_parts])
+    near_units = np.concatenate([p[1] for p in near_parts])
+    hit_bullets = np.concatenate([p[0] for p in hit_parts])
+    hit_units = np.concatenate([p[1] for p in hit_parts])
+    return near_bullets, near_units, hit_bullets, hit_units
+
+
+def sweep_bullet_contacts(starts: np.ndarray, ends: np.ndarray, half_sizes: np.ndarray,
+                          unit_xy: np.ndarray, unit_boxes: np.ndarray,
+                          threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    连续检测版本：子弹中心本帧沿 starts → ends 移动，半宽高为 half_sizes（均为 (B, 2)）
+    :return: (near_bullets, near_units, hit_bullets, hit_units, hit_times)
+             near_*: 移动线段到单位中心的最近距离不超过 threshold 的对（已是精确判断），按子弹、单位排序
+             hit_*:  移动过程中碰撞箱接触的对及首次接触时刻，按子弹、接触时刻、单位排序
+    """
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    half_sizes = np.asarray(half_sizes, dtype=np.float64).reshape(-1, 2)
+    unit_xy = np.asarray(unit_xy, dtype=np.float64).reshape(-1, 2)
+    unit_boxes = np.asarray(unit_boxes, dtype=np.int64).reshape(-1, 4)
+    bullet_count = starts.shape[0]
+    unit_count = unit_xy.shape[0]
+    empty = np.zeros(0, dtype=np.int64)
+    if bullet_count == 0 or unit_count == 0:
+        return empty, empty, empty, empty, np.zeros(0, dtype=np.float64)
+
+    ux = unit_xy[:, 0]
+    uy = unit_xy[:, 1]
+    has_box = (unit_boxes[:, 2] > 0) & (unit_boxes[:, 3] > 0)
+    lefts = unit_boxes[:, 0]
+    tops = unit_boxes[:, 1]
+    rights = lefts + unit_boxes[:, 2]
+    bottoms = tops + unit_boxes[:, 3]
+
+    near_parts, hit_parts = [], []
+    step = max(1, _CHUNK_PAIRS // unit_count)
+    for start in range(0, bullet_count, step):
+        stop = min(start + step, bullet_count)
+        sx = starts[start:stop, 0:1]
+        sy = starts[start:stop, 1:2]
+        dx = ends[start:stop, 0:1] - sx
+        dy = ends[start:stop, 1:2] - sy
+
+        # 线段到单位中心的最近距离
+        length2 = dx * dx + dy * dy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(length2 > 0, ((ux - sx) * dx + (uy - sy) * dy) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        near = np.hypot(ux - (sx + t * dx), uy - (sy + t * dy)) <= threshold
+        rows, cols = np.nonzero(near)
+        near_parts.append((rows + start, cols))
+
+        hit, hit_t = sweep_aabb(sx, sy, dx, dy, half_sizes[start:stop, 0:1], half_sizes[start:stop, 1:2],
+                                lefts, tops, rights, bottoms)
+        rows, cols = np.nonzero(hit & has_box)
+        hit_parts.append((rows + start, cols, hit_t[rows, cols]))
+
+    near_bullets = np.concatenate([p[0] for p in near_parts])
+    near_units = np.concatenate([p[1] for p in near_parts])
+    hit_bullets = np.concatenate([p[0] for p in hit_parts])
+    hit_units = np.concatenate([p[1] for p in hit_parts])
+    hit_times = np.concatenate([p[2] for p in hit_parts])
+    order = np.lexsort((hit_units, hit_times, hit_bullets))
+    return near_bullets, near_units, hit_bullets[order], hit_units[order], hit_times[order]
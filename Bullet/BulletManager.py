@@ -4,45 +4,245 @@ from Map.GameMap import *
 from GameMode import *
 from Bullet.NormalShell.NormalShell import *
 from Unit.EnemyAI import *
+from Bullet.BulletStore import BulletStore
+from Bullet.BulletContacts import find_bullet_contacts, sweep_bullet_contacts
+from Bullet.ExplosionResolver import resolve_explosions
+from Unit.BaseUnit import sight_matrix
+from itertools import compress
+import numpy as np
+import heapq
 
 class BulletManager:
 
     def __init__(self):
-        self.bullets = []  # 存储所有活跃的子弹
+        self.bullets = []  # 存储所有活跃的子弹（第 i 颗子弹的状态保存在 store 的第 i 个下标）
         self.to_remove = []  # 存储待移除的子弹
+        self.store = BulletStore()
+        self.clock = 0.0            # 子弹系统的累计时间，地形撞击事件按此计时
+        self.terrain_events = []    # (最早撞击地形的时刻, 序号, 子弹) 的最小堆
+        self._event_count = 0
+        self._unscheduled = []      # 尚未计算（或需要重新计算）地形撞击时刻的子弹
+        self._changed_tiles = []    # 上一帧以来被替换的地块 (row, col)
+        self._terrain_map = None    # 已注册地块变化回调的地图
         
     def add_bullet(self, bullet):
         if bullet:
+            self.store.attach(bullet)
             self.bullets.append(bullet)
+            self._unscheduled.append(bullet)
             if BULLET_INFO_TEXT or DEBUG_MODE:
                 print(f"子弹发射: ID={bullet.id}, 位置={bullet.position}")
     
     def update(self, delta_time, unit_manager, game_map):
-        self.to_remove.clear()
+        # 新子弹（以及途经地块发生变化的子弹）计算地形撞击时刻；本帧可能撞到地形的子弹开始逐帧检测
+        self._schedule_terrain_impacts(game_map)
+        self._arm_terrain_checks(self.clock + delta_time)
         
-        for bullet in self.bullets:
-            # 更新子弹状态
-            if not bullet.update(delta_time, unit_manager, game_map):
-                # 子弹不再活跃，标记为待移除
-                if bullet in self.bullets and bullet not in self.to_remove:
-                    self.to_remove.append(bullet)
+        # 批量更新寿命、移动与爆炸计时
+        moved, keep = self.store.advance(delta_time, self.bullets)
+        self.clock += delta_time
+        
+        # 移动过的子弹按列表顺序逐个处理碰撞（先命中的子弹会影响后面子弹的结果）；
+        # 批量粗筛后，附近没有单位、也没有撞到障碍物的子弹无需逐个处理
+        explosions = []
+        self._update_collisions(np.flatnonzero(moved), keep, unit_manager, game_map, explosions)
+        
+        # 本帧命中单位后爆炸的子弹统一结算爆炸伤害
+        if explosions:
+            resolve_explosions(explosions, unit_manager)
         
         # 移除不再活跃的子弹
-        for bullet in self.to_remove:
-            if bullet in self.bullets:
-                self.bullets.remove(bullet)
-                if BULLET_INFO_TEXT or DEBUG_MODE:
+        if not keep.all():
+            self.bullets, self.to_remove = self.store.compact(self.bullets, keep)
+            if BULLET_INFO_TEXT or DEBUG_MODE:
+                for bullet in self.to_remove:
                     print(f"子弹移除: ID={bullet.id}")
+        else:
+            self.to_remove = []
     
-    def draw(self, surface, camera_offset):
+    def visible_bullet_ids(self, observers) -> list:
+        """各观察单位视野内的子弹id集合：按 store 中的坐标一次批量判断，不逐个读取子弹的 position"""
+        n = self.store.count
+        if n == 0:
+            return [set() for _ in observers]
+        a = self.store.arrays
+        seen = sight_matrix(observers, self.bullets, a['x'][:n], a['y'][:n])
+        ids = [bullet.id for bullet in self.bullets]
+        return [set(compress(ids, row)) for row in seen.tolist()]
+
+    # ----------------- 地形撞击事件 -----------------
+    def _on_tile_changed(self, row, col):
+        self._changed_tiles.append((row, col))
+
+    def _flight_paths(self, slots):
+        """子弹从当前位置直线飞行到寿命耗尽为止的线段，以及剩余寿命"""
+        a = self.store.arrays
+        starts = np.column_stack((a['x'][slots], a['y'][slots]))
+        remaining = np.maximum(a['lifetime'][slots], 0.0)
+        ends = starts + np.column_stack((a['vx'][slots], a['vy'][slots])) * remaining[:, None]
+        # 外扩 1 像素：碰撞箱取整造成的偏移不会让实际撞击早于计算结果
+        half_sizes = np.column_stack((a['width'][slots], a['height'][slots])) / 2 + 1
+        return starts, ends, half_sizes, remaining
+
+    def _schedule_terrain_impacts(self, game_map):
+        """
+        对新子弹沿飞行路线做一次地形投射，得到最早可能撞到地形的时刻并加入事件堆；
+        此前这些子弹不做地形碰撞检测。地块变化时重新计算途经该地块的子弹。
+        """
+        if game_map is not self._terrain_map:
+            if self._terrain_map is not None:
+                self._terrain_map.remove_tile_listener(self._on_tile_changed)
+            game_map.add_tile_listener(self._on_tile_changed)
+            self._terrain_map = game_map
+            self._unscheduled = list(self.bullets)
+            self._changed_tiles = []
+        if self._changed_tiles:
+            self._unscheduled.extend(self._bullets_crossing_tiles(self._changed_tiles, game_map.tile_size))
+            self._changed_tiles = []
+        if not self._unscheduled:
+            return
+
+        bullets = [bullet for bullet in dict.fromkeys(self._unscheduled)
+                   if bullet.bullet_store is self.store and not bullet.has_exploded]
+        self._unscheduled = []
+        if not bullets:
+            return
+        a = self.store.arrays
+        slots = np.fromiter((bullet.slot for bullet in bullets), dtype=np.int64, count=len(bullets))
+        starts, ends, half_sizes, remaining = self._flight_paths(slots)
+        hit, t = game_map.sweep_batch(starts, ends, half_sizes, blocking='bullet')
+        impact = np.where(hit, self.clock + t * remaining, np.inf)
+        a['impact_time'][slots] = impact
+        a['terrain_armed'][slots] = False
+        for bullet, time in zip(bullets, impact.tolist()):
+            if time != np.inf:
+                heapq.heappush(self.terrain_events, (time, self._event_count, bullet))
+                self._event_count += 1
+
+    def _bullets_crossing_tiles(self, tiles, tile_size):
+        """剩余飞行路线经过指定地块的子弹"""
+        n = self.store.count
+        if n == 0:
+            return []
+        starts, ends, half_sizes, _ = self._flight_paths(np.arange(n))
+        lower = np.minimum(starts, ends) - half_sizes
+        upper = np.maximum(starts, ends) + half_sizes
+        crossing = np.zeros(n, dtype=bool)
+        for row, col in set(tiles):
+            left, top = col * tile_size, row * tile_size
+            crossing |= ((lower[:, 0] < left + tile_size) & (upper[:, 0] > left) &
+                         (lower[:, 1] < top + tile_size) & (upper[:, 1] > top))
+        return [self.bullets[i] for i in np.flatnonzero(crossing)]
+
+    def _arm_terrain_checks(self, until):
+        """撞击时刻不晚于 until 的子弹开始逐帧检测地形碰撞（已移除或已重新计算的事件直接丢弃）"""
+        events = self.terrain_events
+        a = self.store.arrays
+        while events and events[0][0] <= until + 1e-9:
+            time, _, bullet = heapq.heappop(events)
+            if bullet.bullet_store is self.store and a['impact_time'][bullet.slot] == time:
+                a['terrain_armed'][bullet.slot] = True
+
+    # ----------------- 碰撞 -----------------
+    def _update_collisions(self, moved, keep, unit_manager, game_map, explosions):
+        """对移动过的子弹（下标 moved）批量粗筛潜在伤害、单位碰撞与障碍物碰撞，再按列表顺序处理候选子弹"""
+        if len(moved) == 0:
+            return
+        keep[moved] = True      # 没有任何碰撞候选的子弹继续飞行
+        units = [unit for unit in unit_manager.units if unit.is_alive]
+        unit_xy = np.array([unit.position for unit in units], dtype=np.float64).reshape(-1, 2)
+        unit_boxes = np.zeros((len(units), 4), dtype=np.int64)
+        for k, unit in enumerate(units):
+            box = unit.bounding_box
+            if box is not None:
+                unit_boxes[k] = (box.x, box.y, box.width, box.height)
+        if SWEPT_BULLET_COLLISION:
+            self._update_swept_collisions(moved, keep, unit_manager, game_map, units, unit_xy, unit_boxes, explosions)
+            return
+
+        a = self.store.arrays
+        lefts = a['box_left'][moved]
+        tops = a['box_top'][moved]
+        widths = np.trunc(a['width'][moved]).astype(np.int64)      # 与 pygame.Rect 对浮点尺寸取整一致
+        heights = np.trunc(a['height'][moved]).astype(np.int64)
+        # 只有到达地形撞击时刻的子弹需要检测障碍物
+        armed = a['terrain_armed'][moved]
+        blocked = np.zeros(len(moved), dtype=bool)
+        if armed.any():
+            blocked[armed] = game_map.check_collision_batch(lefts[armed], tops[armed], widths[armed],
+                                                            heights[armed], blocking='bullet')
+        near_bullets, near_units, hit_bullets, hit_units = find_bullet_contacts(
+            np.column_stack((a['x'][moved], a['y'][moved])),
+            np.column_stack((lefts, tops, widths, heights)),
+            unit_xy, unit_boxes, POTENTIAL_DAMAGE_THRESHOLD)
+
+        candidates = np.union1d(np.union1d(near_bullets, hit_bullets), np.flatnonzero(blocked))
+        near_bounds = zip(np.searchsorted(near_bullets, candidates).tolist(),
+                          np.searchsorted(near_bullets, candidates, side='right').tolist())
+        hit_bounds = zip(np.searchsorted(hit_bullets, candidates).tolist(),
+                         np.searchsorted(hit_bullets, candidates, side='right').tolist())
+        near_units = near_units.tolist()
+        hit_units = hit_units.tolist()
+        blocked = blocked.tolist()
+        moved = moved.tolist()
+        for j, (near_start, near_end), (hit_start, hit_end) in zip(candidates.tolist(), near_bounds, hit_bounds):
+            contacts = ([units[u] for u in near_units[near_start:near_end]],
+                        [units[u] for u in hit_units[hit_start:hit_end]],
+                        blocked[j])
+            i = moved[j]
+            keep[i] = self.bullets[i]._update_collisions(unit_manager, game_map, contacts, explosions)
+        self._pull_slots([moved[j] for j in candidates.tolist()])
+
+    def _update_swept_collisions(self, moved, keep, unit_manager, game_map, units, unit_xy, unit_boxes, explosions):
+        """连续碰撞检测：按子弹本帧的移动线段求首次接触的单位或障碍物"""
+        a = self.store.arrays
+        starts = np.column_stack((a['start_x'][moved], a['start_y'][moved]))
+        ends = np.column_stack((a['x'][moved], a['y'][moved]))
+        half_sizes = np.column_stack((a['width'][moved], a['height'][moved])) / 2
+        armed = a['terrain_armed'][moved]
+        blocked = np.zeros(len(moved), dtype=bool)
+        obstacle_times = np.ones(len(moved), dtype=np.float64)
+        if armed.any():
+            blocked[armed], obstacle_times[armed] = game_map.sweep_batch(
+                starts[armed], ends[armed], half_sizes[armed], blocking='bullet')
+        near_bullets, near_units, hit_bullets, hit_units, hit_times = sweep_bullet_contacts(
+            starts, ends, half_sizes, unit_xy, unit_boxes, POTENTIAL_DAMAGE_THRESHOLD)
+
+        candidates = np.union1d(np.union1d(near_bullets, hit_bullets), np.flatnonzero(blocked))
+        near_bounds = zip(np.searchsorted(near_bullets, candidates).tolist(),
+                          np.searchsorted(near_bullets, candidates, side='right').tolist())
+        hit_bounds = zip(np.searchsorted(hit_bullets, candidates).tolist(),
+                         np.searchsorted(hit_bullets, candidates, side='right').tolist())
+        near_units = near_units.tolist()
+        hits = list(zip(hit_times.tolist(), [units[u] for u in hit_units.tolist()]))
+        obstacle_times = np.where(blocked, obstacle_times, np.nan).tolist()
+        starts = starts.tolist()
+        moved = moved.tolist()
+        for j, (near_start, near_end), (hit_start, hit_end) in zip(candidates.tolist(), near_bounds, hit_bounds):
+            obstacle_time = obstacle_times[j]
+            i = moved[j]
+            keep[i] = self.bullets[i]._update_swept_collisions(
+                unit_manager, starts[j], [units[u] for u in near_units[near_start:near_end]],
+                hits[hit_start:hit_end], None if obstacle_time != obstacle_time else obstacle_time, explosions)
+        self._pull_slots([moved[j] for j in candidates.tolist()])
+
+    def _pull_slots(self, slots):
+        """碰撞处理可能修改了这些子弹的位置、尺寸与状态，重新写入数组（之后的地形调度与视野判断直接读取数组）"""
+        self.store.pull([self.bullets[i] for i in slots])
+
+    def draw(self, surface, camera_offset, alpha = 1.0):
         for bullet in self.bullets:
-            bullet.draw(surface, camera_offset)
+            bullet.draw(surface, camera_offset, alpha)
     
     def get_active_count(self):
         return len([b for b in self.bullets if b.is_active])
     
     def clear(self):
+        self.store.clear(self.bullets)
         self.bullets.clear()
+        self.terrain_events.clear()
+        self._unscheduled.clear()
+        self._changed_tiles.clear()
         
     def save(self):
         return [bullet.save() for bullet in self.bullets]
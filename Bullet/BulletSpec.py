@@ -0,0 +1,53 @@
+'''
+    子弹类型的静态属性（享元）
+    同一类型的所有子弹共享一个不可变的 BulletSpec，子弹对象只保存位置、寿命、碰撞状态等动态数据
+'''
+
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+from Parameter import *
+from AssetManager import get_image, get_image_size
+
+
+@dataclass(frozen=True)
+class BulletSpec:
+    image_path: Optional[str] = None                    # 子弹图片路径
+    size: Tuple[float, float] = (0.0, 0.0)              # 碰撞箱尺寸，(0, 0) 时使用图片尺寸
+    lifetime: float = 3.0                               # 最大飞行时间（射程）
+    speed_rate: float = 1.0
+    damage_rate: float = 1.0
+    cooldown: float = 0.2                               # 开火冷却时间
+    penetration: Tuple[float, ...] = (1.0, 1.0, 1.0)    # 对轻/中/重甲的伤害系数
+    is_explosive: bool = False                          # 是否为爆炸弹
+    explosion_radius: float = 0.0                       # 爆炸半径
+    explosion_damage_rate: float = 1.0                  # 爆炸伤害倍率
+    explosion_image_path: Optional[str] = None          # 爆炸效果图片路径
+    explosion_display_time: float = 0.2                 # 爆炸效果显示时间
+
+    @property
+    def speed(self) -> float:
+        return BULLET_SPEED * self.speed_rate
+
+    @property
+    def base_damage(self) -> float:
+        return BULLET_DAMAGE * self.damage_rate
+
+    @property
+    def image(self):
+        return get_image(self.image_path) if self.image_path else None
+
+    @property
+    def explosion_image(self):
+        return get_image(self.explosion_image_path) if self.explosion_image_path else None
+
+    def initial_size(self) -> Tuple[float, float]:
+        """子弹的初始尺寸：未指定尺寸时使用图片尺寸"""
+        if self.size == (0.0, 0.0) and self.image_path:
+            size = get_image_size(self.image_path)
+            if size != (0, 0):
+                return size
+        return self.size
+
+    def replace(self, **changes) -> 'BulletSpec':
+        """返回修改了部分属性的新 BulletSpec"""
+        return replace(self, **changes)
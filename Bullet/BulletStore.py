@@ -0,0 +1,152 @@
+'''
+    子弹状态的数组存储（结构数组，NumPy）
+    BulletManager 中的子弹按列表顺序占用连续的下标，子弹本身只使用普通属性。
+    位置、速度、剩余寿命、已飞行距离、爆炸计时等在子弹加入时与碰撞处理修改子弹后由 pull 写入数组，
+    每帧由 advance 批量完成寿命、移动与爆炸计时并一次性写回子弹属性；批量粗筛（BulletContacts、视野判断）直接读取数组。
+    碰撞仍按子弹列表顺序逐个处理；移除子弹时按保留掩码整体压缩数组（O(n)，保持顺序）。
+'''
+
+import numpy as np
+from typing import Dict, Tuple
+from utils import Rect
+
+
+class BulletStore:
+    FLOAT_FIELDS = ('lifetime', 'distance_traveled', 'explosion_timer')
+    BOOL_FIELDS = ('is_active', 'has_exploded')
+    VECTOR_FIELDS = {'position': ('x', 'y'), 'velocity': ('vx', 'vy'), 'size': ('width', 'height'),
+                     'previous_position': ('start_x', 'start_y')}      # 本帧移动前的位置
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = 0
+        self.count = 0                  # 已占用的下标数（等于子弹数）
+        self.arrays: Dict[str, np.ndarray] = {}
+        self._grow(capacity)
+
+    # ----------------- 存储管理 -----------------
+    def _dtypes(self) -> Dict[str, type]:
+        dtypes = {name: np.float64 for name in self.FLOAT_FIELDS}
+        dtypes.update({name: np.bool_ for name in self.BOOL_FIELDS})
+        for names in self.VECTOR_FIELDS.values():
+            dtypes.update({name: np.float64 for name in names})
+        dtypes.update({'box_left': np.int64, 'box_top': np.int64,
+                       'max_explosion_display_time': np.float64,    # 类型常量，只在加入时写入
+                       'impact_time': np.float64,       # 最早可能撞到地形的时刻（BulletManager 的时钟）
+                       'terrain_armed': np.bool_})      # 是否已到达 impact_time，需要逐帧检测地形碰撞
+        return dtypes
+
+    def _grow(self, capacity: int) -> None:
+        capacity = max(capacity, 1)
+        for name, dtype in self._dtypes().items():
+            array = np.zeros(capacity, dtype=dtype)
+            if name in self.arrays:
+                array[:self.count] = self.arrays[name][:self.count]
+            self.arrays[name] = array
+        self.capacity = capacity
+
+    def attach(self, bullet) -> None:
+        """把子弹追加到数组末尾"""
+        if self.count >= self.capacity:
+            self._grow(self.capacity * 2)
+        bullet.slot = self.count
+        bullet.bullet_store = self
+        self.arrays['max_explosion_display_time'][bullet.slot] = bullet.max_explosion_display_time
+        self.arrays['terrain_armed'][bullet.slot] = True     # 计算出撞击时刻之前按原方式逐帧检测
+        self.count += 1
+        self.pull((bullet,))
+
+    def detach(self, bullet) -> None:
+        """子弹被移除时调用，之后子弹不再对应数组中的下标"""
+        bullet.bullet_store = None
+        bullet.slot = -1
+
+    def pull(self, bullets) -> None:
+        """
+        把子弹属性的当前值写入数组：子弹加入时，以及碰撞处理直接修改了子弹的位置、尺寸与状态之后。
+        其余时候只有 advance 修改子弹，数组与属性保持一致，不需要每帧整体读入
+        """
+        a = self.arrays
+        for bullet in bullets:
+            i = bullet.slot
+            for name in self.FLOAT_FIELDS + self.BOOL_FIELDS:
+                a[name][i] = getattr(bullet, name)
+            for name, (name_x, name_y) in self.VECTOR_FIELDS.items():
+                a[name_x][i], a[name_y][i] = getattr(bullet, name)
+
+    def _push(self, bullets: list, moved: np.ndarray) -> None:
+        """把 advance 修改过的数组写回子弹属性（每颗子弹每帧写一次）"""
+        n = self.count
+        a = self.arrays
+        columns = [a[name][:n].tolist() for name in ('x', 'y', 'start_x', 'start_y', 'lifetime',
+                                                     'distance_traveled', 'explosion_timer', 'is_active')]
+        for bullet, (x, y, start_x, start_y, lifetime, distance, timer, active) in zip(bullets, zip(*columns)):
+            bullet.position = (x, y)
+            bullet.previous_position = (start_x, start_y)
+            bullet.lifetime = lifetime
+            bullet.distance_traveled = distance
+            bullet.explosion_timer = timer
+            bullet.is_active = active
+        slots = np.flatnonzero(moved)
+        boxes = zip(a['box_left'][slots].tolist(), a['box_top'][slots].tolist(),
+                    a['width'][slots].tolist(), a['height'][slots].tolist())
+        for i, (left, top, width, height) in zip(slots.tolist(), boxes):
+            bullets[i].bounding_box = Rect(left, top, width, height)
+
+    def compact(self, bullets: list, keep: np.ndarray) -> Tuple[list, list]:
+        """按保留掩码压缩数组（保持原有顺序），返回 (保留的子弹, 移除的子弹)"""
+        kept = [bullet for bullet, k in zip(bullets, keep) if k]
+        removed = [bullet for bullet, k in zip(bullets, keep) if not k]
+        for bullet in removed:
+            self.detach(bullet)
+        count = self.count
+        for name, array in self.arrays.items():
+            array[:len(kept)] = array[:count][keep]
+        for slot, bullet in enumerate(kept):
+            bullet.slot = slot
+        self.count = len(kept)
+        return kept, removed
+
+    def clear(self, bullets: list) -> None:
+        for bullet in bullets:
+            self.detach(bullet)
+        self.count = 0
+
+    # ----------------- 批量更新 -----------------
+    def advance(self, delta_time: float, bullets: list) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        对所有子弹（bullets，即 BulletManager 的子弹列表）执行 BaseBullet.update 中与碰撞无关的部分（运算顺序相同）：
+        已爆炸的子弹累加爆炸计时；飞行中的子弹减少寿命，寿命耗尽则失效，否则移动并累加飞行距离。
+        返回 (moved, keep)：moved 为本帧移动过、需要继续检查碰撞的子弹，
+        keep 为其余子弹本帧之后是否保留（moved 的子弹是否保留取决于碰撞结果）
+        """
+        n = self.count
+        a = {name: array[:n] for name, array in self.arrays.items()}
+        dt = delta_time
+        active = a['is_active'].copy()
+        exploded = active & a['has_exploded']
+        flying = active & ~a['has_exploded']
+
+        # 爆炸效果计时（计时期间仍然保留）
+        a['explosion_timer'][exploded] += dt
+        a['is_active'][exploded & (a['explosion_timer'] >= a['max_explosion_display_time'])] = False
+
+        # 寿命
+        a['lifetime'][flying] -= dt
+        expired = flying & (a['lifetime'] <= 0)
+        a['is_active'][expired] = False
+        moved = flying & ~expired
+
+        # 移动、碰撞箱与飞行距离
+        dx = a['vx'][moved] * dt
+        dy = a['vy'][moved] * dt
+        a['start_x'][:] = a['x']
+        a['start_y'][:] = a['y']
+        x = a['start_x'][moved] + dx
+        y = a['start_y'][moved] + dy
+        a['x'][moved] = x
+        a['y'][moved] = y
+        a['box_left'][moved] = np.trunc(x - a['width'][moved] / 2).astype(np.int64)
+        a['box_top'][moved] = np.trunc(y - a['height'][moved] / 2).astype(np.int64)
+        a['distance_traveled'][moved] += np.sqrt(dx ** 2 + dy ** 2)
+        self._push(bullets, moved)
+        return moved, exploded
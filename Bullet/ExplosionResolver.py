@@ -0,0 +1,107 @@
+'''
+    爆炸伤害的批量结算
+    BulletManager 在一帧内收集所有命中单位后爆炸的子弹，碰撞处理结束后统一结算：
+    每个爆炸用单位空间索引做一次半径查询，得到 (爆炸, 单位) 对后用 NumPy 一次性计算距离与伤害；
+    同一单位受到多个爆炸时按爆炸先后累计，生命值归零的那一次爆炸记为击杀，之后的爆炸不再对其造成伤害。
+    助攻按本帧的视野数据（sighted_unit_ids）统计，与 BaseUnit._handle_assistance 的规则相同。
+'''
+
+import numpy as np
+from Parameter import *
+
+
+def resolve_explosions(explosions: list, unit_manager) -> None:
+    """按列表顺序结算 explosions 中各子弹的爆炸伤害（规则与 BaseBullet.apply_explosion_damage 相同）"""
+    pair_bullets, pair_units = [], []
+    for e, bullet in enumerate(explosions):
+        if not bullet.has_exploded or not bullet.is_explosive:
+            continue
+        for unit in unit_manager.query_radius(bullet.position, bullet.explosion_radius,
+                                              exclude_team=bullet.shooter_team):
+            pair_bullets.append(e)
+            pair_units.append(unit)
+    if not pair_units:
+        return
+
+    # 距离与伤害
+    centers = np.array([explosions[e].position for e in pair_bullets], dtype=np.float64)
+    radius = np.array([explosions[e].explosion_radius for e in pair_bullets], dtype=np.float64)
+    rate = np.array([explosions[e].explosion_damage_rate for e in pair_bullets], dtype=np.float64)
+    positions = np.array([unit.position for unit in pair_units], dtype=np.float64)
+    distance = np.sqrt(((positions - centers) ** 2).sum(axis=1))
+    in_range = distance <= radius
+    if BULLET_EXPLOSION_DAMAGE_APPLY_DISTANT_FACTOR:
+        damage = BULLET_DAMAGE * rate * (1.0 - distance / radius)
+    else:
+        damage = BULLET_DAMAGE * rate
+    damage = np.where(in_range, damage, 0.0)
+
+    # 单位 -> 局部下标；按单位分组（组内保持爆炸顺序）累计伤害
+    local = {}
+    targets = []
+    for unit in pair_units:
+        if id(unit) not in local:
+            local[id(unit)] = len(targets)
+            targets.append(unit)
+    target_of = np.fromiter((local[id(unit)] for unit in pair_units), dtype=np.int64, count=len(pair_units))
+    health = np.array([unit.health for unit in targets], dtype=np.float64)
+    order = np.argsort(target_of, kind='stable')
+    grouped = damage[order]
+    cumulative = np.cumsum(grouped)
+    group_start = np.r_[0, np.flatnonzero(np.diff(target_of[order])) + 1]
+    group_offset = np.repeat(cumulative[group_start] - grouped[group_start], np.diff(np.r_[group_start, order.size]))
+    after = cumulative - group_offset
+    before = after - grouped
+    health_before = health[target_of[order]]
+    applied = np.zeros(order.size, dtype=bool)
+    killed = np.zeros(order.size, dtype=bool)
+    applied[order] = in_range[order] & (before < health_before)      # 这次爆炸之前单位仍然存活
+    killed[order] = applied[order] & (after >= health_before)
+
+    # 承受伤害与击杀
+    received = np.bincount(target_of[applied], weights=damage[applied], minlength=len(targets)).tolist()
+    for unit, amount in zip(targets, received):
+        if amount > 0:
+            unit.health -= amount
+            unit.damage_received += amount
+    amounts = damage.tolist()
+    for p in np.flatnonzero(applied).tolist():
+        explosions[pair_bullets[p]].shooter.damage_dealt += amounts[p]
+    for p in np.flatnonzero(killed).tolist():
+        unit = pair_units[p]
+        shooter = explosions[pair_bullets[p]].shooter
+        unit.health = 0
+        unit.is_alive = False
+        print(f"坦克 {unit.id} 被摧毁")
+        shooter.destroy_enemy_count += 1
+        unit.killed_by = shooter.id
+
+    _credit_assists(explosions, pair_bullets, pair_units, applied, killed, damage, unit_manager)
+
+
+def _credit_assists(explosions, pair_bullets, pair_units, applied, killed, damage, unit_manager) -> None:
+    """伤害来源的存活队友中，本帧视野内看到了受伤单位的获得助攻"""
+    hits = np.flatnonzero(applied)
+    helpers = [unit for unit in unit_manager.units if unit.is_alive]
+    if hits.size == 0 or not helpers:
+        return
+    sources = [explosions[pair_bullets[p]].shooter for p in hits.tolist()]
+    target_ids = [pair_units[p].id for p in hits.tolist()]
+    source_team = np.array([source.team for source in sources])
+    source_id = np.array([source.id for source in sources])
+    helper_team = np.array([unit.team for unit in helpers])
+    helper_id = np.array([unit.id for unit in helpers])
+    sees = np.array([[target_id in unit.sighted_unit_ids for target_id in target_ids] for unit in helpers], dtype=bool)
+    # 与 _handle_assistance 相同，只考虑 max_sight_range 内的队友
+    helper_xy = np.array([unit.position for unit in helpers], dtype=np.float64)
+    target_xy = np.array([pair_units[p].position for p in hits.tolist()], dtype=np.float64)
+    offset = helper_xy[:, None, :] - target_xy[None, :, :]
+    in_sight = np.hypot(offset[..., 0], offset[..., 1]) <= unit_manager.max_sight_range
+    credited = sees & in_sight & (helper_team[:, None] == source_team) & (helper_id[:, None] != source_id)
+    assist_damage = credited @ damage[hits]
+    assist_destroy = credited @ killed[hits].astype(np.int64)
+    for unit, amount, count in zip(helpers, assist_damage.tolist(), assist_destroy.tolist()):
+        if amount:
+            unit.assist_damage_dealt += amount
+        if count:
+            unit.assist_destroy_count += count
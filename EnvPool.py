@@ -0,0 +1,309 @@
+'''
+    多进程环境池：每个工作进程运行一个 AIControl（一个 GameManager），
+    观测、动作、奖励、结束标志等保存在一块 multiprocessing.shared_memory 共享内存中，
+    进程之间的管道只传递很短的命令（step / reset / close），不传递数组。
+
+    用法：
+        with EnvPool(num_envs=8, agent_ids=(0, 101)) as pool:
+            observations, infos = pool.reset(seed=0)             # (N, A) + observation_shape
+            observations, rewards, terminated, truncated, infos = pool.step(actions)   # actions: (N, A, 5)
+            # 异步：pool.step_async(actions) 之后做其他事情，再 pool.step_wait()
+
+    对局结束后工作进程自动重新开始（auto_reset），返回的是新对局的观测，结束时的记录在 infos[i]["final_records"] 中。
+    工作进程异常退出时（模拟途中或两次调用之间）自动重启并重新开始对局，该环境这一步视为截断（infos[i]["restarted"] 为 True）。
+    返回的数组是共享内存的视图，下一次 step 时会被覆盖，需要保留时请复制。
+    工作进程以无界面模式运行（ASSETS.headless），导入本模块不会改变主进程的模式。
+'''
+
+import multiprocessing as mp
+import os
+import sys
+import traceback
+import numpy as np
+from multiprocessing import connection, shared_memory
+from typing import List, Optional, Sequence, Tuple
+from AIControl import AIControl, DEFAULT_ROSTER
+from AssetManager import ASSETS
+from Parameter import *
+
+ACTION_SIZE = 5
+
+
+def _buffer_layout(num_envs: int, agent_count: int, observation_shape: tuple, action_type: str):
+    """共享内存中各数组的 (名称, 形状, 类型, 偏移)，以及总字节数"""
+    specs = [
+        ('observations', (num_envs, agent_count) + tuple(observation_shape), np.float32),
+        ('actions', (num_envs, agent_count, ACTION_SIZE), np.int64 if action_type == 'discrete' else np.float32),
+        ('rewards', (num_envs, agent_count), np.float32),
+        ('terminated', (num_envs,), np.bool_),
+        ('truncated', (num_envs,), np.bool_),
+        ('ticks', (num_envs,), np.int64),
+    ]
+    layout = []
+    offset = 0
+    for name, shape, dtype in specs:
+        offset = (offset + 63) // 64 * 64          # 按缓存行对齐，不同数组不共享缓存行
+        layout.append((name, shape, dtype, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return layout, max(offset, 1)
+
+
+def _map_buffers(buffer, layout) -> dict:
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+            for name, shape, dtype, offset in layout}
+
+
+def _worker(index: int, remote, memory_name: str, layout, config: dict, verbose: bool) -> None:
+    """工作进程：只读写共享数组中第 index 行；命令 (cmd, 参数)，回复 (状态, 信息)"""
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')      # 屏蔽对局中的文本输出（击毁提示等）
+    memory = shared_memory.SharedMemory(name=memory_name)
+    buffers = _map_buffers(memory.buf, layout)
+    observations, actions = buffers['observations'][index], buffers['actions'][index]
+    rewards, ticks = buffers['rewards'][index], buffers['ticks'][index:index + 1]
+    terminated, truncated = buffers['terminated'][index:index + 1], buffers['truncated'][index:index + 1]
+    ASSETS.headless = True          # 工作进程不加载图片（只影响本进程，与主进程的导入顺序无关）
+    env = AIControl(**config)
+    try:
+        while True:
+            command, argument = remote.recv()
+            if command == 'step':
+                obs, reward, done, cut, info = env.step(actions)
+                rewards[:] = reward
+                terminated[0], truncated[0] = done, cut
+                ticks[0] = env.ticks
+                if done or cut:
+                    final_records = info["records"]
+                    obs, info = env.reset()
+                    info["final_records"] = final_records
+                observations[:] = obs
+                remote.send(('ok', info))
+            elif command == 'reset':
+                obs, info = env.reset(seed=argument)
+                observations[:] = obs
+                rewards.fill(0.0)
+                terminated[0] = truncated[0] = False
+                ticks[0] = 0
+                remote.send(('ok', info))
+            elif command == 'close':
+                break
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        remote.send(('error', traceback.format_exc()))
+    finally:
+        del observations, actions, rewards, ticks, terminated, truncated, buffers
+        memory.close()
+        remote.close()
+
+
+class EnvPool:
+    def __init__(self, num_envs: Optional[int] = None, agent_ids: Sequence[int] = (0,), action_type: str = 'discrete',
+                 action_repeat: int = 1, max_ticks: int = FPS * 120, map_names='test', roster=DEFAULT_ROSTER,
+                 seed: Optional[int] = None, start_method: Optional[str] = None, verbose: bool = False,
+                 observation_type: str = 'vector', rotate_raster: bool = False):
+        """
+        :param num_envs: 工作进程数，默认为 CPU 核数
+        :param map_names: 地图名（所有环境相同）或每个环境一个地图名的列表
+        :param seed: 第 i 个环境首次创建对局时使用 seed + i
+        :param start_method: multiprocessing 的启动方式（fork / spawn / forkserver），默认使用平台默认值
+        :param observation_type: 'vector' 或 'raster'（栅格观测，见 RasterObservation），rotate_raster 同 AIControl
+        """
+        if action_type not in ('discrete', 'continuous'):
+            raise ValueError(f"Unknown action type: {action_type}")
+        self.num_envs = num_envs or os.cpu_count() or 1
+        if isinstance(map_names, str):
+            map_names = [map_names] * self.num_envs
+        if len(map_names) != self.num_envs:
+            raise ValueError("map_names must be a map name or a list with one name per environment")
+        self.agent_ids = list(agent_ids)
+        self.action_type = action_type
+        self.seed = seed
+        self.roster = list(roster)
+        self._configs = [dict(agent_ids=self.agent_ids, action_type=action_type, action_repeat=action_repeat,
+                              max_ticks=max_ticks, map_name=name, roster=self.roster,
+                              observation_type=observation_type, rotate_raster=rotate_raster)
+                         for name in map_names]
+        self.observation_shape = AIControl(**self._configs[0]).observation_shape   # 单个受控单位的观测形状
+        self.verbose = verbose
+
+        self._layout, size = _buffer_layout(self.num_envs, len(self.agent_ids), self.observation_shape, action_type)
+        self._memory = shared_memory.SharedMemory(create=True, size=size)
+        buffers = _map_buffers(self._memory.buf, self._layout)
+        self.observations = buffers['observations']
+        self.actions = buffers['actions']
+        self.rewards = buffers['rewards']
+        self.terminated = buffers['terminated']
+        self.truncated = buffers['truncated']
+        self.ticks = buffers['ticks']
+
+        self._context = mp.get_context(start_method)
+        self._remotes: List[Optional[connection.Connection]] = [None] * self.num_envs
+        self._processes: List[Optional[mp.Process]] = [None] * self.num_envs
+        self.restarts = [0] * self.num_envs         # 每个环境的工作进程重启次数
+        self._waiting = False
+        self._restarted_infos = {}      # step_async 时发现已退出并重启的环境 -> 信息
+        self._closed = False
+        for index in range(self.num_envs):
+            self._start_worker(index)
+
+    # ----------------- 工作进程管理 -----------------
+    def _start_worker(self, index: int) -> None:
+        local, remote = self._context.Pipe()
+        process = self._context.Process(target=_worker, name=f"EnvPool-{index}", daemon=True,
+                                        args=(index, remote, self._memory.name, self._layout, self._configs[index],
+                                              self.verbose))
+        process.start()
+        remote.close()
+        self._remotes[index] = local
+        self._processes[index] = process
+
+    def _restart_worker(self, index: int) -> dict:
+        """结束并重新启动第 index 个工作进程，重新开始对局"""
+        process, remote = self._processes[index], self._remotes[index]
+        remote.close()
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        self.restarts[index] += 1
+        self._start_worker(index)
+        seed = None if self.seed is None else self.seed + index + self.num_envs * self.restarts[index]
+        self._remotes[index].send(('reset', seed))
+        status, info = self._receive(index)
+        if status != 'ok':
+            raise RuntimeError(f"Environment {index} failed to restart:\n{info}")
+        return info
+
+    def _receive(self, index: int) -> Tuple[str, object]:
+        """读取第 index 个工作进程的回复；进程已退出时返回 ('crashed', 退出码)"""
+        try:
+            return self._remotes[index].recv()
+        except (EOFError, OSError):
+            self._processes[index].join()
+            return 'crashed', self._processes[index].exitcode
+
+    def _gather(self, indices: Sequence[int], restart_done: bool) -> List[dict]:
+        """等待 indices 中的工作进程回复；出错或退出的进程被重启（restart_done 时该环境记为截断）"""
+        infos: List[dict] = [{} for _ in range(self.num_envs)]
+        pending = set(indices)
+        while pending:
+            waitables = []
+            for index in pending:
+                waitables += [self._remotes[index], self._processes[index].sentinel]
+            ready = set(connection.wait(waitables))
+            for index in sorted(pending):
+                remote = self._remotes[index]
+                if remote not in ready and self._processes[index].sentinel not in ready:
+                    continue
+                pending.discard(index)
+                if remote in ready or remote.poll():
+                    status, info = self._receive(index)
+                else:
+                    self._processes[index].join()
+                    status, info = 'crashed', self._processes[index].exitcode
+                if status == 'ok':
+                    infos[index] = info
+                    continue
+                infos[index] = self._recover(index, info, restart_done)
+        return infos
+
+    def _recover(self, index: int, error, restart_done: bool) -> dict:
+        """重启出错或退出的第 index 个工作进程，返回新对局的信息（restart_done 时该环境记为截断）"""
+        info = self._restart_worker(index)
+        info["restarted"] = True
+        info["error"] = error
+        if restart_done:
+            self.rewards[index] = 0.0
+            self.terminated[index] = False
+            self.truncated[index] = True
+        return info
+
+    def _send(self, index: int, command: str, argument, restart_done: bool) -> Optional[dict]:
+        """
+        向第 index 个工作进程发送命令。进程在两次调用之间（空闲时）已经退出的话，按 _gather 的方式重启，
+        返回重启后的信息（该进程不会回复这条命令）；发送成功时返回 None
+        """
+        process = self._processes[index]
+        if process.is_alive():
+            try:
+                self._remotes[index].send((command, argument))
+                return None
+            except (BrokenPipeError, OSError):
+                pass
+        process.join()
+        return self._recover(index, ('crashed', process.exitcode), restart_done)
+
+    # ----------------- 环境接口 -----------------
+    def reset(self, seed: Optional[int] = None) -> Tuple[np.ndarray, List[dict]]:
+        """重新开始所有环境的对局（seed 不为 None 时第 i 个环境使用 seed + i）"""
+        if self._waiting:
+            self.step_wait()
+        if seed is not None:
+            self.seed = seed
+        restarted = {}
+        for index in range(self.num_envs):
+            seed_i = None if self.seed is None else self.seed + index
+            info = self._send(index, 'reset', seed_i, restart_done=False)
+            if info is not None:
+                restarted[index] = info
+                self._remotes[index].send(('reset', seed_i))     # 重启后的进程按要求的种子重新开始
+        infos = self._gather(range(self.num_envs), restart_done=False)
+        for index, info in restarted.items():
+            infos[index].update(restarted=True, error=info["error"])
+        return self.observations, infos
+
+    def step_async(self, actions) -> None:
+        """写入动作 (N, A, 5) 并通知所有工作进程开始模拟，不等待结果"""
+        if self._waiting:
+            raise RuntimeError("step_async called again before step_wait")
+        self.actions[:] = actions
+        self._restarted_infos = {}
+        for index in range(self.num_envs):
+            info = self._send(index, 'step', None, restart_done=True)
+            if info is not None:
+                self._restarted_infos[index] = info
+        self._waiting = True
+
+    def step_wait(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[dict]]:
+        """等待 step_async 的结果，返回 (观测, 奖励, 终止, 截断, 信息列表)"""
+        if not self._waiting:
+            raise RuntimeError("step_wait called without step_async")
+        infos = self._gather([index for index in range(self.num_envs) if index not in self._restarted_infos],
+                             restart_done=True)
+        for index, info in self._restarted_infos.items():
+            infos[index] = info
+        self._waiting = False
+        return self.observations, self.rewards, self.terminated, self.truncated, infos
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        if self._waiting:
+            self._gather([index for index in range(self.num_envs) if index not in self._restarted_infos],
+                         restart_done=False)
+            self._waiting = False
+        for remote in self._remotes:
+            try:
+                remote.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process, remote in zip(self._processes, self._remotes):
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            remote.close()
+        del self.observations, self.actions, self.rewards, self.terminated, self.truncated, self.ticks
+        self._memory.close()
+        self._memory.unlink()
+        self._closed = True
+
+    def __enter__(self) -> 'EnvPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -9,18 +9,50 @@ from Unit.Tank.Tank import *
 from Unit.Archie.Archie import *
 from Unit.Plane.Plane import *
 from GameMode import *
+from AssetManager import ASSETS
+import hashlib
+import random
+import time
 
 class GameManager:
-    def __init__ (self, game_map:GameMap = create_empty_map(), unit_manager = UnitManager(), bullet_manager = BulletManager()):
-        self.game_map = game_map
-        self.unit_manager = unit_manager
-        self.bullet_manager = bullet_manager
+    def __init__ (self, game_map:GameMap = None, unit_manager = None, bullet_manager = None, seed = None):
+        # 对局自己的随机数生成器：同一个 seed 的对局可以逐帧复现（seed 为 None 时使用系统熵）
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        # 默认参数每次新建，避免多个 GameManager 共享同一个管理器
+        self.game_map = game_map if game_map is not None else create_empty_map()
+        self.unit_manager = unit_manager if unit_manager is not None else UnitManager()
+        self.bullet_manager = bullet_manager if bullet_manager is not None else BulletManager()
         
         self.camera_offset = [0.0, 0.0]
         self.camera_speed = 5
         
         self.time = 0.0        # 游戏时间
         self.print_record_timer = 0.0
+        
+        # 固定步长的模拟循环
+        self.fixed_delta_time = 1.0 / FPS       # 每个模拟步的时长
+        self.time_scale = ACC                   # 游戏时间相对真实时间的倍率
+        self.max_catch_up_steps = MAX_CATCH_UP_STEPS
+        self.accumulator = 0.0                  # 尚未模拟的游戏时间
+        self.render_alpha = 1.0                 # 绘制插值比例（剩余时间 / 步长）
+        self.turbo = False                      # 加速模式：不绘制，尽可能快地模拟
+
+        self.ticks = 0                          # 已执行的模拟步数
+        self.record_state_hash = RECORD_STATE_HASH
+        self.state_hashes = []                  # 每步结束后的状态哈希（record_state_hash 为 True 时记录）
+
+        self.load_assets()
+
+    def load_assets(self):
+        # 预加载全部图片，之后生成单位和开火都不再读取磁盘（无界面模式下不需要图片）
+        if ASSETS.headless:
+            return
+        ASSETS.preload_directories(ASSET_DIRECTORIES)
+        ASSETS.convert_all()
+        if USE_TEXTURE_ATLAS:
+            ASSETS.build_atlas()
 
     def update(self, delta_time):
         self.time += delta_time
@@ -28,15 +60,74 @@ class GameManager:
         self.game_map.update(delta_time) if self.game_map != None else None
         self.unit_manager.update(delta_time, self.unit_manager, self.bullet_manager, self.game_map)
         self.bullet_manager.update(delta_time, self.unit_manager, self.game_map)
+        self.ticks += 1
+        if self.record_state_hash:
+            self.state_hashes.append(self.state_hash())
+
+    def state_hash(self) -> str:
+        """
+        当前模拟状态的哈希：游戏时间，全部单位的运动状态、生命、计时器与记录，全部子弹的运动状态。
+        两次运行逐帧的哈希相同即说明模拟结果逐位一致
+        """
+        units = [unit for unit in self.unit_manager.get_all_units() if unit is not None]
+        unit_state = np.array([(unit.id, unit.position[0], unit.position[1], unit.speed, unit.direction_angle,
+                                unit.turret_direction_angle, unit.health, unit.is_alive, unit.fire_cooldown,
+                                unit.reload_timer, unit.damage_dealt, unit.damage_received, unit.potential_damage)
+                               for unit in units], dtype=np.float64)
+        bullets = self.bullet_manager.bullets
+        bullet_state = np.array([(bullet.position[0], bullet.position[1], bullet.velocity[0], bullet.velocity[1],
+                                  bullet.lifetime, bullet.is_active, bullet.has_exploded)
+                                 for bullet in bullets], dtype=np.float64)
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(np.float64(self.time).tobytes())
+        digest.update(unit_state.tobytes())
+        digest.update(bullet_state.tobytes())
+        digest.update('\0'.join(bullet.id for bullet in bullets).encode())
+        return digest.hexdigest()
+
+    def advance(self, frame_time):
+        """
+        按真实经过的时间 frame_time（秒）推进游戏：时间累加到 accumulator，
+        每满一个 fixed_delta_time 执行一次 update；一次最多补算 max_catch_up_steps 步，
+        剩余不足一步的时间用于绘制插值。返回本次执行的模拟步数
+        """
+        step = self.fixed_delta_time
+        self.accumulator += frame_time * self.time_scale
+        steps = 0
+        while self.accumulator >= step and steps < self.max_catch_up_steps:
+            self.update(step)
+            self.accumulator -= step
+            steps += 1
+        if self.accumulator >= step:
+            self.accumulator %= step        # 追不上的时间直接丢弃，游戏时间变慢而不是卡死
+        self.render_alpha = self.accumulator / step
+        return steps
+
+    def run_turbo(self, budget = TURBO_FRAME_BUDGET):
+        """加速模式：在 budget 秒的真实时间内尽可能多地执行模拟步（不绘制），返回执行的步数"""
+        step = self.fixed_delta_time
+        start = time.perf_counter()
+        steps = 0
+        while True:
+            self.update(step)
+            steps += 1
+            if time.perf_counter() - start >= budget:
+                break
+        self.accumulator = 0.0
+        self.render_alpha = 1.0
+        return steps
 
-    def draw(self, screen, camera_offset = None):
+    def draw(self, screen, camera_offset = None, alpha = None):
+        """绘制地图、单位和子弹；alpha 为插值比例，默认使用 advance 计算的 render_alpha"""
         if camera_offset == None:
             camera_offset = self.camera_offset
         if camera_offset == None:
             return
+        if alpha is None:
+            alpha = self.render_alpha
         self.game_map.draw(screen, camera_offset) if self.game_map != None else None
-        self.unit_manager.draw(screen, camera_offset)
-        self.bullet_manager.draw(screen, camera_offset)
+        self.unit_manager.draw(screen, camera_offset, alpha = alpha)
+        self.bullet_manager.draw(screen, camera_offset, alpha)
         
     def set_game_map(self, game_map:GameMap):
         self.game_map = game_map
@@ -48,7 +139,7 @@ class GameManager:
         self.game_map = create_empty_map()
     
     def set_random_map(self):
-        self.game_map = create_random_map()
+        self.game_map = create_random_map(rng=self.rng)
         
     def set_test_map(self):
         self.game_map = create_test_map()
@@ -162,42 +253,42 @@ class GameManager:
         
     def add_player_tank(self, position=(0,0), unit_id = None, usingAI = False, visible = True):
         if unit_id is None:
-            unit_id = len(self.unit_manager.units)
+            unit_id = self.unit_manager.new_unit_id()
         tank = create_player_tank(unit_id, position, usingAI, visible)
         self.add_unit(tank)
         return tank
         
     def add_enemy_tank(self, position=(0,0), unit_id = None, usingAI = False, visible = True):
         if unit_id is None:
-            unit_id = len(self.unit_manager.units)
+            unit_id = self.unit_manager.new_unit_id()
         tank = create_enemy_tank(unit_id, position, usingAI, visible)
         self.add_unit(tank)
         return tank
     
     def add_player_archie(self, position=(0,0), unit_id = None, usingAI = False, visible = True):
         if unit_id is None:
-            unit_id = len(self.unit_manager.units)
+            unit_id = self.unit_manager.new_unit_id()
         archie = create_player_archie(unit_id, position, usingAI, visible)
         self.add_unit(archie)
         return archie
     
     def add_enemy_archie(self, position=(0,0), unit_id = None, usingAI = False, visible = True):
         if unit_id is None:
-            unit_id = len(self.unit_manager.units)
+            unit_id = self.unit_manager.new_unit_id()
         archie = create_enemy_archie(unit_id, position, usingAI, visible)
         self.add_unit(archie)
         return archie
     
     def add_player_plane(self, position=(0,0), unit_id = None, usingAI = False, visible = True):
         if unit_id is None:
-            unit_id = len(self.unit_manager.units)
+            unit_id = self.unit_manager.new_unit_id()
         plane = create_player_plane(unit_id, position, usingAI, visible)
         self.add_unit(plane)
         return plane
     
     def add_enemy_plane(self, position=(0,0), unit_id = None, usingAI = False, visible = True):
         if unit_id is None:
-            unit_id = len(self.unit_manager.units)
+            unit_id = self.unit_manager.new_unit_id()
         plane = create_enemy_plane(unit_id, position, usingAI, visible)
         self.add_unit(plane)
         return plane
@@ -220,7 +311,7 @@ class GameManager:
             self.print_record_timer = 0
             print("time: " + str(int(self.time)))
             if UNIT_RECORD_TEXT or DEBUG_MODE:
-                for unit in self.unit_manager.units:
+                for unit in self.unit_manager.get_all_units():
                     if unit is not None:
                         print(unit.get_record())
             if PRINT_VISIBLE_UNIT or DEBUG_MODE:
@@ -3,7 +3,10 @@
     主要是控制可显示的信息
 '''
 
+import os
+
 DEBUG_MODE = False                  # 一键开启调试模式
+HEADLESS = os.environ.get('JACKAL_HEADLESS') == '1'    # 无界面模式的默认值（环境变量 JACKAL_HEADLESS=1），运行时以 ASSETS.headless 为准
 
 DRAW_HEALTH_BAR = True              # 绘制坦克血条
 DRAW_SIGHT_RANGE = False             # 绘制坦克视野范围
@@ -22,4 +25,13 @@ PRINT_VISIBLE_UNIT = False          # 打印unit_0的可见单位（包含视野
 
 AUTO_COMMUNICATE = True             # 自动通信
 
+MERGE_OBSTACLE_RECTS = True         # 将相邻的阻挡地块合并为尽量大的矩形（分别用于单位和子弹障碍物）
+USE_LOS_TABLE = True                # 视线检测使用预计算的地块视线表（按所在地块近似；大地图没有缓存时退回线段检测）
+SAVE_LOS_TABLE = False              # 将视线表缓存到 Map/saved 中地图文件旁（*.los.npz）
+USE_UNIT_STORE = False              # 单位状态保存在 NumPy 数组中，每帧批量更新运动（视野按本帧移动前的位置计算）
+SWEPT_BULLET_COLLISION = False      # 子弹按本帧移动线段做连续碰撞检测（大时间步长下不会穿过单位和障碍物）
+RECORD_STATE_HASH = False           # 每个模拟步结束后记录状态哈希（GameManager.state_hashes，用于逐帧比对两次运行）
+
 USE_TEAR_DROP_VISION = False        # 使用水滴形视野，当此项为false时使用圆形视野
+
+USE_TEXTURE_ATLAS = False           # 将所有图片打包到一张纹理图集中（图片以图集子表面的形式共享）
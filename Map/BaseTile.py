@@ -2,12 +2,12 @@
     地块的基础类
 '''
 
-import pygame
 import os
 import random
 from typing import List, Tuple, Optional
 from Parameter import *
-from utils import load_image, get_next_filename
+from utils import get_next_filename, Rect
+from AssetManager import get_image
 
 class BaseTile:
     def __init__(self, id=None, x=0.0, y=0.0, tile_size=64, name="base", letter='?', image_path=None,
@@ -26,12 +26,12 @@ class BaseTile:
         self.x = x                      # 世界坐标左上角 x
         self.y = y
         self.tile_size = tile_size
-        self.rect = pygame.Rect(x, y, tile_size, tile_size)
+        self.rect = Rect(x, y, tile_size, tile_size)
 
         self.name = name
         self.letter = letter
         self.image_path = image_path
-        self.image = load_image(image_path) if image_path else None
+        self.image = get_image(image_path) if image_path else None
 
         # 独特属性
         self.blocks_bullet = blocks_bullet                                                  # 是否阻挡子弹
@@ -51,7 +51,7 @@ class BaseTile:
         self.id = id
         self.current_health = self.max_health               # 当前生命值
 
-    def draw(self, surface: pygame.Surface, camera_offset: Tuple[float, float] = (0, 0)) -> None:
+    def draw(self, surface: 'pygame.Surface', camera_offset: Tuple[float, float] = (0, 0)) -> None:
         """绘制地块到表面"""
         if self.image:
             screen_x = self.x - camera_offset[0]
@@ -14,8 +14,11 @@
     3. random_map:          随机地图。地图边缘是障碍物，内部随机生成障碍物
 '''
 
-import pygame
 from Map.BaseTile import BaseTile
+from Map.ObstacleGrid import ObstacleGrid
+from Map.LineOfSight import LineOfSightTable
+from Map.Raycast import raycast_grid, sweep_grid
+import numpy as np
 from Map.FlatTile.FlatTile import *
 from Map.BarrierTile.BarrierTile import *
 from Map.WaterTile.WaterTile import *
@@ -25,6 +28,7 @@ from typing import List, Tuple, Optional
 import os
 from Parameter import *
 from GameMode import *
+from AssetManager import ASSETS
 from utils import *
 import random
 
@@ -36,15 +40,30 @@ CHAR_TO_TILE = {
     't': TrapTile
 }
 
+TILE_TYPES = ['flat', 'barrier', 'water', 'sand', 'trap']     # 地块类型编号（tile_type_grid 中的值，未知类型为 -1）
+
 class GameMap:
-    def __init__(self, map_data=None, tile_size: int = 64):
+    def __init__(self, map_data=None, tile_size: int = 64, merge_obstacles: bool = MERGE_OBSTACLE_RECTS):
         self.tile_size = tile_size
+        self.merge_obstacles = merge_obstacles  # 是否将相邻的阻挡地块合并为尽量大的矩形
         self.tiles = []                      # 二维地块列表
         self.unit_obstacles = []             # 阻挡单位的矩形列表
         self.bullet_obstacles = []           # 阻挡子弹的矩形列表
+        self.unit_obstacle_grid = ObstacleGrid(tile_size)       # 单位障碍物的网格索引
+        self.bullet_obstacle_grid = ObstacleGrid(tile_size)     # 子弹障碍物的网格索引
+        self.unit_block_grid = np.zeros((0, 0), dtype=bool)     # 地块是否阻挡单位 (height, width)
+        self.bullet_block_grid = np.zeros((0, 0), dtype=bool)   # 地块是否阻挡子弹 (height, width)
+        self.tile_type_grid = np.zeros((0, 0), dtype=np.int8)   # 地块类型编号（TILE_TYPES 中的下标）(height, width)
+        self._unit_block_rows = [[0]]                           # 阻挡地块数量的二维前缀和（Python 列表，见 _rect_blocked）
+        self._bullet_block_rows = [[0]]
         self.width = 0
         self.height = 0
         self.map_surface = None              # 地图表面（用于快速绘制）
+        self._dirty_tiles = set()            # 需要重新绘制到地图表面的地块 (row, col)
+        self.file_name = None                # 从文件加载时的文件名（用于保存视线表等缓存）
+        self.los_table = None                # 地块之间的视线表（AI 单位加入时由 prepare_line_of_sight_table 准备）
+        self._los_prepared = False           # 是否已经尝试准备视线表（大地图没有缓存时保持为 None）
+        self.tile_listeners = []             # 地块被替换时的回调 callback(row, col)
 
         if map_data:
             if len(map_data) > 0:
@@ -68,8 +87,6 @@ class GameMap:
         self.height = len(map_strings)
         self.width = len(map_strings[0]) if map_strings else 0
         self.tiles = []
-        self.unit_obstacles.clear()
-        self.bullet_obstacles.clear()
 
         for row_idx, row_str in enumerate(map_strings):
             tile_row = []
@@ -77,25 +94,23 @@ class GameMap:
                 x = col_idx * self.tile_size
                 y = row_idx * self.tile_size
                 tile_class = CHAR_TO_TILE.get(ch, FlatTile)   # 未知字符默认平地
-                print(x,y,ch)
                 if not isinstance(tile_class, type):
                     raise TypeError(f"Expected a class, got {type(tile_class)}")
                 tile = tile_class(x, y, self.tile_size)
                 tile_row.append(tile)
 
-                # 根据属性加入障碍物列表
-                if tile.blocks_unit:
-                    self.unit_obstacles.append(tile.rect)
-                if tile.blocks_bullet:
-                    self.bullet_obstacles.append(tile.rect)
-
             self.tiles.append(tile_row)
 
+        self._update_obstacles_from_tiles()
         self._create_map_surface()
         self._render_all()
 
     def _create_map_surface(self) -> None:
         """创建地图表面"""
+        if ASSETS.headless:
+            self.map_surface = None
+            return
+        import pygame
         self.map_surface = pygame.Surface((self.width * self.tile_size, self.height * self.tile_size))
 
     def _render_tile(self, row: int, col: int) -> None:
@@ -109,23 +124,135 @@ class GameMap:
         for row_idx, row in enumerate(self.tiles):
             for col_idx, _ in enumerate(row):
                 self._render_tile(row_idx, col_idx)
+        self._dirty_tiles.clear()
+
+    def _render_dirty_tiles(self) -> None:
+        """只重新绘制发生变化的地块"""
+        if not self._dirty_tiles or self.map_surface is None:
+            return
+        for row, col in self._dirty_tiles:
+            tile = self.tiles[row][col]
+            # 先清除旧地块的像素，防止新地块没有图像或带透明通道时残留
+            self.map_surface.fill((0, 0, 0), (tile.x, tile.y, self.tile_size, self.tile_size))
+            self._render_tile(row, col)
+        self._dirty_tiles.clear()
+
+    def mark_tile_dirty(self, row: int, col: int) -> None:
+        """标记地块外观已变化，下一次绘制时重新渲染到地图表面"""
+        if 0 <= row < self.height and 0 <= col < self.width:
+            self._dirty_tiles.add((row, col))
+
+    def set_tile(self, row: int, col: int, tile: BaseTile) -> None:
+        """替换指定位置的地块，并同步障碍物列表与地图表面"""
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return
+        tile.x = col * self.tile_size
+        tile.y = row * self.tile_size
+        tile.rect = Rect(tile.x, tile.y, self.tile_size, self.tile_size)
+        self.tiles[row][col] = tile
+        self._update_obstacles_from_tiles()
+        self.mark_tile_dirty(row, col)
+        if self.los_table is not None:
+            self.los_table.invalidate_tile(row, col)
+        for callback in self.tile_listeners:
+            callback(row, col)
+
+    def add_tile_listener(self, callback) -> None:
+        """注册地块变化回调：set_tile 替换地块后调用 callback(row, col)"""
+        if callback not in self.tile_listeners:
+            self.tile_listeners.append(callback)
+
+    def remove_tile_listener(self, callback) -> None:
+        if callback in self.tile_listeners:
+            self.tile_listeners.remove(callback)
 
     def _update_obstacles_from_tiles(self) -> None:
         """根据当前地块重新生成障碍物列表"""
         self.unit_obstacles.clear()
         self.bullet_obstacles.clear()
-        for row in self.tiles:
-            for tile in row:
-                if tile.blocks_unit:
-                    self.unit_obstacles.append(tile.rect)
-                if tile.blocks_bullet:
-                    self.bullet_obstacles.append(tile.rect)
-
-    def draw(self, surface: pygame.Surface, camera_offset: List[float] = [0, 0]) -> None:
-        """绘制地图"""
-        for row in self.tiles:
-            for tile in row:
-                tile.draw(surface, camera_offset)
+        if self.merge_obstacles:
+            self.unit_obstacles.extend(self._merge_blocking_tiles(lambda tile: tile.blocks_unit))
+            self.bullet_obstacles.extend(self._merge_blocking_tiles(lambda tile: tile.blocks_bullet))
+        else:
+            for row in self.tiles:
+                for tile in row:
+                    if tile.blocks_unit:
+                        self.unit_obstacles.append(tile.rect)
+                    if tile.blocks_bullet:
+                        self.bullet_obstacles.append(tile.rect)
+        self._build_obstacle_index()
+
+    def _merge_blocking_tiles(self, is_blocking) -> List[Rect]:
+        """
+        贪心合并：从左上角开始，先向右延伸出最长的阻挡段，再逐行向下延伸，
+        把连成一片的阻挡地块合并为尽量大的矩形。合并后的矩形覆盖的区域与逐个地块完全相同。
+        """
+        rows = len(self.tiles)
+        blocking = [[is_blocking(tile) for tile in row] for row in self.tiles]
+        used = [[False] * len(row) for row in self.tiles]
+
+        def free(r: int, c: int) -> bool:
+            return c < len(blocking[r]) and blocking[r][c] and not used[r][c]
+
+        rects = []
+        for r in range(rows):
+            for c in range(len(blocking[r])):
+                if not free(r, c):
+                    continue
+                c_end = c
+                while free(r, c_end + 1):
+                    c_end += 1
+                r_end = r
+                while r_end + 1 < rows and all(free(r_end + 1, k) for k in range(c, c_end + 1)):
+                    r_end += 1
+                for rr in range(r, r_end + 1):
+                    for cc in range(c, c_end + 1):
+                        used[rr][cc] = True
+                origin = self.tiles[r][c]
+                rects.append(Rect(origin.x, origin.y,
+                                  (c_end - c + 1) * self.tile_size,
+                                  (r_end - r + 1) * self.tile_size))
+        return rects
+
+    def _build_obstacle_index(self) -> None:
+        """根据障碍物列表重建网格索引，并生成逐地块的阻挡数组（用于批量射线检测）"""
+        self.unit_block_grid = np.zeros((self.height, self.width), dtype=bool)
+        self.bullet_block_grid = np.zeros((self.height, self.width), dtype=bool)
+        self.tile_type_grid = np.full((self.height, self.width), -1, dtype=np.int8)
+        for row_idx, row in enumerate(self.tiles[:self.height]):
+            for col_idx, tile in enumerate(row[:self.width]):
+                self.unit_block_grid[row_idx, col_idx] = tile.blocks_unit
+                self.bullet_block_grid[row_idx, col_idx] = tile.blocks_bullet
+                if tile.name in TILE_TYPES:
+                    self.tile_type_grid[row_idx, col_idx] = TILE_TYPES.index(tile.name)
+        # 阻挡地块数量的二维前缀和，用于批量矩形碰撞检测
+        self.unit_block_count = np.zeros((self.height + 1, self.width + 1), dtype=np.int32)
+        self.unit_block_count[1:, 1:] = self.unit_block_grid.cumsum(axis=0).cumsum(axis=1)
+        self.bullet_block_count = np.zeros((self.height + 1, self.width + 1), dtype=np.int32)
+        self.bullet_block_count[1:, 1:] = self.bullet_block_grid.cumsum(axis=0).cumsum(axis=1)
+        # 同样的前缀和转为 Python 列表，单个矩形查询时逐元素读取比 NumPy 标量索引快
+        self._unit_block_rows = self.unit_block_count.tolist()
+        self._bullet_block_rows = self.bullet_block_count.tolist()
+        self.unit_obstacle_grid = ObstacleGrid(self.tile_size, self.width, self.height)
+        self.unit_obstacle_grid.build(self.unit_obstacles)
+        self.bullet_obstacle_grid = ObstacleGrid(self.tile_size, self.width, self.height)
+        self.bullet_obstacle_grid.build(self.bullet_obstacles)
+
+    def draw(self, surface: 'pygame.Surface', camera_offset: List[float] = [0, 0]) -> None:
+        """绘制地图：从预渲染的地图表面中截取相机可见的区域进行一次绘制"""
+        if self.map_surface is None:
+            for row in self.tiles:
+                for tile in row:
+                    tile.draw(surface, camera_offset)
+        else:
+            import pygame
+            self._render_dirty_tiles()
+            view = pygame.Rect(int(camera_offset[0]), int(camera_offset[1]),
+                               surface.get_width(), surface.get_height())
+            area = view.clip(self.map_surface.get_rect())
+            if area.width > 0 and area.height > 0:
+                dest = (area.x - camera_offset[0], area.y - camera_offset[1])
+                surface.blit(self.map_surface, dest, area)
         if DRAW_OBSTACLE_BOUNDING_BOX or DEBUG_MODE:
             self._draw_debug(surface, camera_offset)
 
@@ -183,7 +310,9 @@ class GameMap:
                     print(f"警告：第 {i} 行长度不一致")
 
             print(f"地图已从 {file_path} 加载")
-            return cls(map_data, tile_size)
+            game_map = cls(map_data, tile_size)
+            game_map.file_name = file_name
+            return game_map
 
         except FileNotFoundError:
             print(f"地图文件不存在: {file_path}")
@@ -192,12 +321,49 @@ class GameMap:
             print(f"加载地图失败: {e}")
             return None
 
-    def check_collision(self, rect: pygame.Rect) -> bool:
+    def _rect_blocked(self, counts: list, rect: Rect) -> bool:
+        """
+        整数矩形覆盖的格子中是否有阻挡地块：障碍物都是整块地块，
+        因此用阻挡数量的二维前缀和 counts 做 O(1) 查询，结果与逐个障碍物 colliderect 相同
+        """
+        left, top = rect.x, rect.y
+        right, bottom = left + rect.width, top + rect.height
+        if right <= left or bottom <= top:
+            return False
+        size = self.tile_size
+        c0 = max(left // size, 0)
+        c1 = min((right - 1) // size, self.width - 1)
+        r0 = max(top // size, 0)
+        r1 = min((bottom - 1) // size, self.height - 1)
+        if c0 > c1 or r0 > r1:
+            return False
+        return counts[r1 + 1][c1 + 1] - counts[r0][c1 + 1] - counts[r1 + 1][c0] + counts[r0][c0] > 0
+
+    def check_collision(self, rect: Rect) -> bool:
         """检查矩形是否与任何单位障碍物碰撞"""
-        for obstacle in self.unit_obstacles:
-            if rect.colliderect(obstacle):
-                return True
-        return False
+        return self._rect_blocked(self._unit_block_rows, rect)
+
+    def check_collision_batch(self, lefts: np.ndarray, tops: np.ndarray,
+                              widths: np.ndarray, heights: np.ndarray, blocking: str = 'unit') -> np.ndarray:
+        """
+        批量检查整数矩形是否与障碍物碰撞，blocking 为 'unit' 时结果与逐个调用 check_collision 相同，
+        为 'bullet' 时与逐个调用 is_bullet_blocked 相同
+        （障碍物都是整块地块，因此只需统计矩形覆盖的格子中是否有阻挡地块）
+        """
+        lefts = np.asarray(lefts, dtype=np.int64)
+        tops = np.asarray(tops, dtype=np.int64)
+        rights = lefts + np.asarray(widths, dtype=np.int64)
+        bottoms = tops + np.asarray(heights, dtype=np.int64)
+        size = self.tile_size
+        c0 = np.maximum(lefts // size, 0)
+        c1 = np.minimum((rights - 1) // size, self.width - 1)
+        r0 = np.maximum(tops // size, 0)
+        r1 = np.minimum((bottoms - 1) // size, self.height - 1)
+        valid = (rights > lefts) & (bottoms > tops) & (c0 <= c1) & (r0 <= r1)
+        c0, c1, r0, r1 = (np.where(valid, v, 0) for v in (c0, c1, r0, r1))
+        total = self.bullet_block_count if blocking == 'bullet' else self.unit_block_count
+        count = total[r1 + 1, c1 + 1] - total[r0, c1 + 1] - total[r1 + 1, c0] + total[r0, c0]
+        return valid & (count > 0)
 
     def is_walkable(self, x: float, y: float, width: float = 0, height: float = 0) -> bool:
         """检查区域是否可通行"""
@@ -208,24 +374,103 @@ class GameMap:
                 return not self.tiles[row][col].blocks_unit
             return False
         else:
-            rect = pygame.Rect(x, y, width, height)
+            rect = Rect(x, y, width, height)
             return not self.check_collision(rect)
 
-    def get_colliding_obstacles(self, rect: pygame.Rect) -> List[pygame.Rect]:
+    def get_colliding_obstacles(self, rect: Rect) -> List[Rect]:
         """获取与矩形碰撞的所有单位障碍物"""
-        colliding = []
-        for obstacle in self.unit_obstacles:
-            if rect.colliderect(obstacle):
-                colliding.append(obstacle)
-        return colliding
+        return self.unit_obstacle_grid.query(rect)
 
-    def is_bullet_blocked(self, rect: pygame.Rect) -> bool:
+    def is_bullet_blocked(self, rect: Rect) -> bool:
         """检查子弹是否被阻挡"""
-        for obstacle in self.bullet_obstacles:
-            if rect.colliderect(obstacle):
+        return self._rect_blocked(self._bullet_block_rows, rect)
+
+    def get_bullet_obstacle(self, rect: Rect) -> Optional[Rect]:
+        """获取第一个与矩形碰撞的子弹障碍物，没有则返回 None"""
+        return self.bullet_obstacle_grid.first_collision(rect)
+
+    def segment_blocked(self, start: Tuple[float, float], end: Tuple[float, float]) -> bool:
+        """精确检测线段是否被子弹障碍物阻挡（只检查线段包围盒覆盖的格子中的障碍物）"""
+        left, top = min(start[0], end[0]), min(start[1], end[1])
+        bounds = Rect(left, top, abs(end[0] - start[0]) + 2, abs(end[1] - start[1]) + 2)
+        for obstacle in self.bullet_obstacle_grid.candidates(bounds):
+            if obstacle.clipline(start, end):
                 return True
         return False
 
+    def raycast_batch(self, starts, ends, blocking: str = 'bullet') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量线段投射：starts/ends 为 (N, 2) 的 NumPy 数组（世界坐标）。
+        blocking 为 'bullet' 时按 blocks_bullet 判断阻挡，为 'unit' 时按 blocks_unit 判断。
+        返回 (blocked, distance)：是否被阻挡，以及到第一个阻挡地块的距离（未被阻挡时为线段长度）。
+        """
+        grid = self.unit_block_grid if blocking == 'unit' else self.bullet_block_grid
+        return raycast_grid(grid, self.tile_size, starts, ends)
+
+    def sweep_batch(self, starts, ends, half_sizes, blocking: str = 'bullet') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量连续碰撞检测：半宽高为 half_sizes 的矩形中心沿 starts → ends 移动（均为 (N, 2) 数组）。
+        返回 (hit, t)：是否接触阻挡地块，以及首次接触的时刻（0~1，沿线段的比例）。
+        先用前缀和排除扫掠范围内没有阻挡地块的矩形，只对其余矩形逐块求交。
+        """
+        grid = self.unit_block_grid if blocking == 'unit' else self.bullet_block_grid
+        starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+        half_sizes = np.asarray(half_sizes, dtype=np.float64).reshape(-1, 2)
+        lower = np.floor(np.minimum(starts, ends) - half_sizes)
+        upper = np.ceil(np.maximum(starts, ends) + half_sizes)
+        near = self.check_collision_batch(lower[:, 0], lower[:, 1], upper[:, 0] - lower[:, 0],
+                                          upper[:, 1] - lower[:, 1], blocking)
+        return sweep_grid(grid, self.tile_size, starts, ends, half_sizes, np.flatnonzero(near))
+
+    def _los_cache_path(self) -> Optional[str]:
+        if not self.file_name:
+            return None
+        base, _ = os.path.splitext(self.file_name)
+        return os.path.join(DEFAULT_MAP_PATH, base + '.los.npz')
+
+    def build_line_of_sight_table(self, save: bool = SAVE_LOS_TABLE) -> LineOfSightTable:
+        """构建地块视线表；地图来自文件时优先读取 Map/saved 中的缓存，并可选择保存"""
+        table = LineOfSightTable(self)
+        cache_path = self._los_cache_path()
+        if not (cache_path and table.load(cache_path)):
+            table.build()
+            if save and cache_path:
+                table.save(cache_path)
+        self.los_table = table
+        return table
+
+    def prepare_line_of_sight_table(self) -> Optional[LineOfSightTable]:
+        """
+        准备视线表（在对局搭建时调用，视线检测本身从不构建视线表）：
+        优先读取 Map/saved 中的缓存，没有缓存时只在地块数不超过 LOS_TABLE_MAX_TILES 时现场计算，
+        否则保持为 None，has_line_of_sight 退回精确的线段检测
+        """
+        if self._los_prepared or not USE_LOS_TABLE:
+            return self.los_table
+        self._los_prepared = True
+        if self.los_table is None and self.width > 0 and self.height > 0:
+            if self.width * self.height <= LOS_TABLE_MAX_TILES:
+                self.build_line_of_sight_table()
+            else:
+                table = LineOfSightTable(self)
+                cache_path = self._los_cache_path()
+                if cache_path and table.load(cache_path):
+                    self.los_table = table
+        return self.los_table
+
+    def has_line_of_sight(self, start: Tuple[float, float], end: Tuple[float, float]) -> bool:
+        """
+        两点之间是否存在视线（水不阻挡视线）。
+        已准备好视线表时按两点所在地块查表，否则做精确的线段检测。
+        """
+        if self.los_table is not None:
+            a = self.los_table.tile_index(start[0], start[1])
+            b = self.los_table.tile_index(end[0], end[1])
+            if a is not None and b is not None:
+                return self.los_table.is_visible(a, b)
+        return not self.segment_blocked(start, end)
+
     def get_map_size(self) -> Tuple[int, int]:
         """获取地图总尺寸（像素）"""
         return self.width * self.tile_size, self.height * self.tile_size
@@ -246,16 +491,17 @@ class GameMap:
             return self.tiles[row][col]
         return None
 
-    def _draw_debug(self, surface: pygame.Surface, camera_offset: List[float]) -> None:
+    def _draw_debug(self, surface: 'pygame.Surface', camera_offset: List[float]) -> None:
         """绘制调试信息（障碍物边框）"""
+        import pygame
         # 单位障碍物（红色边框）
         for obs in self.unit_obstacles:
             screen_rect = obs.move(-camera_offset[0], -camera_offset[1])
-            pygame.draw.rect(surface, (255, 0, 0), screen_rect, 2)
+            pygame.draw.rect(surface, (255, 0, 0), tuple(screen_rect), 2)
         # 子弹障碍物（绿色边框）
         for obs in self.bullet_obstacles:
             screen_rect = obs.move(-camera_offset[0], -camera_offset[1])
-            pygame.draw.rect(surface, (0, 255, 0), screen_rect, 1)
+            pygame.draw.rect(surface, (0, 255, 0), tuple(screen_rect), 1)
     
     def to_strings(self) -> List[str]:
         """返回地图的字符串表示（每行一个字符串）"""
@@ -313,7 +559,9 @@ def create_border_map(width: int = 15, height: int = 10) -> GameMap:
             map_data.append("x" + "o" * (width - 2) + "x")
     return GameMap(map_data)
 
-def create_random_map(width: int = 15, height: int = 10, density: float = 0.3) -> GameMap:
+def create_random_map(width: int = 15, height: int = 10, density: float = 0.3, rng: random.Random = None) -> GameMap:
+    """rng 为随机数生成器（如 GameManager.rng），None 时使用全局 random"""
+    rng = rng if rng is not None else random
     map_data = []
     for y in range(height):
         row = []
@@ -322,6 +570,6 @@ def create_random_map(width: int = 15, height: int = 10, density: float = 0.3) -
             if is_border:
                 row.append('x')
             else:
-                row.append('x' if random.random() < density else 'o')
+                row.append('x' if rng.random() < density else 'o')
         map_data.append(''.join(row))
     return GameMap(map_data)
\ No newline at end of file
@@ -0,0 +1,133 @@
+'''
+    地块之间的视线表
+    对静态地图预先计算任意两个地块中心之间是否存在视线（只被阻挡子弹的地块遮挡），
+    以位集（每个地块对 1 bit）保存，视线检测因此变为一次查表。
+    地块发生变化时，只将可能经过该地块的地块对标记为失效，查询到时再重新计算。
+'''
+
+import os
+import hashlib
+import numpy as np
+from typing import Optional, Tuple
+
+
+class LineOfSightTable:
+    CHUNK_ROWS = 256        # 批量计算/失效时每次处理的行数（控制临时内存）
+
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.width = game_map.width
+        self.height = game_map.height
+        self.count = self.width * self.height                     # 地块总数
+        row_bytes = (self.count + 7) // 8
+        self.visible = np.zeros((self.count, row_bytes), dtype=np.uint8)     # 视线位集：第 a 行第 b 位表示地块 a、b 之间是否可见
+        self.known = np.zeros((self.count, row_bytes), dtype=np.uint8)       # 有效位集：该地块对的结果是否有效
+        index = np.arange(self.count)
+        self.tile_rows = index // max(self.width, 1)
+        self.tile_cols = index % max(self.width, 1)
+
+    # ----------------- 计算 -----------------
+    def _tile_center(self, index: int) -> Tuple[float, float]:
+        size = self.game_map.tile_size
+        return ((index % self.width + 0.5) * size, (index // self.width + 0.5) * size)
+
+    def _tile_centers(self, indices: np.ndarray) -> np.ndarray:
+        size = self.game_map.tile_size
+        return np.stack(((self.tile_cols[indices] + 0.5) * size,
+                         (self.tile_rows[indices] + 0.5) * size), axis=1)
+
+    def _compute_pair(self, a: int, b: int) -> bool:
+        blocked, _ = self.game_map.raycast_batch(np.array([self._tile_center(a)]),
+                                                 np.array([self._tile_center(b)]))
+        return not blocked[0]
+
+    def _set_bit(self, table: np.ndarray, a: int, b: int, value: bool) -> None:
+        mask = np.uint8(1 << (b & 7))
+        if value:
+            table[a, b >> 3] |= mask
+        else:
+            table[a, b >> 3] &= np.uint8(~mask & 0xFF)
+
+    @staticmethod
+    def _get_bit(table: np.ndarray, a: int, b: int) -> bool:
+        return bool((table[a, b >> 3] >> (b & 7)) & 1)
+
+    def _store(self, a: int, b: int, value: bool) -> None:
+        for x, y in ((a, b), (b, a)):
+            self._set_bit(self.visible, x, y, value)
+            self._set_bit(self.known, x, y, True)
+
+    def build(self) -> None:
+        """批量计算所有地块对（按行分块投射射线）"""
+        all_tiles = np.arange(self.count)
+        centers = self._tile_centers(all_tiles)
+        for start in range(0, self.count, self.CHUNK_ROWS):
+            stop = min(start + self.CHUNK_ROWS, self.count)
+            rows = stop - start
+            starts = np.repeat(centers[start:stop], self.count, axis=0)
+            ends = np.tile(centers, (rows, 1))
+            blocked, _ = self.game_map.raycast_batch(starts, ends)
+            visible = ~blocked.reshape(rows, self.count)
+            self.visible[start:stop] = np.packbits(visible, axis=1, bitorder='little')
+        self.known[:] = 0xFF
+
+    # ----------------- 查询 -----------------
+    def tile_index(self, x: float, y: float) -> Optional[int]:
+        col = int(x // self.game_map.tile_size)
+        row = int(y // self.game_map.tile_size)
+        if 0 <= row < self.height and 0 <= col < self.width:
+            return row * self.width + col
+        return None
+
+    def is_visible(self, a: int, b: int) -> bool:
+        """地块 a 与地块 b 之间是否存在视线"""
+        if not self._get_bit(self.known, a, b):
+            self._store(a, b, self._compute_pair(a, b))
+        return self._get_bit(self.visible, a, b)
+
+    # ----------------- 失效 -----------------
+    def invalidate_tile(self, row: int, col: int) -> None:
+        """地块 (row, col) 变化后，使连线可能经过它的地块对失效（即两端构成的包围盒包含该地块）"""
+        rows, cols = self.tile_rows, self.tile_cols
+        for start in range(0, self.count, self.CHUNK_ROWS):
+            stop = min(start + self.CHUNK_ROWS, self.count)
+            ra = rows[start:stop, None]
+            ca = cols[start:stop, None]
+            affected = ((np.minimum(ra, rows) <= row) & (row <= np.maximum(ra, rows)) &
+                        (np.minimum(ca, cols) <= col) & (col <= np.maximum(ca, cols)))
+            packed = np.packbits(affected, axis=1, bitorder='little')
+            self.known[start:stop] &= ~packed
+
+    # ----------------- 保存与加载 -----------------
+    def signature(self) -> str:
+        """地图内容的签名，用于判断缓存文件是否仍然有效"""
+        content = '\n'.join(self.game_map.to_strings()) + f'\n{self.game_map.tile_size}'
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def save(self, file_path: str) -> bool:
+        try:
+            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+            with open(file_path, 'wb') as f:
+                np.savez_compressed(f, visible=self.visible, known=self.known,
+                                    signature=np.array(self.signature()))
+            return True
+        except Exception as e:
+            print(f"保存视线表失败: {e}")
+            return False
+
+    def load(self, file_path: str) -> bool:
+        """从文件加载视线表，文件不存在或与当前地图不匹配时返回 False"""
+        if not os.path.isfile(file_path):
+            return False
+        try:
+            with np.load(file_path) as data:
+                if str(data['signature']) != self.signature():
+                    return False
+                if data['visible'].shape != self.visible.shape:
+                    return False
+                self.visible = data['visible'].copy()
+                self.known = data['known'].copy()
+            return True
+        except Exception as e:
+            print(f"加载视线表失败: {e}")
+            return False
@@ -0,0 +1,74 @@
+'''
+    障碍物的均匀网格索引
+    以地块大小为格子，把每个障碍物矩形登记到它覆盖的所有格子中，
+    矩形查询时只需检查查询矩形覆盖的格子，开销与地图大小无关。
+    只用于需要具体障碍物矩形的查询；是否碰撞由 GameMap._rect_blocked 按地块前缀和计数判断
+'''
+
+from typing import List, Optional, Tuple
+from utils import Rect
+
+
+class ObstacleGrid:
+    def __init__(self, cell_size: int = 64, width: int = 0, height: int = 0):
+        self.cell_size = cell_size
+        self.width = width                                  # 格子列数
+        self.height = height                                # 格子行数
+        self.rects: List[Rect] = []                  # 登记的障碍物矩形（保持登记顺序）
+        self.cells: List[List[int]] = [[] for _ in range(width * height)]   # 每个格子中障碍物在 rects 中的下标
+
+    def build(self, rects: List[Rect]) -> None:
+        """根据矩形列表重建索引"""
+        self.rects = list(rects)
+        self.cells = [[] for _ in range(self.width * self.height)]
+        for index, rect in enumerate(self.rects):
+            cell_range = self._cell_range(rect)
+            if cell_range is None:
+                continue
+            c0, c1, r0, r1 = cell_range
+            for row in range(r0, r1 + 1):
+                base = row * self.width
+                for col in range(c0, c1 + 1):
+                    self.cells[base + col].append(index)
+
+    def _cell_range(self, rect) -> Optional[Tuple[int, int, int, int]]:
+        """返回矩形覆盖的格子范围 (c0, c1, r0, r1)，已裁剪到网格内；不覆盖任何格子时返回 None"""
+        if rect.width <= 0 or rect.height <= 0:
+            return None
+        size = self.cell_size
+        c0 = max(rect.left // size, 0)
+        c1 = min((rect.right - 1) // size, self.width - 1)
+        r0 = max(rect.top // size, 0)
+        r1 = min((rect.bottom - 1) // size, self.height - 1)
+        if c0 > c1 or r0 > r1:
+            return None
+        return c0, c1, r0, r1
+
+    def _candidates(self, rect) -> List[int]:
+        cell_range = self._cell_range(rect)
+        if cell_range is None:
+            return []
+        c0, c1, r0, r1 = cell_range
+        if c0 == c1 and r0 == r1:
+            return self.cells[r0 * self.width + c0]
+        found = set()
+        for row in range(r0, r1 + 1):
+            base = row * self.width
+            for col in range(c0, c1 + 1):
+                found.update(self.cells[base + col])
+        return sorted(found)
+
+    def candidates(self, rect) -> List[Rect]:
+        """返回登记在矩形覆盖格子中的障碍物（未做精确碰撞检测）"""
+        return [self.rects[i] for i in self._candidates(rect)]
+
+    def query(self, rect) -> List[Rect]:
+        """返回与矩形碰撞的所有障碍物（按登记顺序）"""
+        return [self.rects[i] for i in self._candidates(rect) if rect.colliderect(self.rects[i])]
+
+    def first_collision(self, rect) -> Optional[Rect]:
+        """返回第一个与矩形碰撞的障碍物，没有则返回 None"""
+        for i in self._candidates(rect):
+            if rect.colliderect(self.rects[i]):
+                return self.rects[i]
+        return None
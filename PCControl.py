@@ -4,12 +4,13 @@ from utils import *
 from Parameter import *
 from GameMode import *
 
-def draw_debug_info(surface, tank, camera_offset, mouse_pos):
+def draw_debug_info(surface, tank, camera_offset, mouse_pos, alpha=1.0):
     debug_font = pygame.font.Font(None, 20)
     
-    # 坦克中心点
-    screen_x = tank.position[0] - camera_offset[0]
-    screen_y = tank.position[1] - camera_offset[1]
+    # 坦克中心点（与车身一样使用插值后的绘制位置）
+    x, y = tank.get_draw_position(alpha)
+    screen_x = x - camera_offset[0]
+    screen_y = y - camera_offset[1]
 
     # 鼠标目标线
     world_mouse_x = mouse_pos[0] + camera_offset[0]
@@ -51,6 +52,9 @@ def PCControl(game_manager: GameManager, action: Action, screen):
                 elif event.key == pygame.K_c:
                     # 清空所有子弹
                     game_manager.clear_bullets()
+                elif event.key == pygame.K_t:
+                    # 切换加速模式
+                    game_manager.turbo = not game_manager.turbo
             
             elif event.type == pygame.KEYUP:
                 if event.key == pygame.K_w:
@@ -81,6 +85,7 @@ def PCControl(game_manager: GameManager, action: Action, screen):
             game_manager.set_camera_offset_move(Direction.DOWN)
         
         action.mouse_pos = pygame.mouse.get_pos()      # 炮塔指向鼠标
-        draw_debug_info(screen, game_manager.get_unit(0), game_manager.camera_offset, action.mouse_pos)
+        draw_debug_info(screen, game_manager.get_unit(0), game_manager.camera_offset, action.mouse_pos,
+                        game_manager.render_alpha)
         
         return running, action
\ No newline at end of file
@@ -3,10 +3,11 @@
 '''
 import numpy as np
 import enum
-import pygame
 
 FPS = 60
 ACC = 1.0
+MAX_CATCH_UP_STEPS = 5          # 一帧内最多补算的模拟步数，超出的时间直接丢弃（防止卡顿后越积越多）
+TURBO_FRAME_BUDGET = 0.1        # 加速模式下每次连续模拟的真实时间（秒），期间不绘制
 
 INF = 10000.0                # 当需要无视加速度/速度时，取此值
 
@@ -26,6 +27,23 @@ EXPLOSION_IMAGE_ADAPT_TO_RANGE = False               # 爆炸图片是否根据
 
 POTENTIAL_DAMAGE_THRESHOLD = 30.0      # 计算潜在伤害的范围
 
+UNIT_HASH_CELL_SIZE = 128.0            # 单位空间哈希的格子边长（像素）
+VISION_BATCH_MIN_BULLETS = 64          # 子弹数不少于此值时按数组批量判断子弹是否在视野内，更少时逐个判断更快
+LOS_TABLE_MAX_TILES = 576              # 地块数不超过此值时才现场计算视线表（约 24x24，计算量随地块数的平方以上增长），更大的地图只使用 Map/saved 中的缓存
+
+# 训练接口（AIControl）：每步奖励 = 各项单位记录本步增量的加权和
+REWARD_WEIGHTS = {
+    "damage_dealt": 1.0,
+    "assist_damage_dealt": 0.5,
+    "damage_received": -1.0,
+    "destroy_enemy_count": 100.0,
+    "assist_destroy_count": 50.0,
+}
+AIM_DIRECTIONS = 8                      # 离散动作中炮塔瞄准的方向数（另有一个“保持当前方向”）
+AIM_DISTANCE = 100.0                    # 瞄准点与单位中心的距离（像素）
+RASTER_CELLS = 32                       # 栅格观测的边长（格数）
+RASTER_CELL_SIZE = 16.0                 # 栅格观测中每格的边长（像素）
+
 # UNIT_DIAGONAL_SPEED = UNIT_SPEED / np.sqrt(2)       # 单位对角线速度
 # BULLET_DIAGONAL_SPEED = BULLET_SPEED / np.sqrt(2)   # 子弹对角线速度
 
@@ -48,3 +66,4 @@ class Direction(enum.Enum):
 DEFAULT_MAP_PATH = './Map/saved'
 DEFAULT_UNIT_PATH = './Unit/saved'
 DEFAULT_BULLET_PATH = './Bullet/saved'
+ASSET_DIRECTORIES = ['Map', 'Unit', 'Bullet']     # 启动时预加载这些目录下的图片
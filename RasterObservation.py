@@ -0,0 +1,137 @@
+'''
+    以单位为中心的栅格观测：为每个受控单位生成 (通道, RASTER_CELLS, RASTER_CELLS) 的多通道网格
+    通道：
+        0..4   地形类型（Map.GameMap.TILE_TYPES 的 one-hot，地图外为 0）
+        5      友方单位（不含自身，值为生命比例）
+        6      可见敌方单位（值为生命比例）
+        7..9   可见子弹（存在标记，速度 x/y 分量除以 BULLET_SPEED，同一格内累加）
+        10     队伍共享视野（自身和可见的存活队友的视野范围覆盖的格子）
+    单位与子弹按本帧的可见数据（visible_unit_ids / visible_bullet_ids，已包含通信同步的信息）筛选，
+    再按格子坐标批量写入（scatter）；地形按每格中心的位置从 tile_type_grid 中批量读取。
+    rotate 为 True 时网格随车体旋转（车体朝向为网格的上方），否则网格上方为世界坐标的 -y 方向。
+'''
+
+import numpy as np
+from typing import Optional, Sequence
+from Map.GameMap import TILE_TYPES
+from Parameter import *
+
+
+class RasterObservation:
+    CHANNELS = [f"terrain_{name}" for name in TILE_TYPES] + [
+        "allies", "enemies", "bullets", "bullet_vx", "bullet_vy", "team_vision"]
+
+    def __init__(self, cells: int = RASTER_CELLS, cell_size: float = RASTER_CELL_SIZE, rotate: bool = False):
+        self.cells = cells
+        self.cell_size = cell_size
+        self.rotate = rotate
+        self.channel_index = {name: c for c, name in enumerate(self.CHANNELS)}
+        # 各格中心相对网格中心的偏移（网格坐标系：u 向右，v 向下）
+        offsets = (np.arange(cells) - (cells - 1) / 2) * cell_size
+        self._cell_v, self._cell_u = np.meshgrid(offsets, offsets, indexing='ij')
+
+    @property
+    def shape(self) -> tuple:
+        """单个单位的观测形状"""
+        return (len(self.CHANNELS), self.cells, self.cells)
+
+    def _frames(self, agents) -> tuple:
+        """每个单位的网格中心与坐标轴：返回 (中心 (A, 2), 右方向 (A, 2), 下方向 (A, 2))"""
+        centers = np.array([agent.position for agent in agents], dtype=np.float64).reshape(-1, 2)
+        if self.rotate:
+            # 朝向角 0 指向 -y，顺时针增加；右方向为 (cos, sin)，下方向（车体后方）为 (-sin, cos)
+            angles = np.radians([agent.direction_angle for agent in agents])
+            right = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+            down = np.stack([-np.sin(angles), np.cos(angles)], axis=1)
+        else:
+            right = np.tile([1.0, 0.0], (len(agents), 1))
+            down = np.tile([0.0, 1.0], (len(agents), 1))
+        return centers, right, down
+
+    def _cells_of(self, points: np.ndarray, centers, right, down):
+        """points (A, N, 2) 世界坐标 → 各单位网格中的 (行, 列, 是否在网格内)"""
+        relative = points - centers[:, None, :]
+        u = (relative * right[:, None, :]).sum(axis=2)
+        v = (relative * down[:, None, :]).sum(axis=2)
+        col = np.floor(u / self.cell_size + self.cells / 2).astype(np.int64)
+        row = np.floor(v / self.cell_size + self.cells / 2).astype(np.int64)
+        inside = (row >= 0) & (row < self.cells) & (col >= 0) & (col < self.cells)
+        return row, col, inside
+
+    def build(self, game_manager, agents: Sequence, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        :param agents: 受控单位列表（已死亡的单位观测为全 0）
+        :param out: 预分配的 (A, 通道, cells, cells) float32 数组，None 时新建
+        """
+        count = len(agents)
+        if out is None:
+            out = np.zeros((count,) + self.shape, dtype=np.float32)
+        else:
+            out.fill(0.0)
+        live = [a for a, agent in enumerate(agents) if agent is not None and agent.is_alive]
+        if not live:
+            return out
+        observers = [agents[a] for a in live]
+        rows = np.array(live, dtype=np.int64)
+        centers, right, down = self._frames(observers)
+        channel = self.channel_index
+
+        # 地形：每格中心的世界坐标 → 地块类型
+        game_map = game_manager.game_map
+        world_x = centers[:, 0, None, None] + self._cell_u * right[:, 0, None, None] + self._cell_v * down[:, 0, None, None]
+        world_y = centers[:, 1, None, None] + self._cell_u * right[:, 1, None, None] + self._cell_v * down[:, 1, None, None]
+        tile_col = np.floor(world_x / game_map.tile_size).astype(np.int64)
+        tile_row = np.floor(world_y / game_map.tile_size).astype(np.int64)
+        types = game_map.tile_type_grid
+        inside = (tile_row >= 0) & (tile_row < types.shape[0]) & (tile_col >= 0) & (tile_col < types.shape[1])
+        tile_type = np.where(inside, types[np.where(inside, tile_row, 0), np.where(inside, tile_col, 0)], -1)
+        a, r, c = np.nonzero(tile_type >= 0)
+        out[rows[a], tile_type[a, r, c], r, c] = 1.0
+
+        # 单位：按本帧可见 id 筛选友方与敌方
+        units = [unit for unit in game_manager.unit_manager.units if unit.is_alive]
+        if units:
+            positions = np.array([unit.position for unit in units], dtype=np.float64)
+            health = np.array([unit.health / unit.max_health for unit in units], dtype=np.float32)
+            teams = np.array([unit.team.value for unit in units])
+            ids = [unit.id for unit in units]
+            visible = np.array([[unit_id in agent.visible_unit_ids for unit_id in ids] for agent in observers],
+                               dtype=bool).reshape(len(observers), len(units))
+            own_team = np.array([agent.team.value for agent in observers])[:, None]
+            not_self = np.array([[unit is not agent for unit in units] for agent in observers], dtype=bool)
+            allies = (teams[None, :] == own_team) & not_self
+            enemies = (teams[None, :] != own_team) & visible
+            row, col, inside = self._cells_of(np.broadcast_to(positions, (len(observers),) + positions.shape),
+                                              centers, right, down)
+            for name, mask in (("allies", allies), ("enemies", enemies)):
+                a, k = np.nonzero(mask & inside)
+                np.maximum.at(out, (rows[a], channel[name], row[a, k], col[a, k]), health[k])
+
+            # 队伍共享视野：自身与可见的存活队友的视野范围
+            sources = (teams[None, :] == own_team) & (visible | ~not_self)
+            sight = np.array([unit.sight_range for unit in units], dtype=np.float64)
+            cell_x = world_x[:, None]
+            cell_y = world_y[:, None]
+            covered = ((cell_x - positions[None, :, 0, None, None]) ** 2 + (cell_y - positions[None, :, 1, None, None]) ** 2
+                       <= (sight ** 2)[None, :, None, None]) & sources[:, :, None, None]
+            out[rows, channel["team_vision"]] = covered.any(axis=1)
+
+        # 子弹：本帧可见的飞行中子弹
+        bullets = [bullet for bullet in game_manager.bullet_manager.bullets
+                   if bullet.is_active and not bullet.has_exploded]
+        if bullets:
+            positions = np.array([bullet.position for bullet in bullets], dtype=np.float64)
+            velocity = np.array([bullet.velocity for bullet in bullets], dtype=np.float64) / BULLET_SPEED
+            ids = [bullet.id for bullet in bullets]
+            visible = np.array([[bullet_id in agent.visible_bullet_ids for bullet_id in ids] for agent in observers],
+                               dtype=bool).reshape(len(observers), len(bullets))
+            row, col, inside = self._cells_of(np.broadcast_to(positions, (len(observers),) + positions.shape),
+                                              centers, right, down)
+            a, k = np.nonzero(visible & inside)
+            velocity_u = (velocity[None, :, :] * right[:, None, :]).sum(axis=2)
+            velocity_v = (velocity[None, :, :] * down[:, None, :]).sum(axis=2)
+            index = (rows[a], row[a, k], col[a, k])
+            out[index[0], channel["bullets"], index[1], index[2]] = 1.0
+            np.add.at(out, (index[0], channel["bullet_vx"], index[1], index[2]), velocity_u[a, k])
+            np.add.at(out, (index[0], channel["bullet_vy"], index[1], index[2]), velocity_v[a, k])
+        return out
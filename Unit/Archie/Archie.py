@@ -3,7 +3,6 @@
     较低机动，较高生命，较低侦察范围，仅装备火箭弹
 '''
 
-import pygame
 import math
 from Unit.BaseUnit import BaseUnit
 from Parameter import *
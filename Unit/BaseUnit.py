@@ -2,12 +2,13 @@
     描述战斗单位的基类
 '''
 
-import pygame
 import math
 import json
 import os
+import numpy as np
 from Parameter import *
 from utils import *
+from AssetManager import get_image, get_image_size
 from GameMode import *
 from typing import List, Tuple
 
@@ -32,9 +33,9 @@ class BaseUnit:
         self.unit_type: str = unit_type
         self.body_image_path: str = body_image_path
         self.turret_image_path: str = turret_image_path
-        self.body_image = load_image(self.body_image_path) if self.body_image_path else None
-        self.turret_image = load_image(self.turret_image_path) if self.turret_image_path else None
-        self.size = self.body_image.get_size() if self.body_image else (0, 0)
+        self.body_image = get_image(self.body_image_path) if self.body_image_path else None
+        self.turret_image = get_image(self.turret_image_path) if self.turret_image_path else None
+        self.size = get_image_size(self.body_image_path) if self.body_image_path else (0, 0)   # 无界面模式下也需要碰撞箱尺寸
         self.usingAI = usingAI
         self.visible = visible
         
@@ -59,31 +60,32 @@ class BaseUnit:
         self.min_sight_range = UNIT_MIN_SIGHT_RATIO * self.sight_range                          # 应用水滴形视野时，最小视野范围（即向正后方的视野范围）
         self.communication_range = communication_range                                          # 通信范围, 此值应小于等于视野范围
         
-        # 视野
-        from Map.GameMap import GameMap
-        from Unit.UnitManager import UnitManager
-        from Bullet.BulletManager import BulletManager
-        self.visible_map = GameMap()
-        self.visible_units = UnitManager()
-        self.visible_bullets = BulletManager()
+        # 视野（每帧重新计算，只保存id集合）
+        self.visible_map = None
+        self.sighted_unit_ids: set = set()          # 处于自身视野范围内的单位id（不考虑隐身，用于协助统计）
+        self.visible_unit_ids: set = set()          # 可见的单位id（包括通过通信同步的单位；自动通信后为只读的 frozenset）
+        self.visible_bullet_ids: set = set()        # 可见的子弹id（包括通过通信同步的子弹；自动通信后为只读的 frozenset）
         
         # 实时属性
         self.position = (0.0, 0.0)
+        self.previous_position = None           # 上一次模拟步开始时的位置（绘制时插值用）
         self.speed = 0.0
         self.direction_angle = 0.0              # 单位朝向角度
         self.turret_direction_angle = 0.0       # 单位炮塔朝向角度
         self.acceleration = 0.0
         self.angular_speed = 0.0
         self.health: float = self.max_health
-        self.bounding_box = None                # 碰撞箱，pygame.Rect对象
+        self.bounding_box = None                # 碰撞箱，Rect对象
         self.velocity: Tuple[float, float] = self.cal_velocity()     # 速度向量
         self.current_ammunition: str = ""            # 单位当前选中弹种
         self.fire_cooldown: float = 0.0              # 剩余开火冷却时间
         
         self.is_alive = True
+        self.index = -1                 # 在 UnitManager 中的稠密下标（未加入或已移出时为 -1）
         self.reload_timer = 0.0         # 切换弹种剩余时间计时器
         self.turret_target_angle = 0.0          # 炮塔目标角度
         self.is_switching_ammo = False          # 是否正在切换弹药
+        self.shots_fired = 0                    # 已发射的子弹数（用于生成子弹id）
         
         if self.ammunition_types:
             self.current_ammunition = self.ammunition_types[0]
@@ -125,9 +127,21 @@ class BaseUnit:
         if game_map is None:
             game_map = GameMap()
             
-        old_position = self.position
-        old_bounding_box = self.bounding_box.copy() if self.bounding_box else None
-        
+        if not self._update_state(delta_time, unit_manager, bullet_manager, game_map):
+            return False
+        self._update_motion(delta_time, game_map)
+        return True
+
+    def _update_state(self, delta_time, unit_manager, bullet_manager, game_map) -> bool:
+        """每帧更新中与运动无关的部分（存活判断、地块效果、视野），返回本帧是否继续更新运动"""
+        if not self._update_status(delta_time, game_map):
+            return False
+        self._update_vision(unit_manager, bullet_manager, game_map)         # 更新视野
+        return True
+
+    def _update_status(self, delta_time, game_map) -> bool:
+        """存活判断与地块效果（启用 USE_UNIT_STORE 时视野由 UnitManager 对所有单位批量计算），返回本帧是否继续更新"""
+        self.previous_position = self.position
         if not self.is_alive:
             return False
         
@@ -138,7 +152,12 @@ class BaseUnit:
         self.living_time += delta_time
         self._frame_init()                           # 每帧初始化
         self._update_tile_buff(game_map)      # 根据所在地块更新单位
-        self._update_vision(unit_manager, bullet_manager, game_map)         # 更新视野
+        return True
+
+    def _update_motion(self, delta_time, game_map) -> None:
+        """每帧更新中的计时器与运动部分（启用 USE_UNIT_STORE 时由 UnitStore.integrate 批量完成）"""
+        old_position = self.position
+        
         self._update_ammo_switch(delta_time)         # 更新弹种切换计时器
         self._update_fire_cooldown(delta_time)       # 更新开火冷却时间
         self._update_speed(delta_time)               # 更新速度
@@ -152,16 +171,11 @@ class BaseUnit:
             self._complete_ammo_switch()
 
         # 检查与障碍物的碰撞
-        if self.bounding_box:
-            for obstacle in game_map.unit_obstacles: 
-                if self.bounding_box.colliderect(obstacle):
-                    # 发生碰撞，恢复到之前的位置
-                    self.position = old_position
-                    self._update_bounding_box()
-                    self.speed = 0  # 停止移动
-                    return True
-        
-        return True
+        if self.bounding_box and game_map.check_collision(self.bounding_box):
+            # 发生碰撞，恢复到之前的位置
+            self.position = old_position
+            self._update_bounding_box()
+            self.speed = 0  # 停止移动
     
     def _frame_init(self) -> None:
         """每帧初始化"""
@@ -175,16 +189,22 @@ class BaseUnit:
             self = tile.apply_buff(self)
 
     def _update_vision(self, unit_manager, bullet_manager, game_map) -> None:
-        """更新视野"""
+        """更新视野：生成本帧的可见id集合（每帧新建集合，不修改上一帧的集合）"""
         self.visible_map = game_map
-        self.visible_units.clear()
-        self.visible_bullets.clear()
-        for unit in unit_manager.units:
-            if self.is_in_sight(unit) and unit.visible == True and unit.conceal == False:
-                self.visible_units.add_unit(unit, bullet_manager, game_map)
-        for bullet in bullet_manager.bullets:
-            if self.is_in_sight(bullet):
-                self.visible_bullets.add_bullet(bullet)
+        sighted = set()
+        visible = set()
+        for unit in unit_manager.query_radius(self.position, self.sight_range, alive_only=False):
+            if self.is_in_sight(unit):
+                sighted.add(unit.id)
+                if unit.visible == True and unit.conceal == False:
+                    visible.add(unit.id)
+        self.sighted_unit_ids = sighted
+        self.visible_unit_ids = visible
+        bullets = bullet_manager.bullets
+        if len(bullets) < VISION_BATCH_MIN_BULLETS:
+            self.visible_bullet_ids = {bullet.id for bullet in bullets if self.is_in_sight(bullet)}
+        else:
+            self.visible_bullet_ids = bullet_manager.visible_bullet_ids([self])[0]
     
     def _update_ammo_switch(self, delta_time) -> None:
         """更新弹药切换状态"""
@@ -262,7 +282,7 @@ class BaseUnit:
         if self.size[0] > 0 and self.size[1] > 0:
             x, y = self.position
             width, height = self.size
-            self.bounding_box = pygame.Rect(x - width / 2, y - height / 2, width, height)
+            self.bounding_box = Rect(x - width / 2, y - height / 2, width, height)
 
     def is_in_sight(self, target) -> bool:
         """
@@ -330,7 +350,7 @@ class BaseUnit:
         
         try:
             bullet = bullet_class(
-                projectile_id=f"bullet_{self.id}_{pygame.time.get_ticks()}",  # 使用时间戳确保唯一性
+                projectile_id=f"bullet_{self.id}_{self.shots_fired}",     # 单位id + 发射序号，与时间无关
                 shooter=self,
                 shooter_team=self.team,
                 position=(bullet_start_x, bullet_start_y),
@@ -340,6 +360,7 @@ class BaseUnit:
             # 根据当前弹药类型设置子弹属性
             self._configure_bullet_for_ammo(bullet)
             self.fire_cooldown = bullet.cooldown        # 设置开火冷却时间
+            self.shots_fired += 1
                 
             return bullet
             
@@ -362,10 +383,9 @@ class BaseUnit:
                 # 可以在这里调整特定属性
                 pass
         elif self.current_ammunition == "bullet":
-            bullet.damage_rate = 1.0
-            bullet.penetration = [1.0, 1.0, 1.0]
-            bullet.speed_rate = 1.0
-            bullet.is_explosive = False
+            # 类型属性在共享的 spec 中，只为这颗子弹生成修改后的 spec
+            bullet.spec = bullet.spec.replace(damage_rate=1.0, penetration=(1.0, 1.0, 1.0),
+                                              speed_rate=1.0, is_explosive=False)
             
     def switch_ammunition(self, ammo_type = None) -> bool:
         if ammo_type == None:
@@ -445,22 +465,18 @@ class BaseUnit:
         将源单位的可见单位和子弹合并到自己的可见信息中。
         返回 (unit_added, bullet_added, map_added, any_added)
         """
-        unit_added = False
-        bullet_added = False
-
         # 合并可见单位
-        for other_unit in source_unit.visible_units.units:
-            if other_unit.id == self.id:
-                continue
-            if not any(u.id == other_unit.id for u in self.visible_units.units):
-                self.visible_units.units.append(other_unit)
-                unit_added = True
+        new_unit_ids = source_unit.visible_unit_ids - self.visible_unit_ids
+        new_unit_ids.discard(self.id)
+        unit_added = bool(new_unit_ids)
+        if unit_added:
+            self.visible_unit_ids = self.visible_unit_ids | new_unit_ids
 
         # 合并可见子弹
-        for bullet in source_unit.visible_bullets.bullets:
-            if not any(b.id == bullet.id for b in self.visible_bullets.bullets):
-                self.visible_bullets.bullets.append(bullet)
-                bullet_added = True
+        new_bullet_ids = source_unit.visible_bullet_ids - self.visible_bullet_ids
+        bullet_added = bool(new_bullet_ids)
+        if bullet_added:
+            self.visible_bullet_ids = self.visible_bullet_ids | new_bullet_ids
 
         # 地图信息（目前所有单位共享同一地图对象，因此永远不会有新增）
         map_added = False
@@ -494,7 +510,7 @@ class BaseUnit:
         any_bullet_added = False
         any_map_added = False
 
-        for other in unit_manager.units:
+        for other in unit_manager.query_radius(self.position, self.communication_range, team=self.team):
             if not other.is_alive or not other.visible:
                 continue
             if other.team != self.team or other.id == self.id:
@@ -558,7 +574,16 @@ class BaseUnit:
         """
         获取当前可见的所有单位ID列表。
         """
-        return [unit.id for unit in self.visible_units.units]
+        return sorted(self.visible_unit_ids)
+
+    def get_visible_units(self, unit_manager) -> list:
+        """获取当前可见的所有单位对象"""
+        units = (unit_manager.get_unit_by_id(unit_id) for unit_id in self.get_visible_unit_ids())
+        return [unit for unit in units if unit is not None]
+
+    def get_visible_bullets(self, bullet_manager) -> list:
+        """获取当前可见的所有子弹对象"""
+        return [bullet for bullet in bullet_manager.bullets if bullet.id in self.visible_bullet_ids]
 
     def get_info(self) -> dict:
         return {
@@ -578,15 +603,24 @@ class BaseUnit:
             "reload_timer": self.reload_timer
         }
     
-    def draw(self, surface, camera_offset=(0, 0), mouse_pos=None) -> None:
+    def get_draw_position(self, alpha: float = 1.0) -> Tuple[float, float]:
+        """绘制位置：在上一次模拟步开始时的位置与当前位置之间按 alpha 插值"""
+        if self.previous_position is None or alpha >= 1.0:
+            return self.position
+        x0, y0 = self.previous_position
+        x1, y1 = self.position
+        return (x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha)
+
+    def draw(self, surface, camera_offset=(0, 0), mouse_pos=None, alpha=1.0) -> None:
         if not self.is_alive:
             return
         if not self.visible:
             return
 
-        
-        screen_x = self.position[0] - camera_offset[0]
-        screen_y = self.position[1] - camera_offset[1]
+        import pygame
+        x, y = self.get_draw_position(alpha)
+        screen_x = x - camera_offset[0]
+        screen_y = y - camera_offset[1]
         
         # 绘制车身
         if self.body_image:
@@ -606,16 +640,17 @@ class BaseUnit:
             
         # 绘制视野范围
         if DRAW_SIGHT_RANGE or DEBUG_MODE:
-            self._draw_sight_range(surface, camera_offset)
+            self._draw_sight_range(surface, screen_x, screen_y)
             
         # 绘制从坦克到鼠标位置的线段
         if mouse_pos is not None and (DRAW_MOUSE_TARGET_LINE or DEBUG_MODE) :
-            self._draw_mouse_target_line(surface, camera_offset, mouse_pos)
+            self._draw_mouse_target_line(surface, screen_x, screen_y, mouse_pos)
     
     def _draw_health_bar(self, surface, x, y) -> None:
         """
         绘制生命条并在血条中间显示生命值
         """
+        import pygame
         bar_width = 40
         bar_height = 8  # 稍微增加高度以容纳文字
         
@@ -646,11 +681,11 @@ class BaseUnit:
         
         surface.blit(text_surface, text_rect)
     
-    def _draw_sight_range(self, surface, camera_offset):
+    def _draw_sight_range(self, surface, screen_x, screen_y):
+        """以插值后的屏幕坐标 (screen_x, screen_y) 为中心绘制视野范围"""
+        import pygame
         if not self.is_alive:
             return
-        screen_x = self.position[0] - camera_offset[0]
-        screen_y = self.position[1] - camera_offset[1]
         color = (0, 0, 0)
 
         if not USE_TEAR_DROP_VISION:
@@ -673,21 +708,16 @@ class BaseUnit:
                 dir_x = forward_x * math.cos(theta) - forward_y * math.sin(theta)
                 dir_y = forward_x * math.sin(theta) + forward_y * math.cos(theta)
 
-                world_x = self.position[0] + r * dir_x
-                world_y = self.position[1] + r * dir_y
-                screen_pt = (world_x - camera_offset[0],
-                            world_y - camera_offset[1])
-                points.append(screen_pt)
+                points.append((screen_x + r * dir_x, screen_y + r * dir_y))
 
             if len(points) >= 3:
                 pygame.draw.polygon(surface, color, points, 1)
     
-    def _draw_mouse_target_line(self, surface, camera_offset, mouse_pos):
-        """绘制从坦克到鼠标位置的线段"""
+    def _draw_mouse_target_line(self, surface, screen_x, screen_y, mouse_pos):
+        """绘制从坦克（插值后的屏幕坐标）到鼠标位置的线段"""
+        import pygame
         if not self.is_alive:
             return
-        screen_x = self.position[0] - camera_offset[0]
-        screen_y = self.position[1] - camera_offset[1]
         pygame.draw.line(surface, (255, 0, 255), (screen_x, screen_y), (mouse_pos[0], mouse_pos[1]), 1)
         pygame.draw.circle(surface, (255, 0, 255), (int(mouse_pos[0]), int(mouse_pos[1])), 3)
                          
@@ -721,14 +751,15 @@ class BaseUnit:
 
     def _handle_assistance(self, unit_manager, damage_source, destroy:bool , damage_amount:float) -> None:
         # 当自身受到伤害时，处理伤害来源的协助信息
-        for unit in unit_manager.units:
+        # 只有视野范围能覆盖自身的单位才可能提供协助
+        for unit in unit_manager.query_radius(self.position, unit_manager.max_sight_range, team=damage_source.team):
             if unit.id == damage_source.id:
                 continue
             if unit.team != damage_source.team:
                 continue
             if unit.is_alive == False:
                 continue
-            if unit.is_in_sight(self):
+            if self.id in unit.sighted_unit_ids:
                 unit.assist_damage_dealt += damage_amount
                 if destroy:
                     unit.assist_destroy_count += 1
@@ -770,4 +801,43 @@ class BaseUnit:
         # 当前BaseUnit类中的属性没有确定下来，该方法为TODO
         filepath = os.path.join(DEFAULT_UNIT_PATH, file_name)
         
-        pass
\ No newline at end of file
+        pass
+
+def sight_matrix(observers, targets, xs, ys, within_range: bool = False) -> np.ndarray:
+    """
+    批量视野判断：返回 (观察单位数, 目标数) 的布尔矩阵，第 i 行第 j 列与 observers[i].is_in_sight(targets[j]) 相同。
+    xs / ys 为各目标当前坐标的数组（例如 BulletStore 中的数组），不逐个读取目标的 position。
+    within_range 为 True 时额外要求距离不超过 sight_range（与 query_radius 的预筛选相同）。
+    NumPy 与 math 的计算可能相差末位，距离落在边界附近的目标按逐个判断的方式复核，结果完全一致。
+    """
+    count = len(targets)
+    if not observers or count == 0:
+        return np.zeros((len(observers), count), dtype=bool)
+    origin = np.array([observer.position for observer in observers], dtype=np.float64)
+    sight = np.array([observer.sight_range for observer in observers], dtype=np.float64)[:, None]
+    dx = np.asarray(xs, dtype=np.float64)[None, :] - origin[:, 0, None]
+    dy = np.asarray(ys, dtype=np.float64)[None, :] - origin[:, 1, None]
+    distance = np.hypot(dx, dy)
+
+    if not USE_TEAR_DROP_VISION:
+        limit = np.broadcast_to(sight, distance.shape)
+    else:
+        min_sight = np.array([observer.min_sight_range for observer in observers], dtype=np.float64)[:, None]
+        forward = np.radians(np.array([observer.direction_angle for observer in observers], dtype=np.float64) - 90)
+        diff = (np.arctan2(dy, dx) - forward[:, None] + math.pi) % (2 * math.pi) - math.pi
+        limit = (sight + min_sight) / 2 + (sight - min_sight) / 2 * np.cos(diff)
+    seen = distance <= limit
+    near = np.abs(distance - limit) <= 1e-9 * (limit + 1)
+    if within_range:
+        seen &= distance <= sight
+        near |= np.abs(distance - sight) <= 1e-9 * (sight + 1)
+
+    for i, j in zip(*np.nonzero(near)):
+        observer, target = observers[i], targets[j]
+        result = observer.is_in_sight(target)
+        if within_range:
+            position = target.position
+            result = result and math.hypot(position[0] - observer.position[0],
+                                           position[1] - observer.position[1]) <= observer.sight_range
+        seen[i, j] = result
+    return seen
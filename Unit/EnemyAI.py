@@ -8,12 +8,12 @@
     优先级：碰撞脱离 > 主动避障 > 子弹规避 > 默认朝向目标
 """
 
-import pygame
 import math
 import random
 from typing import List, Optional, Tuple, Dict, Any
 from Parameter import *
 from Unit.BaseUnit import BaseUnit
+from utils import Rect
 
 
 class EnemyAI:
@@ -50,6 +50,7 @@ class EnemyAI:
         self.unit_manager = unit_manager
         self.bullet_manager = bullet_manager
         self.game_map = game_map
+        game_map.prepare_line_of_sight_table()     # 在搭建对局时准备视线表，而不是在第一次视线检测时
 
         # 状态标记（仅用于调试）
         self.ai_state = "idle"
@@ -79,13 +80,7 @@ class EnemyAI:
             self.fire_cooldown -= delta_time
 
         # 获取目标（最近的敌方单位）
-        enemy_units = self._get_enemy_units()
-        if not enemy_units:
-            self.ai_state = "idle"
-            self.unit.set_movement(False, False)
-            self.unit.set_turning(False, False)
-            return
-        target = self._get_closest_unit(enemy_units)
+        target = self._get_closest_enemy()
         if target is None:
             self.ai_state = "idle"
             self.unit.set_movement(False, False)
@@ -133,22 +128,10 @@ class EnemyAI:
         self._try_fire(target)
 
     # ----------------- 辅助方法 -----------------
-    def _get_enemy_units(self) -> List[BaseUnit]:
-        return [u for u in self.unit_manager.units if u.is_alive and u.visible and u.team != self.unit.team]
-
-    def _get_closest_unit(self, units: List[BaseUnit]) -> Optional[BaseUnit]:
-        if not units:
-            return None
-        closest = None
-        min_dist_sq = float('inf')
-        for u in units:
-            dx = u.position[0] - self.unit.position[0]
-            dy = u.position[1] - self.unit.position[1]
-            dist_sq = dx*dx + dy*dy
-            if dist_sq < min_dist_sq:
-                min_dist_sq = dist_sq
-                closest = u
-        return closest
+    def _get_closest_enemy(self) -> Optional[BaseUnit]:
+        """通过单位空间哈希查找最近的存活且可见的敌方单位"""
+        return self.unit_manager.nearest(self.unit.position, exclude_team=self.unit.team,
+                                         predicate=lambda u: u.visible)
 
     def _vector_to_target(self, target: BaseUnit) -> Tuple[float, float]:
         dx = target.position[0] - self.unit.position[0]
@@ -162,10 +145,7 @@ class EnemyAI:
         """检测单位当前是否与任何单位障碍物碰撞"""
         if not self.unit.bounding_box:
             return False
-        for obs in self.game_map.unit_obstacles:
-            if self.unit.bounding_box.colliderect(obs):
-                return True
-        return False
+        return self.game_map.check_collision(self.unit.bounding_box)
 
     def _is_position_safe(self, pos: Tuple[float, float]) -> bool:
         """
@@ -174,16 +154,13 @@ class EnemyAI:
         """
         x, y = pos
         # 构建安全范围矩形（以中心点，宽高为 unit.size + 2*SAFE_MARGIN）
-        safe_rect = pygame.Rect(
+        safe_rect = Rect(
             x - self.safe_radius,
             y - self.safe_radius,
             self.safe_radius * 2,
             self.safe_radius * 2
         )
-        for obs in self.game_map.unit_obstacles:
-            if safe_rect.colliderect(obs):
-                return False
-        return True
+        return not self.game_map.check_collision(safe_rect)
 
     def _is_future_position_safe(self, direction: Tuple[float, float], duration: float) -> bool:
         """
@@ -510,10 +487,5 @@ class EnemyAI:
                     self.fire_cooldown = self.fire_cooldown_max
 
     def _can_see_target(self, target: BaseUnit) -> bool:
-        """视线检测：使用 bullet_obstacles（只被实心障碍阻挡，水不阻挡）"""
-        start = self.unit.position
-        end = target.position
-        for obs in self.game_map.bullet_obstacles:
-            if obs.clipline(start, end):
-                return False
-        return True
\ No newline at end of file
+        """视线检测：只被实心障碍阻挡，水不阻挡（见 GameMap.has_line_of_sight）"""
+        return self.game_map.has_line_of_sight(self.unit.position, target.position)
\ No newline at end of file
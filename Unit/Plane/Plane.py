@@ -3,7 +3,6 @@
     无机动，极高生命值，较高侦察范围，装备重炮弹
 '''
 
-import pygame
 import math
 from Unit.BaseUnit import BaseUnit
 from Parameter import *
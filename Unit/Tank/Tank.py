@@ -3,7 +3,6 @@
     标准机动性，标准生存性，较高侦察范围，装备子弹、火箭弹和重炮弹
 '''
 
-import pygame
 import math
 from Unit.BaseUnit import BaseUnit
 from Parameter import *
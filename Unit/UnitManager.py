@@ -4,77 +4,347 @@
 from Unit.Tank.Tank import *
 from Map.GameMap import *
 from GameMode import *
+from Unit.UnitSpatialHash import UnitSpatialHash
+from Unit.UnitStore import UnitStore
+from Unit.BaseUnit import sight_matrix
+from utils import count_distance
+from itertools import compress
+import numpy as np
+import heapq
+import math
 
 class UnitManager:
     def __init__(self):
-        self.units = []               # 所有单位列表
+        self.units = []               # 存活单位列表（死亡单位在每帧开始时移出）
+        self.dead_units = []          # 已移出的死亡单位（保留以便查询战绩）
+        self.units_by_id = {}         # id -> 单位（包括死亡单位，按加入顺序）
+        self.slots = []               # 稠密下标 -> 单位，空位为 None；单位存活期间下标不变
+        self.free_slots = []          # 可复用的空位（小顶堆）
         self.enemy_ais = []            # AI 控制器列表
         self.to_remove = []            # 待移除单位暂存
+        self.spatial_hash = UnitSpatialHash()   # 单位空间哈希，每帧刷新
+        self.max_sight_range = 0.0              # 所有单位中最大的视野范围
+        self.unit_store = UnitStore() if USE_UNIT_STORE else None   # 单位状态数组（按稠密下标）
 
     def add_unit(self, unit, bullet_manager, game_map):
         """添加单位，若为 AI 单位则自动创建对应的 EnemyAI"""
         from Unit.EnemyAI import EnemyAI
         if unit:
+            if unit.id in self.units_by_id:
+                raise ValueError(f"存在id相同的单位: {unit.id}")
             self.units.append(unit)
+            self.units_by_id[unit.id] = unit
+            unit.index = heapq.heappop(self.free_slots) if self.free_slots else len(self.slots)
+            if unit.index == len(self.slots):
+                self.slots.append(unit)
+            else:
+                self.slots[unit.index] = unit
+            if self.unit_store is not None:
+                self.unit_store.attach(unit)
+            self.spatial_hash.insert(unit)
+            self.max_sight_range = max(self.max_sight_range, unit.sight_range)
             if unit.usingAI and bullet_manager is not None and game_map is not None:
                 ai = EnemyAI(unit, self, bullet_manager, game_map)
                 self.enemy_ais.append(ai)
 
     def update(self, delta_time, unit_manager, bullet_manager, game_map):
+        # 移出上一帧死亡的单位
+        self.remove_dead_units()
+
+        # 刷新空间哈希：本帧内单位还会按各自的速度向量移动，查询范围需外扩最大移动距离
+        self.refresh_spatial_index(delta_time)
+
         # 更新所有AI决策
         for ai in self.enemy_ais:
             ai.update(delta_time, unit_manager, bullet_manager, game_map)
 
         # 更新所有单位
-        for unit in self.units:
-            unit.update(delta_time, unit_manager, bullet_manager, game_map)
+        if self.unit_store is not None:
+            # 先逐个更新存活与地块效果，再对所有单位批量计算视野、批量更新运动
+            conceal_before = [unit.conceal for unit in self.units]
+            moving = [unit for unit in self.units if unit._update_status(delta_time, game_map)]
+            self._update_vision_batch(moving, conceal_before, bullet_manager, game_map)
+            self.unit_store.integrate(delta_time, moving, game_map)
+        else:
+            for unit in self.units:
+                unit.update(delta_time, unit_manager, bullet_manager, game_map)
+
+        # 单位移动完毕，按最终位置刷新（供通信与子弹更新使用）
+        self.refresh_spatial_index()
             
         # 自动通信
         if AUTO_COMMUNICATE:
             self.auto_communicate()
 
+
+    def _update_vision_batch(self, observers, conceal_before, bullet_manager, game_map):
+        """
+        批量计算 observers 的视野，结果与按单位列表顺序逐个调用 _update_vision 相同：
+        所有单位都还在本帧移动前的位置；单位列表中排在观察单位之后的单位尚未刷新本帧的隐蔽状态，按 conceal_before 判断
+        """
+        if not observers:
+            return
+        units = self.units
+        positions = np.array([unit.position for unit in units], dtype=np.float64).reshape(-1, 2)
+        sighted = sight_matrix(observers, units, positions[:, 0], positions[:, 1], within_range=True)
+
+        rank = {id(unit): i for i, unit in enumerate(units)}
+        order = np.array([rank[id(observer)] for observer in observers])
+        later = np.arange(len(units))[None, :] > order[:, None]
+        concealed = np.where(later, np.array(conceal_before, dtype=bool)[None, :],
+                             np.array([unit.conceal == True for unit in units], dtype=bool)[None, :])
+        shown = np.array([unit.visible == True for unit in units], dtype=bool)
+        visible = sighted & shown[None, :] & ~concealed
+
+        ids = [unit.id for unit in units]
+        bullet_sets = bullet_manager.visible_bullet_ids(observers)
+        for observer, sighted_row, visible_row, bullet_ids in zip(observers, sighted.tolist(), visible.tolist(),
+                                                                   bullet_sets):
+            observer.visible_map = game_map
+            observer.sighted_unit_ids = set(compress(ids, sighted_row))
+            observer.visible_unit_ids = set(compress(ids, visible_row))
+            observer.visible_bullet_ids = bullet_ids
+
+    def remove_dead_units(self):
+        """将死亡单位移出单位列表并释放其下标，同时移除对应的 AI；单位对象仍可通过 id 查询"""
         self.to_remove.clear()
         for unit in self.units:
             if not unit.is_alive:
                 self.to_remove.append(unit)
+        if not self.to_remove:
+            return
 
+        self.units = [unit for unit in self.units if unit.is_alive]
+        self.enemy_ais = [ai for ai in self.enemy_ais if ai.unit.is_alive]
         for unit in self.to_remove:
-            # 移除对应的 AI
-            self.enemy_ais = [ai for ai in self.enemy_ais if ai.unit != unit]
+            if self.unit_store is not None:
+                self.unit_store.detach(unit)
+            self.dead_units.append(unit)
+            self.slots[unit.index] = None
+            heapq.heappush(self.free_slots, unit.index)
+            unit.index = -1
+        self.spatial_hash.rebuild(self.units)
 
     def auto_communicate(self):
         """
-        自动通信：反复让所有存活单位广播自己的可见信息，直到一轮中没有任何单位获得新信息为止。
+        自动通信：信息沿通信关系传递，直到没有任何单位能再获得新信息（与反复广播到不再变化的结果相同）。
+        单位 u 能向 v 发送信息，当且仅当 u 存活，v 存活且可见，二者同队，且距离不超过 u 的通信范围。
+        通信范围各不相同，关系是有向的，因此按强连通分量合并：同一分量内的单位共享同一份可见集合，
+        分量之间按拓扑顺序向下游传递。
+        """
+        alive_units = [u for u in self.units if u.is_alive]
+        if not alive_units:
+            return
+        edges = self._build_communication_graph(alive_units)
+        components, component_of = self._strongly_connected_components(edges)
+
+        # 按拓扑顺序（上游在前）计算每个分量能获得的全部信息
+        count = len(components)
+        unit_sets = [set() for _ in range(count)]
+        bullet_sets = [set() for _ in range(count)]
+        for c in range(count - 1, -1, -1):
+            unit_ids = unit_sets[c]
+            bullet_ids = bullet_sets[c]
+            for i in components[c]:
+                unit_ids |= alive_units[i].visible_unit_ids
+                bullet_ids |= alive_units[i].visible_bullet_ids
+            for i in components[c]:
+                for j in edges[i]:
+                    target = component_of[j]
+                    if target != c:
+                        unit_sets[target] |= unit_ids
+                        bullet_sets[target] |= bullet_ids
+
+        # 合并时单位不会接收自己的id，因此自身不可见的单位需要单独修正
+        removed = self._hidden_id_corrections(alive_units, edges, component_of, unit_sets)
+
+        # 同一分量的单位共享同一份集合，使用 frozenset，原地修改一个单位的集合不会影响队友
+        for c, members in enumerate(components):
+            unit_ids = frozenset(unit_sets[c])
+            bullet_ids = frozenset(bullet_sets[c])
+            for i in members:
+                unit = alive_units[i]
+                drop = removed.get(i)
+                unit.visible_unit_ids = unit_ids - drop if drop else unit_ids
+                unit.visible_bullet_ids = bullet_ids
+
+    def _build_communication_graph(self, alive_units):
+        """
+        构建有向通信图：edges[i] 为单位 i 能直接发送信息的单位下标（与 broadcast 的判定一致）。
+        距离矩阵批量计算，落在通信范围边界附近的单位对按逐个判断的方式复核
         """
-        changed = True
-        while changed:
-            changed = False
-            # 收集当前所有存活单位（避免在迭代过程中列表变化）
-            alive_units = [u for u in self.units if u.is_alive]
-            for unit in alive_units:
-                _, _, _, any_added = unit.broadcast(self)
-                if any_added:
-                    changed = True
-
-    def draw(self, surface, camera_offset, mouse_pos = None):
+        count = len(alive_units)
+        positions = np.array([unit.position for unit in alive_units], dtype=np.float64).reshape(-1, 2)
+        ranges = np.array([unit.communication_range for unit in alive_units], dtype=np.float64)[:, None]
+        team_codes = {}
+        teams = np.array([team_codes.setdefault(unit.team, len(team_codes)) for unit in alive_units])
+        no_team = np.array([unit.team is None for unit in alive_units], dtype=bool)      # 与 query_radius 相同，不按阵营过滤
+        visible = np.array([bool(unit.visible) for unit in alive_units], dtype=bool)
+
+        candidates = ((teams[:, None] == teams[None, :]) | no_team[:, None]) & visible[None, :]
+        np.fill_diagonal(candidates, False)
+        distance = np.hypot(positions[None, :, 0] - positions[:, 0, None],
+                            positions[None, :, 1] - positions[:, 1, None])
+        linked = candidates & (distance <= ranges)
+        near = candidates & (np.abs(distance - ranges) <= 1e-9 * (ranges + 1))
+        for i, j in zip(*np.nonzero(near)):
+            unit, other = alive_units[i], alive_units[j]
+            linked[i, j] = (math.hypot(other.position[0] - unit.position[0],
+                                       other.position[1] - unit.position[1]) <= unit.communication_range and
+                            count_distance(unit, other) <= unit.communication_range)
+        return [np.flatnonzero(row).tolist() for row in linked] if count else []
+
+    @staticmethod
+    def _strongly_connected_components(edges):
+        """
+        Tarjan 算法（迭代实现）求强连通分量。
+        返回 (components, component_of)，components 按逆拓扑顺序排列（下游分量在前）
+        """
+        count = len(edges)
+        index = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack = []
+        components = []
+        component_of = [-1] * count
+        counter = 0
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            work = [(root, 0)]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                node, next_edge = work[-1]
+                if next_edge < len(edges[node]):
+                    work[-1] = (node, next_edge + 1)
+                    child = edges[node][next_edge]
+                    if index[child] == -1:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append((child, 0))
+                    elif on_stack[child]:
+                        low[node] = min(low[node], index[child])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component_of[member] = len(components)
+                        members.append(member)
+                        if member == node:
+                            break
+                    members.sort()
+                    components.append(members)
+        return components, component_of
+
+    @staticmethod
+    def _hidden_id_corrections(alive_units, edges, component_of, unit_sets):
+        """
+        单位合并信息时会丢弃自己的id，所以当单位 h 自身的可见集合中没有自己时，
+        h.id 只能沿不经过 h 的路径传播。返回 {单位下标: 需要从分量集合中去掉的id集合}
+        """
+        removed = {}
+        for h, unit in enumerate(alive_units):
+            if unit.id in unit.visible_unit_ids:
+                continue
+            holders = [c for c in range(len(unit_sets)) if unit.id in unit_sets[c]]
+            if not holders:
+                continue
+            # 从初始就知道 h 的单位出发，h 本身不转发
+            reached = [False] * len(alive_units)
+            queue = [i for i, other in enumerate(alive_units) if i != h and unit.id in other.visible_unit_ids]
+            for i in queue:
+                reached[i] = True
+            while queue:
+                i = queue.pop()
+                for j in edges[i]:
+                    if j != h and not reached[j]:
+                        reached[j] = True
+                        queue.append(j)
+            for i in range(len(alive_units)):
+                if not reached[i] and unit.id in unit_sets[component_of[i]]:
+                    removed.setdefault(i, set()).add(unit.id)
+        return removed
+
+    def refresh_spatial_index(self, delta_time = 0.0):
+        """按当前位置重建空间哈希；delta_time > 0 时查询范围外扩本帧内的最大移动距离"""
+        slack = 0.0
+        if delta_time > 0:
+            for unit in self.units:
+                if unit.is_alive:
+                    slack = max(slack, math.hypot(unit.velocity[0], unit.velocity[1]) * delta_time)
+        self.spatial_hash.rebuild(self.units, slack)
+
+    def query_radius(self, position, radius, team = None, exclude_team = None, alive_only = True):
+        """中心距离 position 不超过 radius 的单位（按单位列表顺序）"""
+        return self.spatial_hash.query_radius(position, radius, team, exclude_team, alive_only)
+
+    def query_rect(self, rect, team = None, exclude_team = None, alive_only = True):
+        """碰撞箱与 rect 相交的单位（按单位列表顺序）"""
+        return self.spatial_hash.query_rect(rect, team, exclude_team, alive_only)
+
+    def nearest(self, position, team = None, exclude_team = None, predicate = None, alive_only = True):
+        """距离 position 最近的单位，可按阵营和条件过滤"""
+        return self.spatial_hash.nearest(position, team, exclude_team, predicate, alive_only)
+
+    def k_nearest(self, position, k, team = None, exclude_team = None, predicate = None, alive_only = True):
+        """距离 position 最近的 k 个单位（从近到远），可按阵营和条件过滤"""
+        return self.spatial_hash.k_nearest(position, k, team, exclude_team, predicate, alive_only)
+
+    def draw(self, surface, camera_offset, mouse_pos = None, alpha = 1.0):
         for unit in self.units:
-            unit.draw(surface, camera_offset, mouse_pos)
+            unit.draw(surface, camera_offset, mouse_pos, alpha)
             
     def get_unit_by_id(self, unit_id):
-        for unit in self.units:
-            if unit.id == unit_id:
-                return unit
+        """按id查找单位（包括已死亡的单位）"""
+        return self.units_by_id.get(unit_id)
+
+    def get_unit_by_index(self, index):
+        """按稠密下标查找存活单位，空位返回 None"""
+        if 0 <= index < len(self.slots):
+            return self.slots[index]
         return None
 
+    def get_all_units(self):
+        """所有加入过的单位（包括已死亡的单位），按加入顺序"""
+        return list(self.units_by_id.values())
+
+    def new_unit_id(self):
+        """生成一个未被占用的单位id"""
+        unit_id = len(self.units_by_id)
+        while unit_id in self.units_by_id:
+            unit_id += 1
+        return unit_id
+
     def get_active_count(self):
         return len([u for u in self.units if u.is_alive])
 
     def is_in(self, unit_id):
-        return any(unit.id == unit_id for unit in self.units)
+        return unit_id in self.units_by_id
     
     def clear(self):
+        if self.unit_store is not None:
+            for unit in self.units:
+                self.unit_store.detach(unit)
+            self.unit_store = UnitStore()
         self.units.clear()
+        self.dead_units.clear()
+        self.units_by_id.clear()
+        self.slots.clear()
+        self.free_slots.clear()
         self.enemy_ais.clear()
+        self.spatial_hash.rebuild(self.units)
+        self.max_sight_range = 0.0
         
     def save(self):
-        return [unit.save() for unit in self.units]
\ No newline at end of file
+        return [unit.save() for unit in self.get_all_units()]
\ No newline at end of file
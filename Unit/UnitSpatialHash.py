@@ -0,0 +1,162 @@
+'''
+    单位的空间哈希
+    按单位中心所在的格子分桶，每帧刷新一次。查询时只检查覆盖范围内的格子，
+    再用单位的实时位置做精确判断，结果按单位在 UnitManager.units 中的顺序返回
+'''
+
+import heapq
+import math
+from typing import Callable, Dict, Optional, Tuple
+from Parameter import *
+
+
+class UnitSpatialHash:
+    def __init__(self, cell_size: float = UNIT_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], list] = {}      # (cx, cy) -> 单位列表
+        self.rank: Dict[int, int] = {}                     # id(unit) -> 在单位列表中的顺序
+        self.slack = 0.0                                   # 刷新后单位可能移动的最大距离（查询范围外扩）
+        self.max_half_extent = 0.0                         # 单位碰撞箱中心到边的最大距离
+        self.bounds: Optional[Tuple[int, int, int, int]] = None   # 已占用格子的范围 (cx0, cy0, cx1, cy1)
+
+    def _cell_of(self, position) -> Tuple[int, int]:
+        return (int(math.floor(position[0] / self.cell_size)),
+                int(math.floor(position[1] / self.cell_size)))
+
+    def rebuild(self, units: list, slack: float = 0.0) -> None:
+        """按单位当前位置重新分桶。slack 为查询时需要额外外扩的距离（刷新后单位还会移动时使用）"""
+        self.cells = {}
+        self.rank = {}
+        self.bounds = None
+        self.max_half_extent = 0.0
+        self.slack = slack
+        for unit in units:
+            self.insert(unit)
+
+    def insert(self, unit) -> None:
+        """登记一个单位（例如在两次刷新之间新加入的单位）"""
+        if id(unit) in self.rank:
+            return
+        self.rank[id(unit)] = len(self.rank)
+        cell = self._cell_of(unit.position)
+        self.cells.setdefault(cell, []).append(unit)
+        half = max(unit.size[0], unit.size[1]) / 2 + 1
+        if half > self.max_half_extent:
+            self.max_half_extent = half
+        if self.bounds is None:
+            self.bounds = (cell[0], cell[1], cell[0], cell[1])
+        else:
+            cx0, cy0, cx1, cy1 = self.bounds
+            self.bounds = (min(cx0, cell[0]), min(cy0, cell[1]), max(cx1, cell[0]), max(cy1, cell[1]))
+
+    def _collect(self, x0: float, y0: float, x1: float, y1: float) -> list:
+        """收集中心落在范围内格子中的单位（按登记顺序）"""
+        if self.bounds is None:
+            return []
+        cx0, cy0 = self._cell_of((x0, y0))
+        cx1, cy1 = self._cell_of((x1, y1))
+        bx0, by0, bx1, by1 = self.bounds
+        cx0, cy0 = max(cx0, bx0), max(cy0, by0)
+        cx1, cy1 = min(cx1, bx1), min(cy1, by1)
+        found = []
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        if len(found) > 1:
+            found.sort(key=lambda unit: self.rank[id(unit)])
+        return found
+
+    @staticmethod
+    def _team_ok(unit, team, exclude_team) -> bool:
+        if team is not None and unit.team != team:
+            return False
+        if exclude_team is not None and unit.team == exclude_team:
+            return False
+        return True
+
+    def query_radius(self, position, radius: float, team=None, exclude_team=None, alive_only: bool = True) -> list:
+        """中心距离 position 不超过 radius 的单位"""
+        x, y = position
+        reach = radius + self.slack
+        result = []
+        for unit in self._collect(x - reach, y - reach, x + reach, y + reach):
+            if alive_only and not unit.is_alive:
+                continue
+            if not self._team_ok(unit, team, exclude_team):
+                continue
+            if math.hypot(unit.position[0] - x, unit.position[1] - y) <= radius:
+                result.append(unit)
+        return result
+
+    def query_rect(self, rect, team=None, exclude_team=None, alive_only: bool = True) -> list:
+        """碰撞箱与 rect 相交的单位"""
+        reach = self.max_half_extent + self.slack
+        result = []
+        for unit in self._collect(rect.left - reach, rect.top - reach, rect.right + reach, rect.bottom + reach):
+            if alive_only and not unit.is_alive:
+                continue
+            if not self._team_ok(unit, team, exclude_team):
+                continue
+            if unit.bounding_box and rect.colliderect(unit.bounding_box):
+                result.append(unit)
+        return result
+
+    @staticmethod
+    def _ring_cells(center: Tuple[int, int], ring: int):
+        """以 center 为中心、切比雪夫距离恰好为 ring 的一圈格子"""
+        cx, cy = center
+        if ring == 0:
+            yield center
+            return
+        for x in range(cx - ring, cx + ring + 1):
+            yield (x, cy - ring)
+            yield (x, cy + ring)
+        for y in range(cy - ring + 1, cy + ring):
+            yield (cx - ring, y)
+            yield (cx + ring, y)
+
+    def nearest(self, position, team=None, exclude_team=None, predicate: Optional[Callable] = None,
+                alive_only: bool = True):
+        """距离 position 最近的单位（距离相同时取单位列表中靠前的），没有则返回 None"""
+        found = self.k_nearest(position, 1, team, exclude_team, predicate, alive_only)
+        return found[0] if found else None
+
+    def k_nearest(self, position, k: int, team=None, exclude_team=None, predicate: Optional[Callable] = None,
+                  alive_only: bool = True) -> list:
+        """
+        距离 position 最近的 k 个单位，按距离从近到远排列（距离相同时单位列表中靠前的在前）。
+        从中心格子开始逐圈向外搜索，用大小为 k 的堆保留当前最近的单位
+        """
+        if self.bounds is None or k <= 0:
+            return []
+        x, y = position
+        center = self._cell_of(position)
+        bx0, by0, bx1, by1 = self.bounds
+        max_ring = max(abs(center[0] - bx0), abs(center[0] - bx1),
+                       abs(center[1] - by0), abs(center[1] - by1))
+        heap = []           # (-距离平方, -顺序, 单位)：堆顶是已找到的单位中最远的一个
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(center, ring):
+                for unit in self.cells.get(cell, ()):
+                    if alive_only and not unit.is_alive:
+                        continue
+                    if not self._team_ok(unit, team, exclude_team):
+                        continue
+                    if predicate is not None and not predicate(unit):
+                        continue
+                    dx = unit.position[0] - x
+                    dy = unit.position[1] - y
+                    item = (-(dx * dx + dy * dy), -self.rank[id(unit)], unit)
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif item[:2] > heap[0][:2]:
+                        heapq.heapreplace(heap, item)
+            # 更外层格子中的单位距离至少为 ring * cell_size（减去刷新后的移动量）
+            if len(heap) == k:
+                bound = ring * self.cell_size - self.slack
+                if bound > 0 and -heap[0][0] <= bound * bound:
+                    break
+        heap.sort(reverse=True, key=lambda item: item[:2])
+        return [item[2] for item in heap]
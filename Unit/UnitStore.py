@@ -0,0 +1,201 @@
+'''
+    单位状态的数组存储（结构数组，NumPy）
+    启用 USE_UNIT_STORE 时，单位的位置、速度、角度、生命值、冷却与换弹计时器在每帧的运动更新中按单位稠密下标
+    放入数组，由 integrate 对所有单位批量完成计时器与运动更新，再一次性写回单位对象上的普通属性。
+    单位属性本身不经过数组，逐个读取 unit.position 等属性的代码（空间哈希、AI、子弹碰撞）与默认模式一样快。
+    规则与 BaseUnit._update_motion 逐项一致（包括碰撞时位置回退但速度向量不重新计算）。
+'''
+
+import numpy as np
+from itertools import compress
+from operator import attrgetter
+from typing import Dict
+from utils import Rect
+
+
+class UnitStore:
+    # 以数组保存的标量属性及其类型
+    FLOAT_FIELDS = ('speed', 'direction_angle', 'turret_direction_angle', 'turret_target_angle',
+                    'acceleration', 'angular_speed', 'max_speed', 'max_acceleration',
+                    'max_angular_speed', 'turret_angular_speed', 'speed_slow_multiplier',
+                    'health', 'fire_cooldown', 'reload_timer')
+    BOOL_FIELDS = ('is_switching_ammo',)
+    VECTOR_FIELDS = {'position': ('x', 'y'), 'velocity': ('vx', 'vy')}
+    SPEED_SIGMA = 0.05          # 与 BaseUnit._update_speed 中的容差相同
+
+    _get_floats = attrgetter(*FLOAT_FIELDS)
+    _get_vectors = attrgetter('position', 'velocity', 'size')
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = 0
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.units: list = []           # 下标 -> 单位（空位为 None）
+        self._grow(capacity)
+
+    # ----------------- 存储管理 -----------------
+    def _dtypes(self) -> Dict[str, type]:
+        dtypes = {name: np.float64 for name in self.FLOAT_FIELDS}
+        dtypes.update({name: np.bool_ for name in self.BOOL_FIELDS})
+        for names in self.VECTOR_FIELDS.values():
+            dtypes.update({name: np.float64 for name in names})
+        dtypes.update({'box_left': np.int64, 'box_top': np.int64, 'width': np.int64,
+                       'height': np.int64, 'has_box': np.bool_})
+        return dtypes
+
+    def _grow(self, capacity: int) -> None:
+        capacity = max(capacity, 1)
+        for name, dtype in self._dtypes().items():
+            array = np.zeros(capacity, dtype=dtype)
+            if name in self.arrays:
+                array[:self.capacity] = self.arrays[name]
+            self.arrays[name] = array
+        self.units.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def attach(self, unit) -> None:
+        """登记单位（unit.index 需已分配）"""
+        if unit.index >= self.capacity:
+            self._grow(max(self.capacity * 2, unit.index + 1))
+        self.units[unit.index] = unit
+
+    def detach(self, unit) -> None:
+        """释放单位的下标（例如单位死亡被移出时）"""
+        if 0 <= unit.index < self.capacity and self.units[unit.index] is unit:
+            self.units[unit.index] = None
+
+    def _pull(self, idx: np.ndarray, units: list) -> None:
+        """把单位属性的当前值读入数组（两帧之间 AI、伤害、地块效果等会直接修改属性）"""
+        a = self.arrays
+        floats = np.array([self._get_floats(unit) for unit in units], dtype=np.float64).reshape(len(units), -1)
+        for k, name in enumerate(self.FLOAT_FIELDS):
+            a[name][idx] = floats[:, k]
+        a['is_switching_ammo'][idx] = [unit.is_switching_ammo for unit in units]
+        vectors = np.array([self._get_vectors(unit) for unit in units], dtype=np.float64).reshape(len(units), 3, 2)
+        a['x'][idx], a['y'][idx] = vectors[:, 0, 0], vectors[:, 0, 1]
+        a['vx'][idx], a['vy'][idx] = vectors[:, 1, 0], vectors[:, 1, 1]
+        a['width'][idx], a['height'][idx] = vectors[:, 2, 0], vectors[:, 2, 1]
+
+    def _push(self, idx: np.ndarray, units: list) -> None:
+        """把 integrate 修改过的数组写回单位属性（每个单位每帧写一次）"""
+        a = self.arrays
+        columns = [a[name][idx].tolist() for name in ('x', 'y', 'vx', 'vy', 'speed', 'direction_angle',
+                                                      'angular_speed', 'turret_direction_angle', 'fire_cooldown',
+                                                      'reload_timer', 'is_switching_ammo', 'has_box', 'box_left',
+                                                      'box_top', 'width', 'height')]
+        for unit, (x, y, vx, vy, speed, direction, angular_speed, turret, cooldown, reload_timer, switching,
+                   has_box, left, top, width, height) in zip(units, zip(*columns)):
+            unit.position = (x, y)
+            unit.velocity = (vx, vy)
+            unit.speed = speed
+            unit.direction_angle = direction
+            unit.angular_speed = angular_speed
+            unit.turret_direction_angle = turret
+            unit.fire_cooldown = cooldown
+            unit.reload_timer = reload_timer
+            unit.is_switching_ammo = switching
+            if has_box:
+                unit.bounding_box = Rect(left, top, width, height)
+
+    # ----------------- 批量更新 -----------------
+    def integrate(self, delta_time: float, units: list, game_map) -> None:
+        """对本帧需要更新运动的单位执行计时器与运动更新（与逐个调用 BaseUnit._update_motion 等价）"""
+        if not units:
+            return
+        a = self.arrays
+        idx = np.fromiter((unit.index for unit in units), dtype=np.int64, count=len(units))
+        self._pull(idx, units)
+        dt = delta_time
+        old_x = a['x'][idx]
+        old_y = a['y'][idx]
+
+        # 弹种切换计时
+        reload_timer = a['reload_timer'][idx]
+        ticking = a['is_switching_ammo'][idx] & (reload_timer > 0)
+        reload_timer = np.where(ticking, reload_timer - dt, reload_timer)
+        finished = ticking & (reload_timer <= 0)
+        reload_timer[finished] = 0
+        a['reload_timer'][idx] = reload_timer
+        a['is_switching_ammo'][idx[finished]] = False
+        for i in idx[finished]:
+            unit = self.units[i]
+            unit.current_ammunition = unit.target_ammunition
+            unit.target_ammunition = ""
+
+        # 开火冷却
+        cooldown = a['fire_cooldown'][idx]
+        cooling = cooldown > 0
+        cooldown = np.where(cooling, cooldown - dt, cooldown)
+        cooldown[cooling & (cooldown < 0)] = 0
+        a['fire_cooldown'][idx] = cooldown
+
+        # 速度（运算顺序与 _update_speed 相同，保证结果一致）
+        speed = a['speed'][idx]
+        limit = a['max_speed'][idx] * a['speed_slow_multiplier'][idx]
+        max_acc = a['max_acceleration'][idx]
+        upper = limit * (1 + self.SPEED_SIGMA)
+        lower = -limit * (1 + self.SPEED_SIGMA)
+        real_acc = np.where(speed > upper, -max_acc, np.where(speed < lower, max_acc, a['acceleration'][idx]))
+        speed = speed + real_acc * dt
+        speed = np.where((speed > limit * 1) & (speed < upper), limit, speed)
+        speed = np.where((speed < -limit * 1) & (speed > lower), -limit, speed)
+        a['speed'][idx] = speed
+
+        # 朝向
+        direction = a['direction_angle'][idx]
+        angular_speed = a['angular_speed'][idx]
+        max_angular = a['max_angular_speed'][idx]
+        turning = angular_speed != 0
+        direction = np.where(turning, (direction + angular_speed * dt) % 360, direction)
+        too_fast = turning & (np.abs(angular_speed) > max_angular)
+        angular_speed = np.where(too_fast, np.where(angular_speed > 0, max_angular, -max_angular), angular_speed)
+        a['direction_angle'][idx] = direction
+        a['angular_speed'][idx] = angular_speed
+
+        # 炮塔朝向
+        turret = a['turret_direction_angle'][idx]
+        diff = (a['turret_target_angle'][idx] - turret + 180) % 360 - 180
+        rotation = a['turret_angular_speed'][idx] * dt
+        rotating = np.abs(diff) > 0.1
+        turret = np.where(rotating & (diff > 0), turret + np.minimum(rotation, diff),
+                          np.where(rotating, turret - np.minimum(rotation, -diff), turret))
+        a['turret_direction_angle'][idx] = np.where(rotating, turret % 360, turret)
+
+        # 位置（使用上一帧的速度向量）与碰撞箱
+        x = old_x + a['vx'][idx] * dt
+        y = old_y + a['vy'][idx] * dt
+        width = a['width'][idx]
+        height = a['height'][idx]
+        has_box = (width > 0) & (height > 0)
+        a['x'][idx] = x
+        a['y'][idx] = y
+        self._update_boxes(idx, x, y, width, height, has_box)
+
+        # 速度向量
+        angle = np.radians(direction - 90)
+        a['vx'][idx] = speed * np.cos(angle)
+        a['vy'][idx] = speed * np.sin(angle)
+
+        # 计时为 0 时直接开始切换的情况，写回属性后再完成弹种切换
+        completing = a['is_switching_ammo'][idx] & (a['reload_timer'][idx] <= 0)
+
+        # 与障碍物碰撞：恢复到之前的位置并停止
+        hit = has_box & game_map.check_collision_batch(a['box_left'][idx], a['box_top'][idx], width, height)
+        if hit.any():
+            hit_idx = idx[hit]
+            a['x'][hit_idx] = old_x[hit]
+            a['y'][hit_idx] = old_y[hit]
+            self._update_boxes(hit_idx, old_x[hit], old_y[hit], width[hit], height[hit], has_box[hit])
+            a['speed'][hit_idx] = 0
+
+        self._push(idx, units)
+        for unit in compress(units, completing.tolist()):
+            unit._complete_ammo_switch()
+
+    def _update_boxes(self, idx, x, y, width, height, has_box) -> None:
+        """按中心位置更新碰撞箱左上角（与 pygame.Rect 对浮点坐标向零取整一致）"""
+        a = self.arrays
+        left = np.trunc(x - width / 2).astype(np.int64)
+        top = np.trunc(y - height / 2).astype(np.int64)
+        a['box_left'][idx] = np.where(has_box, left, a['box_left'][idx])
+        a['box_top'][idx] = np.where(has_box, top, a['box_top'][idx])
+        a['has_box'][idx] = has_box
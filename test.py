@@ -59,17 +59,20 @@ if __name__ == "__main__":
     
     running = True
     while running:
-        delta_time = 1.0 / FPS
-        clock.tick(FPS * ACC)
+        # 加速模式下不限制帧率
+        frame_time = (clock.tick() if game_manager.turbo else clock.tick(FPS)) / 1000.0
 
         # 应用键盘鼠标控制
         running, action = PCControl(game_manager, action, screen)
         game_manager.set_unit_action(0, action)
         
-        # 更新、绘制
-        game_manager.update(delta_time)
-        screen.fill((50, 50, 70))
-        game_manager.draw(screen)
+        # 更新（固定步长）、绘制（插值）；加速模式下只模拟不绘制
+        if game_manager.turbo:
+            game_manager.run_turbo()
+        else:
+            game_manager.advance(frame_time)
+            screen.fill((50, 50, 70))
+            game_manager.draw(screen)
         
         pygame.display.flip()
         
@@ -0,0 +1,43 @@
+"""EnvPool 工作进程崩溃后的恢复"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EnvPool import EnvPool
+
+
+def _idle_actions(pool):
+    return np.zeros((pool.num_envs, len(pool.agent_ids), 5), dtype=np.int64)
+
+
+def test_step_restarts_worker_killed_while_idle():
+    with EnvPool(num_envs=2, agent_ids=(0,), seed=0, max_ticks=600) as pool:
+        pool.reset()
+        pool.step(_idle_actions(pool))
+        pool._processes[1].kill()
+        pool._processes[1].join()
+
+        _, rewards, terminated, truncated, infos = pool.step(_idle_actions(pool))
+        assert infos[1]["restarted"] and pool.restarts == [0, 1]
+        assert truncated[1] and not terminated[1] and rewards[1].sum() == 0.0
+        assert not infos[0].get("restarted") and not truncated[0]
+
+        # 重启后的环境可以继续正常模拟
+        _, _, _, truncated, infos = pool.step(_idle_actions(pool))
+        assert not infos[1].get("restarted") and not truncated[1]
+
+
+def test_reset_restarts_worker_killed_while_idle():
+    with EnvPool(num_envs=2, agent_ids=(0,), seed=0, max_ticks=600) as pool:
+        pool.reset()
+        pool._processes[0].kill()
+        pool._processes[0].join()
+
+        _, infos = pool.reset(seed=5)
+        assert infos[0]["restarted"] and pool.restarts == [1, 0]
+        assert pool.ticks.tolist() == [0, 0]
+        pool.step(_idle_actions(pool))
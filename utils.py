@@ -1,11 +1,11 @@
 '''
     此处用于定义一些全局可用的函数
 '''
-import pygame
 import os
 import re
 
 def load_image(image_path):
+    import pygame       # 只有需要图片时才导入 pygame，模拟部分不依赖它
     try:
         return pygame.image.load(image_path)
     except:
@@ -70,6 +70,7 @@ def count_distance(a, b):
     return ((a.position[0] - b.position[0]) ** 2 + (a.position[1] - b.position[1]) ** 2) ** 0.5
 
 def set_font():
+    import pygame
     # 字体设置
     font_paths = [
         "C:/Windows/Fonts/simhei.ttf",  # 黑体
@@ -120,4 +121,133 @@ class MethodGroup:
             bound_method = getattr(instance, name, None)
             if bound_method:
                 results[name] = bound_method()
-        return results
\ No newline at end of file
+        return results
+
+def _c_div(a, b):
+    """与 C 语言相同、向零取整的整数除法"""
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+class Rect:
+    """
+    轻量的整数矩形，模拟部分用它代替 pygame.Rect（不需要导入 pygame）。
+    构造时坐标和尺寸向零取整，尺寸非负时 colliderect / clipline 的判定与 pygame.Rect 完全一致
+    （模拟中的矩形尺寸都不为负，负尺寸按空矩形处理）；
+    可以按 (x, y, width, height) 序列传给 pygame 的绘制函数
+    """
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, x, y, width, height):
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+
+    @property
+    def left(self): return self.x
+    @property
+    def top(self): return self.y
+    @property
+    def right(self): return self.x + self.width
+    @property
+    def bottom(self): return self.y + self.height
+    @property
+    def w(self): return self.width
+    @property
+    def h(self): return self.height
+    @property
+    def size(self): return (self.width, self.height)
+    @property
+    def centerx(self): return self.x + self.width // 2
+    @property
+    def centery(self): return self.y + self.height // 2
+    @property
+    def center(self): return (self.centerx, self.centery)
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.width, self.height))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.width, self.height)[index]
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"<Rect({self.x}, {self.y}, {self.width}, {self.height})>"
+
+    def copy(self) -> 'Rect':
+        return Rect(self.x, self.y, self.width, self.height)
+
+    def move(self, dx, dy) -> 'Rect':
+        return Rect(self.x + int(dx), self.y + int(dy), self.width, self.height)
+
+    def colliderect(self, other) -> bool:
+        """两矩形是否相交：边界接触不算相交，空矩形不与任何矩形相交"""
+        return (self.width > 0 and self.height > 0 and other.width > 0 and other.height > 0 and
+                self.x < other.x + other.width and other.x < self.x + self.width and
+                self.y < other.y + other.height and other.y < self.y + self.height)
+
+    def collidepoint(self, x, y) -> bool:
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def clipline(self, start, end) -> bool:
+        """
+        线段是否与矩形相交（端点向零取整后按 Cohen-Sutherland 整数裁剪，结果与 pygame.Rect.clipline 是否为空一致）
+        """
+        if self.width <= 0 or self.height <= 0:
+            return False
+        x1, y1, x2, y2 = int(start[0]), int(start[1]), int(end[0]), int(end[1])
+        left, top = self.x, self.y
+        right, bottom = self.x + self.width - 1, self.y + self.height - 1
+        if left <= x1 <= right and left <= x2 <= right and top <= y1 <= bottom and top <= y2 <= bottom:
+            return True
+        if ((x1 < left and x2 < left) or (x1 > right and x2 > right) or
+                (y1 < top and y2 < top) or (y1 > bottom and y2 > bottom)):
+            return False
+        if y1 == y2 or x1 == x2:
+            return True
+
+        def outcode(x, y):
+            code = 0
+            if y < top:
+                code |= 1
+            elif y > bottom:
+                code |= 2
+            if x < left:
+                code |= 4
+            elif x > right:
+                code |= 8
+            return code
+
+        code1, code2 = outcode(x1, y1), outcode(x2, y2)
+        while code1 or code2:
+            if code1 & code2:
+                return False
+            code = code1 or code2
+            if code & 1:
+                y = top
+                x = x1 + _c_div((x2 - x1) * (y - y1), y2 - y1)
+            elif code & 2:
+                y = bottom
+                x = x1 + _c_div((x2 - x1) * (y - y1), y2 - y1)
+            elif code & 4:
+                x = left
+                y = y1 + _c_div((y2 - y1) * (x - x1), x2 - x1)
+            else:
+                x = right
+                y = y1 + _c_div((y2 - y1) * (x - x1), x2 - x1)
+            if code1:
+                x1, y1 = x, y
+                code1 = outcode(x1, y1)
+            else:
+                x2, y2 = x, y
+                code2 = outcode(x2, y2)
+        return True